@@ -2,6 +2,7 @@ import os
 import numpy as np
 from stable_baselines3 import PPO
 import config
+from node_index import SensorIndex
 
 class AIController:
     def __init__(self, circuit):
@@ -27,6 +28,9 @@ class AIController:
         except:
             self.sensor_nodes = []
 
+        # Индексы сенсоров в AllBusVmagPu (как в SimulationCore.get_state())
+        self.sensor_index = None
+
         self.obs_dim = len(self.sensor_nodes) + len(self.reg_names) + 1 + 2 # V + Taps + Power + Time(2)
 
     def _load_model(self):
@@ -103,29 +107,13 @@ class AIController:
         """
         obs = []
 
-        # А. Напряжения
-        # Получаем напряжения (p.u.) для сенсоров
-        # Внимание: здесь нужно аккуратно повторить логику SimulationCore.get_state()
-        # Но у нас есть доступ к self.circuit
-
-        # Чтобы не дублировать код чтения напряжений, используем упрощенный подход,
-        # но он должен совпадать с обучением.
+        # А. Напряжения (p.u.) сенсоров - тот же SensorIndex, что и в SimulationCore.get_state()
         # В GymEnv: (v_pu - 1.0) * 10.0
 
-        for node in self.sensor_nodes:
-            self.circuit.SetActiveBus(node)
-            v_mag = self.circuit.ActiveBus.VMagAngle
-            if len(v_mag) >= 2:
-                voltages = v_mag[0::2]
-                kv_base = self.circuit.ActiveBus.kVBase * 1000
-                if kv_base > 0:
-                    v_pu = np.mean(voltages) / kv_base
-                else:
-                    v_pu = 1.0
-            else:
-                v_pu = 0.0
-
-            obs.append((v_pu - 1.0) * 10.0)
+        if self.sensor_index is None or not self.sensor_index.is_current(self.circuit):
+            self.sensor_index = SensorIndex(self.circuit, self.sensor_nodes)
+        v_pu = self.sensor_index.read(self.circuit)
+        obs.extend(((v_pu - 1.0) * 10.0).tolist())
 
         # Б. Тапы: / 16.0
         for reg in self.reg_names:
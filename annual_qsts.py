@@ -0,0 +1,458 @@
+import argparse
+import json
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import config
+import loadshape_store
+from node_index import BusNodeIndex
+from simulation_core import SimulationCore
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+DEFAULT_OUT_DIR = BASE_DIR / "annual_results"
+META_FILE = "meta.json"
+
+STEPS_PER_DAY = 96
+STEP_HOURS = 0.25
+# Год профилей - 365 суток (35040 точек по 15 минут)
+MONTH_DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# Допустимый диапазон напряжений (как в analyze_voltage_violations)
+V_MIN = 0.95
+V_MAX = 1.05
+# Шины, которые не учитываются в отчете о нарушениях (источник и шина до регулятора)
+IGNORED_BUSES = ('150', 'sourcebus')
+
+
+def month_first_day(month):
+    """Номер первых суток месяца (1..365)."""
+    return 1 + sum(MONTH_DAYS[:month - 1])
+
+
+def month_days(months):
+    """Номера суток (1..365), входящих в указанные месяцы."""
+    return [day for m in months for day in range(month_first_day(m), month_first_day(m) + MONTH_DAYS[m - 1])]
+
+
+def month_chunk_path(out_dir, month):
+    return pathlib.Path(out_dir) / f"month_{month:02d}.npz"
+
+
+class AnnualSummary:
+    """
+    Итоги по шинам за произвольный набор шагов: мин/макс напряжения,
+    число шагов с нарушением, пик мощности и потери энергии.
+    Итоги разных кусков года складываются через merge().
+    """
+
+    def __init__(self, node_names, index=None):
+        self.node_names = list(node_names)
+        # index - уже построенный BusNodeIndex для этих же узлов (не строить заново)
+        self.index = index if index is not None else BusNodeIndex(node_names=self.node_names)
+        n = self.index.n_buses
+        self.bus_min = np.full(n, 999.0)
+        self.bus_max = np.zeros(n)
+        self.under_steps = np.zeros(n, dtype=np.int64)
+        self.over_steps = np.zeros(n, dtype=np.int64)
+        self.peak_kw = 0.0
+        self.loss_kwh = 0.0
+        self.steps = 0
+
+    @property
+    def bus_names(self):
+        return self.index.bus_names
+
+    def update(self, v, power_kw, losses_kw):
+        """
+        Добавляет блок шагов: v - матрица (шаг x узел) в p.u.,
+        power_kw / losses_kw - векторы по шагам.
+        """
+        if len(v) == 0:
+            return
+        v = np.asarray(v, dtype=np.float64)
+        step_max = self.index.bus_reduce(np.maximum, v)
+        # Обесточенные узлы (0.0) в минимум не попадают
+        step_min = self.index.bus_reduce(np.minimum, np.where(v > 0.0, v, 999.0))
+
+        self.bus_max = np.maximum(self.bus_max, step_max.max(axis=0))
+        self.bus_min = np.minimum(self.bus_min, step_min.min(axis=0))
+        self.under_steps += ((step_min < V_MIN) & (step_min > 0.001)).sum(axis=0)
+        self.over_steps += (step_max > V_MAX).sum(axis=0)
+        self.peak_kw = max(self.peak_kw, float(np.max(power_kw)))
+        self.loss_kwh += float(np.sum(losses_kw)) * STEP_HOURS
+        self.steps += len(v)
+
+    def merge(self, other):
+        """Объединяет итоги другого куска (с тем же списком узлов)."""
+        if other.node_names != self.node_names:
+            raise ValueError("AnnualSummary.merge: node lists differ")
+        self.bus_min = np.minimum(self.bus_min, other.bus_min)
+        self.bus_max = np.maximum(self.bus_max, other.bus_max)
+        self.under_steps += other.under_steps
+        self.over_steps += other.over_steps
+        self.peak_kw = max(self.peak_kw, other.peak_kw)
+        self.loss_kwh += other.loss_kwh
+        self.steps += other.steps
+        return self
+
+    def violations(self):
+        """Шины с понижением/повышением напряжения: (over, under), как в analyze_voltage_violations."""
+        over, under = set(), set()
+        for i, bus in enumerate(self.bus_names):
+            if bus in IGNORED_BUSES:
+                continue
+            if 0.001 < self.bus_min[i] < V_MIN:
+                under.add(bus)
+            elif self.bus_max[i] > V_MAX:
+                over.add(bus)
+        return over, under
+
+    def to_dict(self):
+        return {
+            "steps": self.steps,
+            "peak_kw": self.peak_kw,
+            "loss_kwh": self.loss_kwh,
+            "buses": {
+                bus: {
+                    "v_min": float(self.bus_min[i]),
+                    "v_max": float(self.bus_max[i]),
+                    "under_steps": int(self.under_steps[i]),
+                    "over_steps": int(self.over_steps[i]),
+                }
+                for i, bus in enumerate(self.bus_names)
+            },
+        }
+
+
+def _read_taps(circuit, out):
+    regs = circuit.RegControls
+    i = 0
+    idx = regs.First
+    while idx > 0:
+        out[i] = regs.TapNumber
+        i += 1
+        idx = regs.Next
+
+
+def _set_taps(circuit, reg_names, taps):
+    regs = circuit.RegControls
+    for name, tap in zip(reg_names, taps):
+        regs.Name = name
+        regs.TapNumber = int(tap)
+
+
+def _save_chunk(path, **arrays):
+    """Сохраняет месяц атомарно: при прерывании на диске не остается битого файла."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load_month(out_dir, month):
+    """Результаты месяца: словарь массивов hour, v, power_kw, losses_kw, taps, converged."""
+    with np.load(month_chunk_path(out_dir, month)) as data:
+        return {key: data[key] for key in data.files}
+
+
+def load_meta(out_dir):
+    try:
+        return json.loads((pathlib.Path(out_dir) / META_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def run_annual(out_dir=DEFAULT_OUT_DIR, pv_enabled=True, temperature=25.0, load_scale=1.0,
+               control_mode="STATIC", months=None, resume=True, progress_every=2880):
+    """
+    Годовой QSTS: схема компилируется один раз, расчет идет шагами по 15 минут
+    подряд через весь год, а результаты каждого месяца пишутся в отдельный
+    month_XX.npz (в памяти - не больше одного месяца).
+
+    control_mode: "STATIC" - регуляторы работают сами (как в реальной сети),
+                  "OFF" - тапы заморожены.
+    resume: готовые месяцы с теми же параметрами пропускаются, расчет
+            продолжается с тапами на конец последнего готового месяца.
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    months = list(months) if months else list(range(1, 13))
+    params = {
+        "pv_enabled": bool(pv_enabled),
+        "temperature": float(temperature),
+        "load_scale": float(load_scale),
+        "control_mode": control_mode.upper(),
+    }
+
+    sim = SimulationCore(use_snapshot=False, day_window=False)
+    circuit = sim.circuit
+    solution = circuit.Solution
+
+    meta = load_meta(out_dir)
+    if meta is not None and meta.get("params") != params:
+        # Результаты с другими параметрами смешивать нельзя: начинаем заново
+        print(config.tr("Annual Params Changed"))
+        for old_chunk in out_dir.glob("month_*.npz"):
+            old_chunk.unlink()
+        meta = None
+    if meta is None:
+        resume = False
+
+    total_steps = sum(MONTH_DAYS[m - 1] for m in months) * STEPS_PER_DAY
+    done_steps = 0
+    computed_steps = 0  # без пропущенных месяцев: по ним считаются скорость и ETA
+    positioned_at = None  # месяц, с начала которого движок продолжит расчет
+    carry_taps = None
+    start_time = time.perf_counter()
+    print(config.tr("Annual Start", len(months), total_steps, out_dir))
+
+    for month in months:
+        n_steps = MONTH_DAYS[month - 1] * STEPS_PER_DAY
+        chunk_path = month_chunk_path(out_dir, month)
+        if resume and chunk_path.exists():
+            with np.load(chunk_path) as data:
+                carry_taps = data["taps"][-1].copy()
+            done_steps += n_steps
+            positioned_at = None
+            print(config.tr("Annual Month Skip", month))
+            continue
+
+        if positioned_at != month:
+            # Первый месяц или продолжение после пропущенных: ставим время на начало месяца
+            sim.reset(day_of_year=month_first_day(month), pv_enabled=pv_enabled,
+                      temperature=temperature, load_scale=load_scale)
+            sim.text.Command = f"Set ControlMode={params['control_mode']}"
+            reg_names = list(circuit.RegControls.AllNames)
+            if carry_taps is not None:
+                _set_taps(circuit, reg_names, carry_taps)
+            if meta is None or not resume:
+                meta = {"params": params, "node_names": list(circuit.AllNodeNames), "reg_names": reg_names}
+                (out_dir / META_FILE).write_text(json.dumps(meta, indent=1))
+
+        n_nodes = len(meta["node_names"])
+        hour = np.zeros(n_steps, dtype=np.float64)
+        v = np.zeros((n_steps, n_nodes), dtype=np.float32)
+        power_kw = np.zeros(n_steps, dtype=np.float32)
+        losses_kw = np.zeros(n_steps, dtype=np.float32)
+        taps = np.zeros((n_steps, len(meta["reg_names"])), dtype=np.int16)
+        converged = np.zeros(n_steps, dtype=bool)
+
+        for i in range(n_steps):
+            solution.Solve()
+            hour[i] = solution.dblHour
+            converged[i] = solution.Converged
+            v[i] = circuit.AllBusVmagPu
+            power_kw[i] = abs(circuit.TotalPower[0])
+            losses_kw[i] = circuit.Losses[0] / 1000.0
+            _read_taps(circuit, taps[i])
+
+            done_steps += 1
+            computed_steps += 1
+            if progress_every and done_steps % progress_every == 0:
+                elapsed = time.perf_counter() - start_time
+                rate = computed_steps / elapsed
+                eta_min = (total_steps - done_steps) / rate / 60 if rate > 0 else 0.0
+                print(config.tr("Annual Progress", done_steps, total_steps,
+                                100.0 * done_steps / total_steps, rate, eta_min))
+
+        _save_chunk(chunk_path, hour=hour, v=v, power_kw=power_kw, losses_kw=losses_kw,
+                    taps=taps, converged=converged)
+        carry_taps = taps[-1].copy()
+        positioned_at = month + 1
+        print(config.tr("Annual Month Saved", month, chunk_path.name))
+
+    print(config.tr("Annual Done", (time.perf_counter() - start_time) / 60))
+    return out_dir
+
+
+def summarize(out_dir=DEFAULT_OUT_DIR, months=None):
+    """Годовые итоги по готовым месяцам (только сошедшиеся шаги)."""
+    meta = load_meta(out_dir)
+    if meta is None:
+        raise FileNotFoundError(pathlib.Path(out_dir) / META_FILE)
+    summary = AnnualSummary(meta["node_names"])
+    for month in (months or range(1, 13)):
+        if not month_chunk_path(out_dir, month).exists():
+            continue
+        data = load_month(out_dir, month)
+        ok = data["converged"]
+        summary.update(data["v"][ok], data["power_kw"][ok], data["losses_kw"][ok])
+    return summary
+
+
+def shard_days(days, n_shards):
+    """Делит список суток на n_shards кусков подряд идущих суток примерно равной длины."""
+    days = sorted(days)
+    n_shards = max(1, min(int(n_shards), len(days)))
+    bounds = np.linspace(0, len(days), n_shards + 1).round().astype(int)
+    return [days[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _consecutive_runs(days):
+    """[1, 2, 3, 10, 11] -> [[1, 2, 3], [10, 11]]"""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][-1] + 1:
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+# Движок рабочего процесса: схема компилируется один раз на процесс,
+# следующие куски восстанавливаются из снимка
+_worker_sim = None
+
+
+def _get_worker_sim():
+    global _worker_sim
+    if _worker_sim is None:
+        _worker_sim = SimulationCore(use_snapshot=True, day_window=False)
+    return _worker_sim
+
+
+def run_shard(days, params, warmup_days=0):
+    """
+    Расчет куска года в текущем процессе, возвращает (AnnualSummary, число шагов).
+
+    Каждый участок подряд идущих суток начинается с исходных тапов схемы;
+    warmup_days суток перед ним считаются, но в итоги не входят - за это
+    время регуляторы (ControlMode=STATIC) приходят в то же состояние,
+    что и при непрерывном расчете года.
+    """
+    sim = _get_worker_sim()
+    circuit = sim.circuit
+    solution = circuit.Solution
+    summary = None
+    computed_steps = 0
+
+    for run in _consecutive_runs(days):
+        first_day = max(1, run[0] - warmup_days)
+        sim.reset(day_of_year=first_day, pv_enabled=params["pv_enabled"],
+                  temperature=params["temperature"], load_scale=params["load_scale"])
+        sim.text.Command = f"Set ControlMode={params['control_mode']}"
+        if summary is None:
+            summary = AnnualSummary(circuit.AllNodeNames)
+
+        for _ in range((run[0] - first_day) * STEPS_PER_DAY):
+            solution.Solve()
+        computed_steps += (run[0] - first_day) * STEPS_PER_DAY
+
+        # Итоги копятся посуточно: в памяти только матрица одних суток
+        v = np.zeros((STEPS_PER_DAY, summary.index.n_nodes))
+        power_kw = np.zeros(STEPS_PER_DAY)
+        losses_kw = np.zeros(STEPS_PER_DAY)
+        converged = np.zeros(STEPS_PER_DAY, dtype=bool)
+        for _ in run:
+            for i in range(STEPS_PER_DAY):
+                solution.Solve()
+                converged[i] = solution.Converged
+                v[i] = circuit.AllBusVmagPu
+                power_kw[i] = abs(circuit.TotalPower[0])
+                losses_kw[i] = circuit.Losses[0] / 1000.0
+            summary.update(v[converged], power_kw[converged], losses_kw[converged])
+            computed_steps += STEPS_PER_DAY
+
+    return summary, computed_steps
+
+
+def _run_shard_task(task):
+    return run_shard(*task)
+
+
+def run_annual_parallel(days=None, n_workers=None, n_shards=None, warmup_days=0, pv_enabled=True,
+                        temperature=25.0, load_scale=1.0, control_mode="STATIC"):
+    """
+    Годовой расчет, разрезанный по суткам на куски для пула процессов.
+    Возвращает объединенный AnnualSummary (результаты по шагам не сохраняются,
+    для них есть run_annual).
+
+    Без warmup_days каждый кусок стартует с исходных тапов, поэтому на
+    границах кусков итоги в режиме STATIC немного отличаются от
+    непрерывного расчета; при ControlMode=OFF они совпадают точно.
+    """
+    days = sorted(days) if days else list(range(1, sum(MONTH_DAYS) + 1))
+    n_workers = n_workers or os.cpu_count() or 1
+    params = {
+        "pv_enabled": bool(pv_enabled),
+        "temperature": float(temperature),
+        "load_scale": float(load_scale),
+        "control_mode": control_mode.upper(),
+    }
+    shards = shard_days(days, n_shards or n_workers)
+    tasks = [(shard, params, warmup_days) for shard in shards]
+    print(config.tr("Annual Parallel Start", len(days), len(shards), n_workers, warmup_days))
+
+    # Бинарное хранилище профилей готовим заранее, чтобы процессы не собирали его наперегонки
+    loadshape_store.resolve_master_file(day_window=False)
+
+    start_time = time.perf_counter()
+    if n_workers == 1:
+        results = map(_run_shard_task, tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_workers)
+        results = pool.map(_run_shard_task, tasks)
+
+    summary = None
+    computed_steps = 0
+    try:
+        for shard, (shard_summary, shard_steps) in zip(shards, results):
+            summary = shard_summary if summary is None else summary.merge(shard_summary)
+            computed_steps += shard_steps
+            print(config.tr("Annual Shard Done", shard[0], shard[-1]))
+    finally:
+        if n_workers > 1:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start_time
+    print(config.tr("Annual Parallel Done", elapsed, computed_steps / elapsed if elapsed > 0 else 0.0))
+    return summary
+
+
+def print_summary(summary):
+    over, under = summary.violations()
+    print(config.tr("Annual Summary", summary.steps, summary.peak_kw, summary.loss_kwh / 1000.0))
+    print(config.tr("Annual Violations", len(under), len(over)))
+    index = {bus: i for i, bus in enumerate(summary.bus_names)}
+    for bus in sorted(under | over, key=lambda b: -(summary.under_steps[index[b]] + summary.over_steps[index[b]])):
+        i = index[bus]
+        print(config.tr("Annual Bus Row", bus, summary.bus_min[i], summary.bus_max[i],
+                        summary.under_steps[i], summary.over_steps[i]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-year QSTS run with monthly NPZ chunks")
+    parser.add_argument("--out", default=str(DEFAULT_OUT_DIR), help="output directory")
+    parser.add_argument("--months", type=int, nargs="+", help="months to run (1..12), default: all")
+    parser.add_argument("--no-pv", action="store_true", help="disable PV systems")
+    parser.add_argument("--temperature", type=float, default=25.0, help="PV panel temperature, C")
+    parser.add_argument("--load-scale", type=float, default=1.0, help="LoadMult")
+    parser.add_argument("--control-mode", choices=["STATIC", "OFF"], default="STATIC",
+                        help="STATIC: regulators act on their own, OFF: taps frozen")
+    parser.add_argument("--no-resume", action="store_true", help="recompute months that already exist")
+    parser.add_argument("--summary-only", action="store_true", help="only summarize existing results")
+    parser.add_argument("--parallel", type=int, metavar="N",
+                        help="shard days across N processes and print the merged summary (no NPZ output)")
+    parser.add_argument("--shards", type=int, help="number of day shards for --parallel (default: N)")
+    parser.add_argument("--warmup-days", type=int, default=0,
+                        help="days simulated before each shard to settle regulator taps")
+    args = parser.parse_args()
+
+    if args.parallel:
+        days = month_days(args.months) if args.months else None
+        print_summary(run_annual_parallel(days, n_workers=args.parallel, n_shards=args.shards,
+                                          warmup_days=args.warmup_days, pv_enabled=not args.no_pv,
+                                          temperature=args.temperature, load_scale=args.load_scale,
+                                          control_mode=args.control_mode))
+        return
+    if not args.summary_only:
+        run_annual(args.out, pv_enabled=not args.no_pv, temperature=args.temperature,
+                   load_scale=args.load_scale, control_mode=args.control_mode,
+                   months=args.months, resume=not args.no_resume)
+    print_summary(summarize(args.out, args.months))
+
+
+if __name__ == "__main__":
+    main()
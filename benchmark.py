@@ -0,0 +1,291 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import pathlib
+import sys
+import time
+import numpy as np
+import config
+from simulation_core import SimulationCore
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+# Базовый результат для сравнения (машинно-зависимый, в git не хранится)
+BASELINE_FILE = BASE_DIR / "bench_baseline.json"
+
+# Фазы горячего цикла RL (имена фаз PhaseProfiler): env_step - весь
+# IEEE123Env.step(), step - SimulationCore.step_vector() внутри него, далее
+# его части; get_state - отладочный вызов вне шага
+PHASES = ["compile", "reset", "env_step", "step", "apply_taps", "solve", "fill_observation",
+          "process_observation", "reward", "get_state"]
+# Поля meta, которые должны совпадать у результата и базового для сравнения
+COMPARABLE_META = ["dss_version", "days", "load_scales", "pv"]
+
+
+def bench_reset(n_resets=5, use_snapshot=True):
+    """
+    Замер скорости SimulationCore.reset() (сбросов в секунду).
+    Первый сброс (полная компиляция) в замер не входит, если включен снимок.
+    """
+    sim = SimulationCore(use_snapshot=use_snapshot)
+    sim.reset(day_of_year=1)
+
+    days = np.random.randint(1, 365, size=n_resets)
+    start = time.perf_counter()
+    for day in days:
+        sim.reset(day_of_year=int(day), load_scale=np.random.uniform(0.8, 1.2))
+    duration = time.perf_counter() - start
+    return n_resets / duration
+
+
+def _phase_stats(profiler):
+    stats = profiler.snapshot()
+    result = {}
+    for name in PHASES:
+        calls = stats.get(name, {}).get("calls", 0)
+        total = stats.get(name, {}).get("total_s", 0.0)
+        result[name] = {"calls": calls, "total_s": total, "us_per_call": total / calls * 1e6 if calls else 0.0}
+    return result
+
+
+def bench_phases(days=(1, 100, 200), load_scales=(1.0,), pv_options=(True, False), n_compiles=3, seed=0):
+    """
+    Поэтапный замер горячего цикла обучения: compile, reset (из снимка) и
+    настоящий IEEE123Env.step() с профилировщиком PhaseProfiler (profiling.py),
+    который раскладывает шаг на применение тапов, Solve(), заполнение
+    obs_buffer, нормализацию наблюдения и награду. После каждого шага
+    отдельно замеряется отладочный get_state().
+
+    Каждый сценарий (сутки x масштаб нагрузки x PV) - полный эпизод из 96 шагов
+    со случайными действиями. Возвращает словарь, пригодный для JSON.
+    """
+    from gym_environment import IEEE123Env
+
+    rng = np.random.default_rng(seed)
+    env = IEEE123Env(profile=True)
+    sim = env.sim
+    profiler = env.profiler
+    # Фазы, которые профилировщик ядра не оборачивает сам
+    profiler.wrap(sim, "compile", "compile")
+    profiler.wrap(sim, "_apply_taps", "apply_taps")
+    profiler.clear()
+
+    for _ in range(n_compiles):
+        sim.compile()
+
+    n_steps = 0
+    for pv_enabled in pv_options:
+        for load_scale in load_scales:
+            for day in days:
+                # Сутки и нагрузка заданы явно (env.reset() выбирает их случайно)
+                sim.reset(day_of_year=int(day), pv_enabled=pv_enabled, load_scale=float(load_scale))
+                actions = rng.integers(0, 3, size=(sim.max_steps, env.n_regulators))
+                done = False
+                i = 0
+                while not done:
+                    _, _, done, _, _ = env.step(actions[i])
+                    sim.get_state()
+                    i += 1
+                n_steps += i
+
+    phases = _phase_stats(profiler)
+    loop_time = phases["env_step"]["total_s"]
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "dss_version": sim.dss.Version.split(" revision")[0],
+            "days": [int(d) for d in days],
+            "load_scales": [float(x) for x in load_scales],
+            "pv": list(pv_options),
+            "steps": n_steps,
+        },
+        "phases": phases,
+        # Шагов в секунду по горячему циклу RL: весь IEEE123Env.step()
+        # (с учетом накладных расходов профилировщика, без get_state())
+        "steps_per_sec": n_steps / loop_time if loop_time else 0.0,
+    }
+
+
+def baseline_mismatch(result, baseline):
+    """Поля COMPARABLE_META, которыми базовый результат отличается от текущего."""
+    base_meta = baseline.get("meta", {})
+    return [key for key in COMPARABLE_META if base_meta.get(key) != result["meta"].get(key)]
+
+
+def compare_with_baseline(result, baseline, tolerance=0.2):
+    """
+    Сравнивает результат с базовым. Регрессия - фаза медленнее базовой
+    больше чем на tolerance (доля) или steps_per_sec ниже на столько же.
+    Возвращает список строк (фаза, базовое, текущее, отношение, регрессия?).
+    """
+    rows = []
+    for name in PHASES:
+        base = baseline.get("phases", {}).get(name, {}).get("us_per_call", 0.0)
+        cur = result["phases"][name]["us_per_call"]
+        if base <= 0 or cur <= 0:
+            continue
+        ratio = cur / base
+        rows.append((name, base, cur, ratio, ratio > 1.0 + tolerance))
+    base_sps = baseline.get("steps_per_sec", 0.0)
+    if base_sps > 0:
+        ratio = base_sps / result["steps_per_sec"] if result["steps_per_sec"] else float("inf")
+        rows.append(("steps_per_sec", base_sps, result["steps_per_sec"], ratio, ratio > 1.0 + tolerance))
+    return rows
+
+
+def _make_bench_env():
+    from gym_environment import IEEE123Env
+    return IEEE123Env()
+
+
+def _vec_env_name(n_envs, vec_env):
+    if n_envs == 1:
+        return "DummyVecEnv"
+    return "ThreadedVecEnv" if vec_env == "threaded" else "SubprocVecEnv"
+
+
+def bench_vec_env(n_envs, n_steps=960, vec_env="subproc"):
+    """
+    Пропускная способность обучения: шагов среды в секунду для n_envs сред
+    (1 - DummyVecEnv, больше - SubprocVecEnv по процессу на среду
+    или ThreadedVecEnv с контекстом OpenDSS на среду).
+    Эпизоды по 96 шагов, так что в замер входят и сбросы.
+    """
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+    name = _vec_env_name(n_envs, vec_env)
+    if name == "ThreadedVecEnv":
+        from threaded_vec_env import make_threaded_vec_env
+        env = make_threaded_vec_env(n_envs)
+    elif name == "SubprocVecEnv":
+        env = SubprocVecEnv([_make_bench_env] * n_envs)
+    else:
+        env = DummyVecEnv([_make_bench_env])
+    env.reset()
+
+    n_regs = len(env.action_space.nvec)
+    actions = np.random.randint(0, 3, size=(n_steps, n_envs, n_regs))
+    start = time.perf_counter()
+    for i in range(n_steps):
+        env.step(actions[i])
+    duration = time.perf_counter() - start
+    env.close()
+    return n_envs * n_steps / duration
+
+
+def _print_phases(result):
+    print(config.tr("Bench Phase Header"))
+    for name, stats in result["phases"].items():
+        print(config.tr("Bench Phase Row", name, stats["calls"], stats["us_per_call"]))
+    print(config.tr("Bench Steps Per Sec", result["steps_per_sec"]))
+
+
+@contextlib.contextmanager
+def _stdout_to_stderr():
+    """
+    Весь вывод (в том числе движка OpenDSS и дочерних процессов VecEnv) на
+    уровне дескриптора 1 уходит в stderr; внутри блока доступен файл с
+    исходным stdout - для JSON при --json -.
+    """
+    sys.stdout.flush()
+    saved = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        with os.fdopen(os.dup(saved), "w") as real_stdout:
+            yield real_stdout
+            real_stdout.flush()
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SimulationCore / IEEE123Env hot loop")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 100, 200], help="days of year to simulate")
+    parser.add_argument("--load-scales", type=float, nargs="+", default=[1.0], help="LoadMult values")
+    parser.add_argument("--pv", choices=["on", "off", "both"], default="both", help="PV systems enabled")
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON to PATH ('-' for stdout)")
+    parser.add_argument("--baseline", metavar="PATH", nargs="?", const=str(BASELINE_FILE),
+                        help="compare with a stored baseline (default path: bench_baseline.json)")
+    parser.add_argument("--save-baseline", metavar="PATH", nargs="?", const=str(BASELINE_FILE),
+                        help="store results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline (fraction)")
+    parser.add_argument("--resets", type=int, default=0, help="also compare compile vs snapshot resets")
+    parser.add_argument("--n-envs", type=int, nargs="*", default=[],
+                        help="also time VecEnv training throughput for these env counts, e.g. --n-envs 1 2 4 8")
+    parser.add_argument("--steps", type=int, default=960, help="VecEnv steps per env")
+    parser.add_argument("--vec-env", choices=["subproc", "threaded"], default="subproc",
+                        help="backend for n_envs > 1")
+    args = parser.parse_args()
+
+    if args.json == "-":
+        # stdout - только JSON (можно передать в jq / json.load), отчет - в stderr
+        with _stdout_to_stderr() as real_stdout:
+            exit_code = _run(args, real_stdout)
+    else:
+        exit_code = _run(args, None)
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def _run(args, json_stream):
+    """Замеры, отчет и сравнение; возвращает код завершения."""
+    pv_options = {"on": (True,), "off": (False,), "both": (True, False)}[args.pv]
+    print(config.tr("Bench Phases Start", len(args.days) * len(args.load_scales) * len(pv_options)))
+    result = bench_phases(args.days, args.load_scales, pv_options)
+    _print_phases(result)
+
+    if args.resets > 0:
+        print(config.tr("Bench Reset Start", args.resets))
+        rps_compile = bench_reset(args.resets, use_snapshot=False)
+        print(config.tr("Bench Reset Compile", rps_compile))
+        rps_snapshot = bench_reset(args.resets, use_snapshot=True)
+        print(config.tr("Bench Reset Snapshot", rps_snapshot))
+        print(config.tr("Bench Speedup", rps_snapshot / rps_compile))
+        result["resets_per_sec"] = {"compile": rps_compile, "snapshot": rps_snapshot}
+
+    for n_envs in args.n_envs:
+        print(config.tr("Bench VecEnv Start", _vec_env_name(n_envs, args.vec_env), args.steps))
+        sps = bench_vec_env(n_envs, args.steps, args.vec_env)
+        print(config.tr("Bench VecEnv Result", n_envs, sps))
+        result.setdefault("vec_env_steps_per_sec", {})[f"{args.vec_env}_{n_envs}"] = sps
+
+    if json_stream is not None:
+        json.dump(result, json_stream, indent=1)
+        json_stream.write("\n")
+    elif args.json:
+        pathlib.Path(args.json).write_text(json.dumps(result, indent=1))
+
+    regressions = 0
+    if args.baseline:
+        baseline_path = pathlib.Path(args.baseline)
+        if not baseline_path.exists():
+            print(config.tr("Bench No Baseline", baseline_path))
+        else:
+            baseline = json.loads(baseline_path.read_text())
+            mismatch = baseline_mismatch(result, baseline)
+            if mismatch:
+                # Другие сутки/PV/версия OpenDSS - разные нагрузки, сравнение бессмысленно
+                for key in mismatch:
+                    print(config.tr("Bench Baseline Mismatch", key, baseline.get("meta", {}).get(key),
+                                    result["meta"][key]))
+                return 2
+            print(config.tr("Bench Compare Header", baseline_path, args.tolerance * 100))
+            for name, base, cur, ratio, regressed in compare_with_baseline(result, baseline, args.tolerance):
+                key = "Bench Compare Regression" if regressed else "Bench Compare Row"
+                print(config.tr(key, name, base, cur, ratio))
+                regressions += regressed
+
+    if args.save_baseline:
+        pathlib.Path(args.save_baseline).write_text(json.dumps(result, indent=1))
+        print(config.tr("Bench Baseline Saved", args.save_baseline))
+
+    if regressions:
+        print(config.tr("Bench Regressions", regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    main()
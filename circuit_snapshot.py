@@ -0,0 +1,134 @@
+import uuid
+
+
+class CircuitSnapshot:
+    """
+    Снимок "чистого" состояния скомпилированной схемы OpenDSS.
+
+    Позволяет один раз выполнить Compile, а при следующих сбросах
+    возвращать схему в исходное состояние прямо в памяти движка:
+    положения тапов, включенность элементов (PV, нагрузки, аварии),
+    открытые/закрытые полюса линий и глобальный LoadMult.
+
+    Элементы, добавленные после снятия снимка (Fault, тестовые Load и т.п.),
+    удалить из OpenDSS нельзя, поэтому при восстановлении они отключаются.
+
+    Чтобы заметить перекомпиляцию схемы кем-то еще (в том числе другого
+    master-файла с теми же элементами), при снятии снимка в схему добавляется
+    кривая-метка: любой Compile начинается с Clear и удаляет ее.
+    """
+
+    def __init__(self, dss_engine):
+        self.dss = dss_engine
+        self.circuit = dss_engine.ActiveCircuit
+        self.circuit_name = ""
+        self.marker = ""
+        self.element_names = []
+        self.enabled = {}
+        self.open_terminals = set()
+        self.taps = {}
+        self.load_mult = 1.0
+        self.max_control_iterations = 0
+
+    @classmethod
+    def capture(cls, dss_engine):
+        """Снимает снимок текущего состояния активной схемы."""
+        snap = cls(dss_engine)
+        circuit = snap.circuit
+        snap.circuit_name = circuit.Name
+        snap.element_names = list(circuit.AllElementNames)
+
+        # Включенность всех элементов и открытые проводники
+        for name in snap.element_names:
+            circuit.SetActiveElement(name)
+            elem = circuit.ActiveCktElement
+            snap.enabled[name] = elem.Enabled
+            snap.open_terminals.update(snap._open_conductors(name, elem))
+
+        # Тапы регуляторов
+        regs = circuit.RegControls
+        idx = regs.First
+        while idx > 0:
+            snap.taps[regs.Name] = regs.TapNumber
+            idx = regs.Next
+
+        snap.load_mult = circuit.Solution.LoadMult
+        snap.max_control_iterations = circuit.Solution.MaxControlIterations
+
+        snap.marker = f"snapshot_{uuid.uuid4().hex[:12]}"
+        dss_engine.Text.Command = f"New XYCurve.{snap.marker} npts=1 xarray=[0] yarray=[0]"
+        return snap
+
+    @staticmethod
+    def _open_conductors(name, elem):
+        """Возвращает множество (элемент, терминал, фаза) с открытыми проводниками."""
+        result = set()
+        if not name.lower().startswith("line."):
+            return result
+        for term in range(1, elem.NumTerminals + 1):
+            if not elem.IsOpen(term, 0):
+                continue
+            for ph in range(1, elem.NumConductors + 1):
+                if elem.IsOpen(term, ph):
+                    result.add((name, term, ph))
+        return result
+
+    def is_valid(self):
+        """
+        Проверяет, что в движке всё ещё та схема, с которой снят снимок
+        (её не перекомпилировали и не заменили другой).
+        """
+        if not self.element_names:
+            return False
+        circuit = self.dss.ActiveCircuit
+        if circuit.Name != self.circuit_name:
+            return False
+        if self.marker not in circuit.XYCurves.AllNames:
+            return False
+        names = circuit.AllElementNames
+        n = len(self.element_names)
+        # Новые элементы добавляются в конец списка, поэтому сравниваем префикс
+        return len(names) >= n and list(names[:n]) == self.element_names
+
+    def restore(self):
+        """Возвращает схему в состояние на момент снимка (без перекомпиляции)."""
+        circuit = self.dss.ActiveCircuit
+        text = self.dss.Text
+
+        # 1. Добавленные после снимка элементы отключаем
+        names = circuit.AllElementNames
+        for name in names[len(self.element_names):]:
+            circuit.SetActiveElement(name)
+            if circuit.ActiveCktElement.Enabled:
+                circuit.ActiveCktElement.Enabled = False
+
+        # 2. Включенность и полюса исходных элементов
+        for name in self.element_names:
+            circuit.SetActiveElement(name)
+            elem = circuit.ActiveCktElement
+            if elem.Enabled != self.enabled[name]:
+                elem.Enabled = self.enabled[name]
+            if name.lower().startswith("line."):
+                for term in range(1, elem.NumTerminals + 1):
+                    if elem.IsOpen(term, 0):
+                        text.Command = f"Close {name} Term={term}"
+        for name, term, ph in self.open_terminals:
+            text.Command = f"Open {name} Term={term} Phase={ph}"
+
+        self.restore_controls()
+
+    def restore_controls(self):
+        """Только тапы регуляторов и параметры решения (полюса и элементы не трогаются)."""
+        circuit = self.dss.ActiveCircuit
+
+        # 3. Тапы регуляторов
+        regs = circuit.RegControls
+        for reg_name, tap in self.taps.items():
+            regs.Name = reg_name
+            if regs.TapNumber != tap:
+                regs.TapNumber = tap
+
+        # 4. Глобальные параметры решения
+        circuit.Solution.LoadMult = self.load_mult
+        circuit.Solution.MaxControlIterations = self.max_control_iterations
+
@@ -54,6 +54,159 @@ TRANSLATIONS = {
         "EN": "ℹ️ This means 1 year of training (35k steps) will take ~{:.1f} minutes."
     },
 
+    # --- Benchmark (benchmark.py) ---
+    "Bench Reset Start": {
+        "RU": "⏳ Замер скорости reset() ({} сбросов)...",
+        "EN": "⏳ Timing reset() ({} resets)..."
+    },
+    "Bench Reset Compile": {
+        "RU": "   Compile при каждом сбросе: {:.3f} сбросов/сек",
+        "EN": "   Compile on every reset: {:.3f} resets/sec"
+    },
+    "Bench Reset Snapshot": {
+        "RU": "   Восстановление из снимка: {:.3f} сбросов/сек",
+        "EN": "   Snapshot restore: {:.3f} resets/sec"
+    },
+    "Bench Speedup": {
+        "RU": "⚡ Ускорение: x{:.1f}",
+        "EN": "⚡ Speedup: x{:.1f}"
+    },
+    "Bench Phases Start": {
+        "RU": "⏳ Поэтапный замер горячего цикла ({} эпизодов по 96 шагов)...",
+        "EN": "⏳ Timing hot-loop phases ({} episodes of 96 steps)..."
+    },
+    "Bench Phase Header": {
+        "RU": "   {:<20} {:>8} {:>12}".format("Фаза", "Вызовов", "мкс/вызов"),
+        "EN": "   {:<20} {:>8} {:>12}".format("Phase", "Calls", "us/call")
+    },
+    "Bench Phase Row": {
+        "RU": "   {:<20} {:>8} {:>12.1f}",
+        "EN": "   {:<20} {:>8} {:>12.1f}"
+    },
+    "Bench Steps Per Sec": {
+        "RU": "⚡ Горячий цикл RL: {:.0f} шагов/сек",
+        "EN": "⚡ RL hot loop: {:.0f} steps/sec"
+    },
+    "Bench No Baseline": {
+        "RU": "⚠️ Базовый результат не найден: {}",
+        "EN": "⚠️ Baseline not found: {}"
+    },
+    "Bench Baseline Mismatch": {
+        "RU": "❌ Базовый результат получен в других условиях ({}: {} -> {}), сравнение невозможно",
+        "EN": "❌ Baseline was measured under different conditions ({}: {} -> {}), refusing to compare"
+    },
+    "Bench Compare Header": {
+        "RU": "📊 Сравнение с {} (допуск {:.0f}%):",
+        "EN": "📊 Comparing with {} (tolerance {:.0f}%):"
+    },
+    "Bench Compare Row": {
+        "RU": "   {:<20} {:>12.1f} -> {:>12.1f}  x{:.2f}",
+        "EN": "   {:<20} {:>12.1f} -> {:>12.1f}  x{:.2f}"
+    },
+    "Bench Compare Regression": {
+        "RU": "❌ {:<20} {:>12.1f} -> {:>12.1f}  x{:.2f}  РЕГРЕССИЯ",
+        "EN": "❌ {:<20} {:>12.1f} -> {:>12.1f}  x{:.2f}  REGRESSION"
+    },
+    "Bench Baseline Saved": {
+        "RU": "💾 Базовый результат сохранен: {}",
+        "EN": "💾 Baseline saved: {}"
+    },
+    "Bench Regressions": {
+        "RU": "❌ Найдено регрессий: {}",
+        "EN": "❌ Regressions found: {}"
+    },
+    "Bench VecEnv Start": {
+        "RU": "⏳ Замер VecEnv ({}, {} шагов на среду)...",
+        "EN": "⏳ Timing VecEnv ({}, {} steps per env)..."
+    },
+    "Bench VecEnv Result": {
+        "RU": "   {} сред: {:.0f} шагов среды/сек",
+        "EN": "   {} envs: {:.0f} env steps/sec"
+    },
+
+    # --- Annual QSTS (annual_qsts.py) ---
+    "Annual Start": {
+        "RU": "📅 Годовой расчет: месяцев {}, шагов {} -> {}",
+        "EN": "📅 Annual run: {} months, {} steps -> {}"
+    },
+    "Annual Params Changed": {
+        "RU": "⚠️ Параметры расчета изменились, готовые месяцы будут пересчитаны.",
+        "EN": "⚠️ Run parameters changed, existing months will be recomputed."
+    },
+    "Annual Month Skip": {
+        "RU": "   Месяц {:02d}: уже рассчитан, пропуск",
+        "EN": "   Month {:02d}: already done, skipping"
+    },
+    "Annual Progress": {
+        "RU": "   {}/{} шагов ({:.1f}%), {:.0f} шагов/сек, осталось ~{:.1f} мин",
+        "EN": "   {}/{} steps ({:.1f}%), {:.0f} steps/sec, ~{:.1f} min left"
+    },
+    "Annual Month Saved": {
+        "RU": "💾 Месяц {:02d} сохранен: {}",
+        "EN": "💾 Month {:02d} saved: {}"
+    },
+    "Annual Done": {
+        "RU": "✅ Годовой расчет завершен за {:.1f} мин.",
+        "EN": "✅ Annual run finished in {:.1f} min."
+    },
+    "Annual Summary": {
+        "RU": "📊 Шагов: {}, пик мощности: {:.1f} кВт, потери: {:.2f} МВт*ч",
+        "EN": "📊 Steps: {}, peak power: {:.1f} kW, losses: {:.2f} MWh"
+    },
+    "Annual Violations": {
+        "RU": "   Шин с понижением напряжения: {}, с повышением: {}",
+        "EN": "   Buses with undervoltage: {}, with overvoltage: {}"
+    },
+    "Annual Bus Row": {
+        "RU": "   {:<10} Vmin={:.4f} Vmax={:.4f}  шагов ниже={} выше={}",
+        "EN": "   {:<10} Vmin={:.4f} Vmax={:.4f}  steps under={} over={}"
+    },
+
+    "Annual Parallel Start": {
+        "RU": "📅 Параллельный годовой расчет: суток {}, кусков {}, процессов {}, разгон {} сут.",
+        "EN": "📅 Parallel annual run: {} days, {} shards, {} processes, {} warm-up days"
+    },
+    "Annual Shard Done": {
+        "RU": "   Сутки {}-{}: готово",
+        "EN": "   Days {}-{}: done"
+    },
+    "Annual Parallel Done": {
+        "RU": "✅ Параллельный расчет завершен за {:.1f} сек ({:.0f} шагов/сек с учетом разгона)",
+        "EN": "✅ Parallel run finished in {:.1f} s ({:.0f} steps/sec incl. warm-up)"
+    },
+
+    # --- Scenario Sweep (scenario_sweep.py) ---
+    "Sweep Start": {
+        "RU": "🧮 Сценариев: {} (из кэша: {}, к расчету: {}), процессов: {}",
+        "EN": "🧮 Scenarios: {} (cached: {}, to compute: {}), processes: {}"
+    },
+    "Sweep Done": {
+        "RU": "✅ Расчет сценариев завершен за {:.1f} сек",
+        "EN": "✅ Scenario sweep finished in {:.1f} s"
+    },
+    "Sweep Not Converged": {
+        "RU": "⚠️ Сценарий не сошелся ни на одном шаге, результат не кэшируется: {}",
+        "EN": "⚠️ Scenario did not converge at any step, result not cached: {}"
+    },
+
+    # --- Loadshape Store (loadshape_store.py) ---
+    "Store Converted": {
+        "RU": "   Профиль {} -> .dbl ({} точек)",
+        "EN": "   Profile {} -> .dbl ({} points)"
+    },
+    "Store Ready": {
+        "RU": "✅ Бинарные профили готовы: пересобрано {} из {}",
+        "EN": "✅ Binary loadshapes ready: rebuilt {} of {}"
+    },
+    "Store Master": {
+        "RU": "Master-файл для Compile: {}",
+        "EN": "Master file for Compile: {}"
+    },
+    "Store Fallback": {
+        "RU": "⚠ Не удалось собрать бинарные профили ({}). Используем CSV.",
+        "EN": "⚠ Failed to build binary loadshapes ({}). Using CSV."
+    },
+
     # --- Plot Topology (plot_topology.py) ---
     "Tree Built": {
         "RU": "Дерево построено. Охвачено узлов: {}",
@@ -235,6 +388,14 @@ TRANSLATIONS = {
         "RU": "💾 Чекпоинты: {}",
         "EN": "💾 Checkpoints: {}"
     },
+    "Training Envs": {
+        "RU": "🧩 Параллельных сред: {} ({})",
+        "EN": "🧩 Parallel environments: {} ({})"
+    },
+    "Threaded Experimental": {
+        "RU": "⚠️ ThreadedVecEnv - экспериментальный режим (потоки движка см. threaded_vec_env.py)",
+        "EN": "⚠️ ThreadedVecEnv is experimental (engine threads: see threaded_vec_env.py)"
+    },
     "Start Training": {
         "RU": "🧠 Старт обучения на {} шагов...",
         "EN": "🧠 Starting training for {} steps..."
@@ -515,6 +676,58 @@ TRANSLATIONS = {
         "RU": "❌ Ошибка: Не к чему подключить монитор для {}",
         "EN": "❌ Error: Nothing to connect monitor to for {}"
     },
+    "Contingency Start": {
+        "RU": "\n⚡ N-1: {} отказов (режим {}), процессов: {}",
+        "EN": "\n⚡ N-1: {} contingencies ({} mode), {} processes"
+    },
+    "Contingency Done": {
+        "RU": "✅ Перебор отказов завершен за {:.1f} сек",
+        "EN": "✅ Contingency scan finished in {:.1f} s"
+    },
+    "Fault Study Done": {
+        "RU": "⚡ Токи КЗ рассчитаны для {} шин за {:.2f} сек",
+        "EN": "⚡ Fault currents computed for {} buses in {:.2f} s"
+    },
+    "Fault Study Button": {
+        "RU": "Токи КЗ",
+        "EN": "Fault Currents"
+    },
+    "Fault Currents Bus": {
+        "RU": "Токи КЗ на шине {}: 3ф {:.0f} А, 1ф {:.0f} А, 2ф {:.0f} А",
+        "EN": "Fault currents at bus {}: 3ph {:.0f} A, SLG {:.0f} A, LL {:.0f} A"
+    },
+    "Fault Currents Colorbar": {
+        "RU": "Ток однофазного КЗ, А",
+        "EN": "SLG fault current, A"
+    },
+    "Job Fault Study": {
+        "RU": "Расчет токов КЗ",
+        "EN": "Fault study"
+    },
+    "Job Node": {
+        "RU": "Узел {}",
+        "EN": "Node {}"
+    },
+    "Job Analyze": {
+        "RU": "Анализ напряжений",
+        "EN": "Voltage analysis"
+    },
+    "Job Progress": {
+        "RU": "⏳ {}: шаг {}/{}",
+        "EN": "⏳ {}: step {}/{}"
+    },
+    "Job Queued": {
+        "RU": "⏳ {}: ожидание расчета",
+        "EN": "⏳ {}: waiting for the worker"
+    },
+    "Worker Error": {
+        "RU": "❌ Ошибка фонового расчета:\n{}",
+        "EN": "❌ Background simulation failed:\n{}"
+    },
+    "Node Cache Hit": {
+        "RU": "\n⚡ Узел {}: результат взят из кэша (те же параметры и состояние регуляторов)",
+        "EN": "\n⚡ Node {}: result loaded from cache (same parameters and regulator state)"
+    },
     "Start Sim Node": {
         "RU": "\n🚀 Запуск симуляции (Узел {})...",
         "EN": "\n🚀 Starting simulation (Node {})..."
@@ -717,4 +930,23 @@ def tr_direct(en_text, ru_text):
     if LANGUAGE == 'EN':
         return en_text
     return ru_text
-AI_LOAD_INCREASE_PERCENT = 20
\ No newline at end of file
+AI_LOAD_INCREASE_PERCENT = 20
+
+# Компилировать схему с бинарными профилями (profiles/bin/*.dbl) вместо CSV
+USE_BINARY_LOADSHAPES = True
+
+# Компилировать схему с суточными профилями (96 точек нужного дня) вместо годовых
+USE_DAY_WINDOW = True
+
+# Кэш результатов кликов по узлам на диске (node_cache/), LRU по размеру
+NODE_CACHE_ENABLED = True
+NODE_CACHE_MAX_MB = 200
+
+# Схема (plot_topology.py): подписи шин показываются, только если в области просмотра их не больше
+TOPOLOGY_MAX_LABELS = 400
+
+# Расчеты из окна схемы - в фоновом процессе (sim_worker.py), окно не блокируется
+SIM_IN_BACKGROUND = True
+
+# Пауза после движения слайдера (мс), после которой пересчитывается открытый узел
+SLIDER_DEBOUNCE_MS = 400
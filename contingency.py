@@ -0,0 +1,299 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+import loadshape_store
+from annual_qsts import AnnualSummary, IGNORED_BUSES, STEPS_PER_DAY, V_MAX, V_MIN
+
+# Виды отказов: обрыв проводника линии (вывод 1) и КЗ на фазу в конце линии
+CASE_KINDS = ("open", "short")
+# Шаг суток для режима snapshot: индекс 0..95 суточного результата, как в
+# run_qsts_plot; шаг k считается на время (k + 1) * 15 мин (72 -> 18:15)
+DEFAULT_SNAPSHOT_STEP = 72
+# Заданий на процесс: куски поменьше выравнивают загрузку пула
+CHUNKS_PER_WORKER = 4
+
+CASE_COLUMNS = ["kind", "line", "phase", "converged_steps", "v_min", "v_max", "n_under", "n_over", "n_dead",
+                "under_buses", "over_buses"]
+
+
+def _line_nodes(bus_spec, n_phases):
+    """'2.2' -> [2]; '1' (без узлов) -> [1, ..., n_phases]."""
+    parts = bus_spec.split('.')
+    nodes = [int(p) for p in parts[1:] if p != '0']
+    return nodes[:n_phases] if nodes else list(range(1, n_phases + 1))
+
+
+def line_conductors(circuit):
+    """
+    {(линия, узел фазы): номер проводника} и {линия: шина конца}. Узлы берутся
+    с вывода 2 (шины конца линии, там же ставится КЗ): узлы выводов могут
+    различаться (bus1=x.1 bus2=y.2), а номер проводника у них общий.
+    """
+    conductors, end_bus = {}, {}
+    lines = circuit.Lines
+    idx = lines.First
+    while idx > 0:
+        for k, node in enumerate(_line_nodes(lines.Bus2, lines.Phases), start=1):
+            conductors[(lines.Name, node)] = k
+        end_bus[lines.Name] = lines.Bus2.split('.')[0]
+        idx = lines.Next
+    return conductors, end_bus
+
+
+def enumerate_cases(circuit, kinds=CASE_KINDS, lines=None):
+    """
+    Отказы N-1: (вид, линия, узел фазы) для каждой фазы каждой линии
+    (или только линий из lines). Узел - номер фазы на шине конца линии.
+    """
+    wanted = {name.lower() for name in lines} if lines else None
+    cases = []
+    for name, node in line_conductors(circuit)[0]:
+        if wanted is None or name in wanted:
+            for kind in kinds:
+                cases.append((kind, name, node))
+    return cases
+
+
+class ContingencyBase:
+    """
+    Базовый режим, скомпилированный один раз на процесс. Каждый отказ -
+    откат тапов по снимку и переключение одного проводника или одного
+    объекта Fault на живой схеме (FaultManager), затем расчет.
+    """
+
+    def __init__(self, params):
+        import dss
+        from circuit_snapshot import CircuitSnapshot
+        from run_qsts_plot import setup_circuit
+
+        self.params = params
+        self.dss = dss.DSS
+        self.circuit = self.dss.ActiveCircuit
+        self.faults = setup_circuit(self.dss, {}, params["pv_enabled"], params["day_of_year"],
+                                    params["temperature"], params["test_load_kw"])
+        text = self.dss.Text
+        text.Command = f"Set LoadMult={params['load_scale']}"
+        text.Command = f"Set ControlMode={params['control_mode']}"
+        text.Command = "Set Number=1"
+        self.start_hour = 0 if config.USE_DAY_WINDOW else (params["day_of_year"] - 1) * 24
+        self.snapshot = CircuitSnapshot.capture(self.dss)
+        self._nodes = None  # (имена узлов, BusNodeIndex) - отказы узлов не меняют
+
+        # Номер проводника линии по узлу фазы (для Open ... Phase=) и шина конца линии
+        self.conductor, self.end_bus = line_conductors(self.circuit)
+
+    def _target(self, case):
+        kind, line, node = case
+        if kind == "base":
+            return {}, set()
+        if kind == "open":
+            return {}, {(f"Line.{line}", 1, self.conductor[(line, node)])}
+        bus = self.end_bus[line]
+        return {f"F_{bus}_{node}": (bus, node)}, set()
+
+    def run_case(self, case):
+        solution = self.circuit.Solution
+        self.snapshot.restore_controls()
+        self.faults.apply_target(*self._target(case))
+
+        if self.params["mode"] == "snapshot":
+            steps = [self.params["snapshot_step"]]
+        else:
+            steps = range(STEPS_PER_DAY)
+        n = len(steps)
+        # Часы задаются на начало шага: Yearly сдвигает время на 15 мин перед
+        # Solve. Set Hour не сбрасывает секунды прошлого расчета, поэтому задаются оба
+        seconds = self.start_hour * 3600 + steps[0] * 900
+        self.dss.Text.Command = f"Set Hour={seconds // 3600} Sec={seconds % 3600}"
+
+        summary = None
+        converged = np.zeros(n, dtype=bool)
+        power_kw = np.zeros(n)
+        losses_kw = np.zeros(n)
+        for k in range(n):
+            solution.Solve()
+            if summary is None:
+                if self._nodes is None:
+                    # Список узлов окончательно формируется при первом расчете
+                    summary = AnnualSummary(self.circuit.AllNodeNames)
+                    self._nodes = (summary.node_names, summary.index)
+                else:
+                    summary = AnnualSummary(*self._nodes)
+                v = np.zeros((n, summary.index.n_nodes))
+            converged[k] = solution.Converged
+            v[k] = self.circuit.AllBusVmagPu
+            power_kw[k] = abs(self.circuit.TotalPower[0])
+            losses_kw[k] = self.circuit.Losses[0] / 1000.0
+        summary.update(v[converged], power_kw[converged], losses_kw[converged])
+        return summary, int(converged.sum())
+
+
+_base = None
+
+
+def _get_base(params):
+    """Базовый режим процесса (перекомпилируется при других параметрах или чужом Compile)."""
+    global _base
+    if _base is None or _base.params != params or not _base.snapshot.is_valid():
+        _base = ContingencyBase(params)
+    return _base
+
+
+def run_cases(params, cases):
+    """
+    Считает отказы в текущем процессе. Возвращает (имена шин, список
+    результатов): метрики случая и массивы bus_min/bus_max по шинам.
+    """
+    base = _get_base(params)
+    bus_names, results = None, []
+    for case in cases:
+        summary, n_converged = base.run_case(case)
+        bus_names = summary.bus_names
+        over, under = summary.violations()
+        ignored = np.isin(summary.bus_names, IGNORED_BUSES)
+        # Обесточенные шины: ни одного ненулевого напряжения
+        dead = (summary.bus_min >= 999.0) & ~ignored
+        live = (summary.bus_min < 999.0) & ~ignored
+        results.append({
+            "converged_steps": n_converged,
+            "v_min": float(summary.bus_min[live].min()) if live.any() else 0.0,
+            "v_max": float(summary.bus_max[~ignored].max()),
+            "n_under": len(under),
+            "n_over": len(over),
+            "n_dead": int(dead.sum()),
+            "under_buses": " ".join(sorted(under)),
+            "over_buses": " ".join(sorted(over)),
+            "bus_min": summary.bus_min.copy(),
+            "bus_max": summary.bus_max.copy(),
+        })
+    return bus_names, results
+
+
+def _run_chunk(args):
+    return run_cases(*args)
+
+
+def make_params(day_of_year=1, temperature=25.0, load_scale=1.0, pv_enabled=True, test_load_kw=0.0,
+                control_mode="STATIC", mode="snapshot", snapshot_step=DEFAULT_SNAPSHOT_STEP):
+    if mode not in ("snapshot", "day"):
+        raise ValueError(f"Unknown mode: {mode}")
+    return {
+        "day_of_year": int(day_of_year),
+        "temperature": float(temperature),
+        "load_scale": float(load_scale),
+        "pv_enabled": bool(pv_enabled),
+        "test_load_kw": float(test_load_kw),
+        "control_mode": control_mode.upper(),
+        "mode": mode,
+        "snapshot_step": int(snapshot_step),
+    }
+
+
+def run_contingencies(params, cases=None, kinds=CASE_KINDS, lines=None, n_workers=None):
+    """
+    N-1 по линиям: каждый случай из cases (по умолчанию - enumerate_cases
+    для kinds/lines) считается на общем базовом режиме процесса.
+
+    Возвращает (cases_df, buses_df): метрики по случаям (первая строка -
+    базовый режим без отказа, столбец severity - число шин с нарушением или
+    без питания сверх базового) и рейтинг шин по числу случаев с нарушением.
+    """
+    if cases is None:
+        cases = enumerate_cases(_get_base(params).circuit, kinds, lines)
+    all_cases = [("base", "", 0)] + list(cases)
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(all_cases)))
+    print(config.tr("Contingency Start", len(cases), params["mode"], n_workers))
+
+    start_time = time.perf_counter()
+    if n_workers == 1:
+        bus_names, results = run_cases(params, all_cases)
+    else:
+        # Бинарное хранилище профилей готовим заранее, чтобы процессы не собирали его наперегонки
+        loadshape_store.resolve_master_file(day_window=config.USE_DAY_WINDOW)
+        n_chunks = min(len(all_cases), n_workers * CHUNKS_PER_WORKER)
+        chunks = [all_cases[i::n_chunks] for i in range(n_chunks)]
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            parts = list(pool.map(_run_chunk, [(params, chunk) for chunk in chunks]))
+        bus_names = parts[0][0]
+        results = [None] * len(all_cases)
+        for i, (_, chunk_results) in enumerate(parts):
+            results[i::n_chunks] = chunk_results
+    print(config.tr("Contingency Done", time.perf_counter() - start_time))
+    return _case_table(all_cases, results), _bus_table(bus_names, results)
+
+
+def _case_table(all_cases, results):
+    base = results[0]
+    rows = []
+    for (kind, line, node), result in zip(all_cases, results):
+        row = {"kind": kind, "line": line, "phase": node}
+        row.update({k: result[k] for k in CASE_COLUMNS[3:]})
+        rows.append(row)
+    table = pd.DataFrame(rows, columns=CASE_COLUMNS)
+    table["severity"] = (table["n_under"] + table["n_over"] + table["n_dead"]
+                         - (base["n_under"] + base["n_over"] + base["n_dead"]))
+    ordered = table.iloc[1:].sort_values(["severity", "v_min"], ascending=[False, True], kind="stable")
+    return pd.concat([table.iloc[:1], ordered], ignore_index=True)
+
+
+def _bus_table(bus_names, results):
+    """Рейтинг шин: в скольких отказах шина вне 0.95..1.05 p.u. или без питания."""
+    bus_min = np.array([r["bus_min"] for r in results[1:]]).reshape(-1, len(bus_names))
+    bus_max = np.array([r["bus_max"] for r in results[1:]]).reshape(-1, len(bus_names))
+    dead = bus_min >= 999.0
+    under = (bus_min < V_MIN) & (bus_min > 0.001)
+    over = (bus_max > V_MAX) & ~under
+    live_min = np.where(dead, np.inf, bus_min)
+    table = pd.DataFrame({
+        "bus": bus_names,
+        "n_under": under.sum(axis=0),
+        "n_over": over.sum(axis=0),
+        "n_dead": dead.sum(axis=0),
+        "worst_v_min": live_min.min(axis=0) if len(bus_min) else np.zeros(len(bus_names)),
+        "worst_v_max": bus_max.max(axis=0) if len(bus_max) else np.zeros(len(bus_names)),
+    })
+    table = table[~table["bus"].isin(IGNORED_BUSES)]
+    table["n_violations"] = table["n_under"] + table["n_over"]
+    return table.sort_values(["n_violations", "n_dead", "worst_v_min"], ascending=[False, False, True],
+                             kind="stable").reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="N-1 contingency scan over line phases (open conductor / phase fault)")
+    parser.add_argument("--kinds", nargs="+", choices=CASE_KINDS, default=list(CASE_KINDS))
+    parser.add_argument("--lines", nargs="+", help="only these lines (default: all)")
+    parser.add_argument("--mode", choices=["snapshot", "day"], default="snapshot",
+                        help="one time step (--step) or the whole day (96 steps)")
+    parser.add_argument("--step", type=int, default=DEFAULT_SNAPSHOT_STEP, help="0-based index of the 96-step day result for snapshot (as in run_qsts_plot); "
+                             "step k is solved at (k+1)*15 min, e.g. 72 -> 18:15")
+    parser.add_argument("--day", type=int, default=1)
+    parser.add_argument("--temperature", type=float, default=25.0)
+    parser.add_argument("--load-scale", type=float, default=1.0)
+    parser.add_argument("--pv", choices=["on", "off"], default="on")
+    parser.add_argument("--test-load", type=float, default=0.0, help="extra load at TestNode, kW")
+    parser.add_argument("--control-mode", choices=["STATIC", "OFF"], default="STATIC")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--top", type=int, default=20, help="rows to print")
+    parser.add_argument("--csv", help="save the case table to CSV")
+    parser.add_argument("--bus-csv", help="save the bus ranking to CSV")
+    args = parser.parse_args()
+
+    params = make_params(args.day, args.temperature, args.load_scale, args.pv == "on", args.test_load,
+                         args.control_mode, args.mode, args.step)
+    cases, buses = run_contingencies(params, kinds=args.kinds, lines=args.lines, n_workers=args.workers)
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        print(cases.drop(columns=["under_buses", "over_buses"]).head(args.top + 1))
+        print()
+        print(buses.head(args.top))
+    if args.csv:
+        cases.to_csv(args.csv, index=False)
+    if args.bus_csv:
+        buses.to_csv(args.bus_csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
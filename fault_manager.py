@@ -0,0 +1,121 @@
+def get_controlling_element(circuit, bus_name):
+    circuit.SetActiveBus(bus_name)
+    connected_elements = circuit.ActiveBus.AllPDEatBus
+    target_element = None
+    target_terminal = 1
+    for elem in connected_elements:
+        if elem.startswith("Line."):
+            target_element = elem
+            circuit.SetActiveElement(elem)
+            buses = circuit.ActiveElement.BusNames
+            if buses[0].split('.')[0] == bus_name: target_terminal = 1
+            else: target_terminal = 2
+            return target_element, target_terminal
+    for elem in connected_elements:
+        if elem.startswith("Transformer."):
+            return elem, 1
+    return None, None
+
+
+def canonical_faults(node_states):
+    """
+    Набор аварий в неизменяемом виде: ((шина, режим, (фазы...)), ...).
+    Принимает словарь состояний узлов из GUI ({шина: {'mode', 'phases'}}) или None.
+    """
+    if not node_states:
+        return ()
+    faults = []
+    for bus, state in node_states.items():
+        if state['mode'] == 'Normal' or not state['phases']:
+            continue
+        faults.append((str(bus), state['mode'], tuple(sorted(int(ph) for ph in state['phases']))))
+    return tuple(sorted(faults))
+
+
+def faults_to_node_states(faults):
+    """Обратное к canonical_faults: словарь в формате setup_circuit()."""
+    return {bus: {'mode': mode, 'phases': list(phases)} for bus, mode, phases in faults}
+
+
+class FaultManager:
+    """
+    Аварии из node_states на живой схеме OpenDSS без перекомпиляции.
+
+    Состояние аварий - два множества: включенные объекты Fault.F_<шина>_<фаза>
+    (КЗ) и разомкнутые проводники (элемент, вывод, фаза) (обрывы). apply()
+    сравнивает его с нужным для нового node_states и выполняет только
+    разницу: New/включение/отключение Fault, Open/Close проводника. Удалить
+    объект из OpenDSS нельзя, поэтому снятое КЗ просто отключается, а при
+    повторной установке включается снова.
+
+    Состояние действительно, пока схему не перекомпилировали: после Compile
+    нужен новый FaultManager.
+    """
+
+    def __init__(self, dss_engine):
+        self.dss = dss_engine
+        self.faults = set()  # имена включенных Fault
+        self.opens = set()  # разомкнутые (элемент, вывод, фаза)
+        self.created = set()  # все созданные объекты Fault (в т.ч. отключенные)
+        self._elements = {}  # шина -> (элемент, вывод) из get_controlling_element
+
+    def _controlling_element(self, bus):
+        if bus not in self._elements:
+            self._elements[bus] = get_controlling_element(self.dss.ActiveCircuit, bus)
+        return self._elements[bus]
+
+    def target(self, node_states_dict):
+        """Нужное состояние: ({имя Fault: (шина, фаза)}, {(элемент, вывод, фаза)})."""
+        faults, opens = {}, set()
+        for bus, state in node_states_dict.items():
+            mode = state['mode']
+            if mode == 'Normal': continue
+            elem, term = self._controlling_element(bus)
+            if not elem: continue
+            for ph in state['phases']:
+                if mode == 'Short Circuit':
+                    faults[f"F_{bus}_{ph}"] = (bus, ph)
+                elif mode == 'Open Line':
+                    opens.add((elem, term, ph))
+        return faults, opens
+
+    def apply(self, node_states_dict):
+        """Приводит аварии схемы к node_states_dict; возвращает число изменений."""
+        return self.apply_target(*self.target(node_states_dict))
+
+    def apply_target(self, faults, opens):
+        """
+        Приводит аварии схемы к заданному состоянию (формат target()): так
+        задаются и аварии не из node_states, например обрыв конкретной линии.
+        """
+        text = self.dss.Text
+        circuit = self.dss.ActiveCircuit
+        opens = set(opens)
+
+        for elem, term, ph in self.opens - opens:
+            text.Command = f"Close {elem} Term={term} Phase={ph}"
+        for elem, term, ph in opens - self.opens:
+            text.Command = f"Open {elem} Term={term} Phase={ph}"
+
+        for name in self.faults - faults.keys():
+            circuit.SetActiveElement(f"Fault.{name}")
+            circuit.ActiveCktElement.Enabled = False
+        for name in faults.keys() - self.faults:
+            if name in self.created:
+                circuit.SetActiveElement(f"Fault.{name}")
+                circuit.ActiveCktElement.Enabled = True
+            else:
+                bus, ph = faults[name]
+                text.Command = f"New Fault.{name} Bus1={bus}.{ph} Phases=1 R=0.005"
+                self.created.add(name)
+
+        changes = len(self.opens ^ opens) + len(self.faults ^ faults.keys())
+        self.faults, self.opens = set(faults), opens
+        return changes
+
+    def state(self):
+        return set(self.faults), set(self.opens)
+
+    def set_state(self, state):
+        """Задает текущее состояние (например, после восстановления снимка схемы)."""
+        self.faults, self.opens = set(state[0]), set(state[1])
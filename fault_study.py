@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import pathlib
+import time
+import numpy as np
+import pandas as pd
+import config
+import loadshape_store
+from node_cache import NodeResultCache
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+DEFAULT_CACHE_DIR = BASE_DIR / "fault_study_cache"
+
+# Токи КЗ по шинам (А): трехфазное, однофазное на землю (SLG) и междуфазное
+FAULT_COLUMNS = ["bus", "i_3ph", "i_slg", "i_ll"]
+# Проводимость места КЗ (См) - та же, что в отчете OpenDSS Show/Export FaultStudy
+FAULT_CONDUCTANCE = 10000.0
+
+
+def _complex(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[0::2] + 1j * values[1::2]
+
+
+def run_fault_study(dss_engine, pv_enabled=True):
+    """
+    Токи КЗ для всех шин схемы одним расчетом OpenDSS Mode=FaultStudy.
+
+    Схема компилируется заново (без аварий и тестовой нагрузки, профили не
+    нужны: расчет не зависит от времени). После Solve у каждой шины есть
+    матрица Тевенина ZscMatrix и напряжения холостого хода Voc; по ним токи
+    считаются так же, как в отчете FaultStudy OpenDSS:
+    - трехфазное КЗ - все узлы шины на землю (Isc шины), максимум по узлам;
+    - SLG - один узел на землю, максимум по узлам;
+    - междуфазное - пара узлов, максимум по парам (0 для однофазных шин).
+    Результат - словарь массивов (столбцы FAULT_COLUMNS).
+    """
+    text = dss_engine.Text
+    circuit = dss_engine.ActiveCircuit
+    text.Command = f'Compile "{loadshape_store.resolve_master_file()}"'
+    pvs = circuit.PVSystems
+    idx = pvs.First
+    while idx > 0:
+        circuit.ActiveCktElement.Enabled = pv_enabled
+        idx = pvs.Next
+
+    text.Command = "Set Mode=FaultStudy"
+    circuit.Solution.Solve()
+
+    n_buses = circuit.NumBuses
+    names = []
+    currents = np.zeros((n_buses, 3))
+    z_fault = 1.0 / FAULT_CONDUCTANCE
+    bus = circuit.ActiveBus
+    for i in range(n_buses):
+        circuit.SetActiveBusi(i)
+        names.append(bus.Name)
+        n = bus.NumNodes
+        z = _complex(bus.ZscMatrix).reshape(n, n)
+        voc = _complex(bus.Voc)
+        diag = np.diag(z)
+        i_3ph = np.abs(_complex(bus.Isc)).max() if n else 0.0
+        i_slg = np.abs(voc / (diag + z_fault)).max() if n else 0.0
+        # Все пары узлов (a < b): I = (Va - Vb) / (Zaa + Zbb - 2 Zab + Zf)
+        a, b = np.triu_indices(n, k=1)
+        i_ll = np.abs((voc[a] - voc[b]) / (diag[a] + diag[b] - 2 * z[a, b] + z_fault)).max() if len(a) else 0.0
+        currents[i] = (i_3ph, i_slg, i_ll)
+    return {
+        "bus": np.array(names, dtype=str),
+        "i_3ph": currents[:, 0],
+        "i_slg": currents[:, 1],
+        "i_ll": currents[:, 2],
+    }
+
+
+def circuit_digest():
+    """
+    Хэш содержимого исходных .dss схемы (без сгенерированных *_bin/*_window).
+    Токи КЗ зависят только от определения схемы, а не от CSV-профилей, поэтому
+    они в хэш не входят; содержимое (а не время изменения) - чтобы кэш не
+    сбрасывался от простого touch/checkout.
+    """
+    generated = (loadshape_store.BIN_SUFFIX + ".dss", loadshape_store.WINDOW_SUFFIX + ".dss")
+    digest = hashlib.sha1()
+    for dss_path in sorted(loadshape_store.QSTS_DIR.glob("*.dss")):
+        if dss_path.name.endswith(generated):
+            continue
+        digest.update(f"{dss_path.name}:{loadshape_store.file_sha1(dss_path)}\n".encode())
+    return digest.hexdigest()
+
+
+def get_fault_study(pv_enabled=True, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """
+    Таблица токов КЗ (DataFrame со столбцами FAULT_COLUMNS). Результат
+    кэшируется на диске по хэшу схемы (circuit_digest) и флагу PV, поэтому
+    расчет повторяется только после изменения .dss.
+    """
+    cache = NodeResultCache(cache_dir) if use_cache else None
+    key = hashlib.sha1(f"{circuit_digest()}\npv={bool(pv_enabled)}".encode()).hexdigest() if cache else None
+    result = cache.get(key) if cache else None
+    if result is None:
+        import dss
+
+        start_time = time.perf_counter()
+        result = run_fault_study(dss.DSS, pv_enabled)
+        print(config.tr("Fault Study Done", len(result["bus"]), time.perf_counter() - start_time))
+        if cache:
+            cache.put(key, result)
+    return pd.DataFrame({name: result[name] for name in FAULT_COLUMNS})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk fault currents for every bus (OpenDSS FaultStudy mode)")
+    parser.add_argument("--pv", choices=["on", "off"], default="on")
+    parser.add_argument("--sort", choices=FAULT_COLUMNS[1:], default="i_slg", help="column to sort by (ascending)")
+    parser.add_argument("--top", type=int, default=20, help="rows to print")
+    parser.add_argument("--csv", help="save the table to CSV")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    table = get_fault_study(args.pv == "on", use_cache=not args.no_cache)
+    # Самые слабые токи КЗ - первыми: там защите сложнее всего отличить КЗ от нагрузки
+    table = table.sort_values(args.sort, kind="stable").reset_index(drop=True)
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.float_format", "{:.1f}".format):
+        print(table.head(args.top))
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,11 @@ class IEEE123Env(gym.Env):
     """
     metadata = {'render_modes': ['console']}
 
-    def __init__(self, pv_enabled=True):
+    def __init__(self, pv_enabled=True, dss_engine=None, profile=None):
         super(IEEE123Env, self).__init__()
         
-        # 1. Инициализация симулятора
-        self.sim = SimulationCore()
+        # 1. Инициализация симулятора (dss_engine - свой контекст OpenDSS для этой среды)
+        self.sim = SimulationCore(dss_engine=dss_engine, profile=profile)
         
         # Получаем список регуляторов, чтобы знать размерность действий
         # (Запускаем холостой сброс, чтобы подгрузить схему)
@@ -40,7 +40,21 @@ class IEEE123Env(gym.Env):
         
         # Размер вектора состояния
         # V (N_sens) + Taps (N_reg) + Power (1) + Time (2: sin/cos)
-        self.obs_dim = self.n_sensors + self.n_regulators + 1 + 2
+        # Раскладка совпадает с SimulationCore.obs_buffer
+        self.obs_dim = self.sim.obs_buffer.size
+
+        # Нормализация obs_buffer одним умножением и сложением:
+        # V: (v - 1.0) * 10, тапы: / 16, мощность: / 5000 кВт, время без изменений
+        self._obs_scale = np.ones(self.obs_dim, dtype=np.float32)
+        self._obs_offset = np.zeros(self.obs_dim, dtype=np.float32)
+        self._obs_scale[self.sim.obs_voltage] = 10.0
+        self._obs_offset[self.sim.obs_voltage] = -10.0
+        self._obs_scale[self.sim.obs_taps] = 1.0 / 16.0
+        self._obs_scale[self.sim.obs_power] = 1.0 / 5000.0
+        self._obs = np.zeros(self.obs_dim, dtype=np.float32)
+
+        # Gym-действие -> направление тапа: 0 -> 0 (Stay), 1 -> +1 (Up), 2 -> -1 (Down)
+        self._action_lut = np.array([0, 1, -1], dtype=np.int64)
         
         # Границы (примерные, для нормализации)
         self.observation_space = spaces.Box(
@@ -51,21 +65,29 @@ class IEEE123Env(gym.Env):
         self.pv_enabled = pv_enabled
         self.day = 1
 
+        # Профилирование: общий с ядром профилировщик, статистика уходит в info['profile']
+        self.profiler = self.sim.profiler
+        if self.profiler is not None:
+            self.profiler.wrap(self, "step", "env_step")
+            self.profiler.wrap(self, "_process_observation", "process_observation")
+            self.profiler.wrap(self, "_calculate_reward", "reward")
+
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         
         # Выбираем случайный день или по порядку (для разнообразия при обучении)
-        self.day = np.random.randint(1, 365) 
+        # (генератор среды: reset(seed=...) / VecEnv.seed() делают эпизоды воспроизводимыми)
+        self.day = int(self.np_random.integers(1, 365))
         # Добавляем случайности в нагрузку (+/- 20%)
-        load_scale = np.random.uniform(0.8, 1.2)
+        load_scale = self.np_random.uniform(0.8, 1.2)
         
-        raw_state = self.sim.reset(
+        self.sim.reset(
             day_of_year=self.day, 
             pv_enabled=self.pv_enabled,
             load_scale=load_scale
         )
         
-        observation = self._process_observation(raw_state)
+        observation = self._process_observation()
         return observation, {}
 
     def step(self, action):
@@ -73,87 +95,52 @@ class IEEE123Env(gym.Env):
         Основной шаг: Агент дает действие -> Среда возвращает (state, reward, done)
         """
         # 1. Преобразование действий Gym -> SimulationCore
-        # Gym выдает [0, 2, 1...], а Core ждет {name: +1/-1/0}
-        # Маппинг: 0 -> 0 (Stay), 1 -> +1 (Up), 2 -> -1 (Down)
-        action_map = {0: 0, 1: 1, 2: -1}
-        
-        core_actions = {}
-        switch_count = 0
-        
-        for i, reg_name in enumerate(self.reg_names):
-            act_idx = action[i]
-            val = action_map[act_idx]
-            core_actions[reg_name] = val
-            if val != 0:
-                switch_count += 1
+        # Gym выдает [0, 2, 1...], а Core ждет массив +1/-1/0 в порядке reg_names
+        directions = self._action_lut[np.asarray(action, dtype=np.int64)]
+        switch_count = int(np.count_nonzero(directions))
 
         # 2. Шаг симуляции
-        raw_state, done = self.sim.step(core_actions)
+        raw_obs, done = self.sim.step_vector(directions)
         
         # 3. Обработка наблюдения
-        observation = self._process_observation(raw_state)
+        observation = self._process_observation()
         
         # 4. Расчет награды (Самое важное!)
-        reward = self._calculate_reward(raw_state, switch_count)
+        reward = self._calculate_reward(raw_obs, switch_count)
         
         # 5. Доп. информация
         info = {
             'day': self.day,
-            'power_kw': raw_state['total_power_kw'],
+            'power_kw': float(raw_obs[self.sim.obs_power]),
             'switches': switch_count
         }
+        if self.profiler is not None:
+            info['profile'] = self.profiler.snapshot()
         
         return observation, reward, done, False, info
 
-    def _process_observation(self, raw_state):
-        """Нормализация данных для нейросети."""
-        obs = []
-        
-        # А. Напряжения: центрируем вокруг 1.0 p.u. (чтобы 1.0 стало 0.0)
-        # Умножаем на 10, чтобы отклонение 0.05 стало 0.5 (заметнее для сети)
-        v_dict = raw_state['voltages']
-        for node in self.sim.sensor_nodes:
-            v_pu = v_dict.get(node, 1.0)
-            obs.append((v_pu - 1.0) * 10.0)
-            
-        # Б. Тапы: нормализуем -16..16 в -1..1
-        t_dict = raw_state['taps']
-        for reg in self.reg_names:
-            t_val = t_dict.get(reg, 0)
-            obs.append(t_val / 16.0)
-            
-        # В. Мощность: нормализуем (допустим макс 5000 кВт)
-        p_val = raw_state['total_power_kw']
-        obs.append(p_val / 5000.0)
-        
-        # Г. Время (цикличность)
-        # Шаг 0..96 -> Угол 0..2pi
-        step_angle = 2 * np.pi * (self.sim.current_step / self.sim.max_steps)
-        obs.append(np.sin(step_angle))
-        obs.append(np.cos(step_angle))
-        
-        return np.array(obs, dtype=np.float32)
+    def _process_observation(self):
+        """
+        Нормализация obs_buffer ядра для нейросети.
+        Возвращается копия: буфер перезаписывается на следующем шаге.
+        """
+        np.multiply(self.sim.obs_buffer, self._obs_scale, out=self._obs)
+        self._obs += self._obs_offset
+        return self._obs.copy()
 
-    def _calculate_reward(self, raw_state, switch_count):
+    def _calculate_reward(self, raw_obs, switch_count):
         """Формула успеха."""
         reward = 0.0
         
-        # 1. Штраф за напряжение (Voltage Penalty)
-        # Идем по всем сенсорам
-        violations = 0
-        total_deviation = 0.0
+        # 1. Штраф за напряжение (Voltage Penalty) - сразу по всем сенсорам
+        v = raw_obs[self.sim.obs_voltage].astype(np.float64)
         
-        for v in raw_state['voltages'].values():
-            # Отклонение от идеала 1.0
-            dev = abs(v - 1.0)
-            total_deviation += dev
-            
-            # Жесткий штраф за выход за границы 0.95 - 1.05
-            if v < 0.95 or v > 1.05:
-                violations += 1
-                reward -= 2.0 # Сильный удар по рукам
+        # Жесткий штраф за выход за границы 0.95 - 1.05 (сильный удар по рукам)
+        violations = int(np.count_nonzero((v < 0.95) | (v > 1.05)))
+        reward -= 2.0 * violations
         
-        # Мягкий штраф за любое отклонение (чтобы стремился к 1.0)
+        # Мягкий штраф за любое отклонение от идеала 1.0 (чтобы стремился к 1.0)
+        total_deviation = float(np.abs(v - 1.0).sum())
         reward -= total_deviation * 0.5
         
         # 2. Штраф за переключения (Switching Penalty)
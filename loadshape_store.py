@@ -0,0 +1,342 @@
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import re
+import threading
+import numpy as np
+import config
+
+# Пути по умолчанию (относительно корня проекта)
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+QSTS_DIR = BASE_DIR / "qsts"
+PROFILES_DIR = BASE_DIR / "profiles"
+BIN_DIR = PROFILES_DIR / "bin"
+MANIFEST_FILE = BIN_DIR / "manifest.json"
+
+# Файлы схемы, в которых профили подключаются через (file=...csv)
+SHAPE_SOURCES = ["IEEE123LoadShapes.dss", "IEEE123PvShapes.dss", "IEEE123Pv.dss"]
+MASTER_SOURCE = "master.dss"
+BIN_SUFFIX = "_bin"
+WINDOW_SUFFIX = "_window"
+# Длина суточного окна по умолчанию (в сутках)
+WINDOW_DAYS = 1
+
+# mult=(file=../profiles/load_profiles/loadshape_S1a.csv) -> группа 1 = путь к CSV
+FILE_REF_RE = re.compile(r"\(\s*file\s*=\s*([^)\s]+)\s*\)", re.IGNORECASE)
+# New Loadshape.<имя> ... / New Tshape.<имя> ...
+NEW_SHAPE_RE = re.compile(r"^\s*New\s+(Loadshape|Tshape)\.(\S+)(.*)$", re.IGNORECASE | re.MULTILINE)
+PROP_FILE_RE = re.compile(r"(\w+)\s*=\s*\(\s*file\s*=\s*([^)\s]+)\s*\)", re.IGNORECASE)
+NPTS_RE = re.compile(r"\bnpts\s*=\s*(\d+)", re.IGNORECASE)
+INTERVAL_RE = re.compile(r"\binterval\s*=\s*([0-9.eE+-]+)", re.IGNORECASE)
+
+# Индекс годовых профилей (заполняется ensure_binary_store) и открытые memmap-массивы
+_shape_index = None
+_yearly_arrays = {}
+
+
+def file_sha1(path):
+    """Контрольная сумма файла (для отслеживания изменений CSV и .dss)."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def variant_name(dss_name, suffix):
+    """IEEE123LoadShapes.dss -> IEEE123LoadShapes_bin.dss (или _window.dss)"""
+    stem, ext = os.path.splitext(dss_name)
+    return f"{stem}{suffix}{ext}"
+
+
+def dbl_path_for(csv_path):
+    """Путь к бинарному файлу (float64) для CSV из папки profiles/."""
+    rel = pathlib.Path(csv_path).resolve().relative_to(PROFILES_DIR)
+    return BIN_DIR / rel.with_suffix(".dbl")
+
+
+def _parse_field(line):
+    """Первое поле строки CSV. Как и OpenDSS (file=), нечисловую строку читаем как 0."""
+    try:
+        return float(line.split(',', 1)[0])
+    except ValueError:
+        return 0.0
+
+
+def _write_atomic(path, data):
+    """
+    Пишет файл через временный и os.replace: параллельные процессы
+    и потоки (SubprocVecEnv, ThreadedVecEnv) никогда не видят наполовину записанный файл.
+    """
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if isinstance(data, str):
+        tmp.write_text(data)
+    else:
+        tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def convert_csv(csv_path, dbl_path):
+    """Читает CSV (первый столбец) и пишет его как сырой массив float64 (формат dblfile OpenDSS)."""
+    # Важно повторить чтение OpenDSS один в один: например, в loadshape_Test.csv
+    # первая строка - комментарий, и OpenDSS превращает её в точку со значением 0
+    with open(csv_path, 'r', encoding='utf-8', errors='replace') as f:
+        values = np.array([_parse_field(line) for line in f if line.strip()], dtype=np.float64)
+    _write_atomic(dbl_path, values.astype('<f8').tobytes())
+    return len(values)
+
+
+def _load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"csv": {}, "dss": {}}
+
+
+def _save_manifest(manifest):
+    _write_atomic(MANIFEST_FILE, json.dumps(manifest, indent=1, sort_keys=True))
+
+
+def _referenced_csvs(dss_file):
+    """Все CSV, на которые ссылается .dss файл (пути относительно папки qsts)."""
+    text = dss_file.read_text()
+    return [(QSTS_DIR / ref).resolve() for ref in FILE_REF_RE.findall(text)]
+
+
+def _csv_is_current(csv_path, entry):
+    """CSV не менялся: сначала быстрая проверка размера/времени, затем контрольная сумма."""
+    if not entry or not dbl_path_for(csv_path).exists():
+        return False
+    stat = csv_path.stat()
+    if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+        return True
+    if entry.get("sha1") == file_sha1(csv_path):
+        # Файл "тронули", но содержимое то же: обновляем только метаданные
+        entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime
+        return True
+    return False
+
+
+def _rewrite_shape_refs(text):
+    """Заменяет (file=...csv) на (dblfile=...dbl) с путями относительно папки qsts."""
+    def repl(match):
+        csv_path = (QSTS_DIR / match.group(1)).resolve()
+        rel = os.path.relpath(dbl_path_for(csv_path), QSTS_DIR)
+        return f"(dblfile={pathlib.PurePath(rel).as_posix()})"
+    return FILE_REF_RE.sub(repl, text)
+
+
+def _window_points(interval, n_days=WINDOW_DAYS):
+    """Число точек окна: сами сутки плюс одна точка для часа 0 (см. day_window_indices)."""
+    return int(n_days) * int(round(24.0 / interval)) + 1
+
+
+def _rewrite_window_refs(text):
+    """
+    Вариант для суточного окна: профили объявляются заглушками,
+    реальные значения подставляет apply_day_window() после Compile.
+
+    Loadshape меняет размер через API, поэтому хватает одной точки. Tshape же
+    в OpenDSS нельзя безопасно перезадать с другим npts (портится память),
+    поэтому его заглушка сразу имеет размер окна WINDOW_DAYS суток.
+    """
+    def repl(match):
+        line = match.group(0)
+        if not FILE_REF_RE.search(line):
+            return line
+        npts = 1
+        if match.group(1).lower() == "tshape":
+            interval = INTERVAL_RE.search(line)
+            npts = _window_points(float(interval.group(1)) if interval else 1.0)
+        line = NPTS_RE.sub(f"npts={npts}", line)
+        return FILE_REF_RE.sub("[" + " ".join(["1"] * npts) + "]", line)
+    return NEW_SHAPE_RE.sub(repl, text)
+
+
+def _rewrite_master(text, suffix):
+    """Перенаправляет Redirect в master.dss на сгенерированные варианты файлов профилей."""
+    for name in SHAPE_SOURCES:
+        pattern = re.compile(rf"^(\s*Redirect\s+){re.escape(name)}\s*$", re.IGNORECASE | re.MULTILINE)
+        text = pattern.sub(lambda m: f"{m.group(1)}{variant_name(name, suffix)}", text)
+    return text
+
+
+def _index_shapes():
+    """
+    Индекс годовых профилей: для каждого Loadshape/Tshape с внешним файлом -
+    число точек, интервал и ключи CSV (относительно profiles/) по свойствам.
+    """
+    shapes = []
+    for source in SHAPE_SOURCES:
+        for cls, name, rest in NEW_SHAPE_RE.findall((QSTS_DIR / source).read_text()):
+            props = {}
+            for prop, ref in PROP_FILE_RE.findall(rest):
+                csv_path = (QSTS_DIR / ref).resolve()
+                props[prop.lower()] = csv_path.relative_to(PROFILES_DIR).as_posix()
+            if not props:
+                continue
+            npts = NPTS_RE.search(rest)
+            interval = INTERVAL_RE.search(rest)
+            shapes.append({
+                "class": cls.lower(),
+                "name": name,
+                "npts": int(npts.group(1)) if npts else 0,
+                "interval": float(interval.group(1)) if interval else 1.0,
+                "props": props,
+            })
+    return shapes
+
+
+def ensure_binary_store(force=False, verbose=False):
+    """
+    Проверяет бинарное хранилище профилей и при необходимости пересобирает его.
+
+    - CSV, у которых изменилась контрольная сумма (или нет .dbl), конвертируются заново.
+    - Сгенерированные .dss (*_bin.dss) переписываются, если изменился исходный .dss.
+
+    Возвращает путь к master_bin.dss.
+    """
+    manifest = _load_manifest()
+    manifest_before = json.dumps(manifest, sort_keys=True)
+    csv_entries = manifest.setdefault("csv", {})
+    dss_entries = manifest.setdefault("dss", {})
+    converted = 0
+
+    # 1. Бинарные профили
+    for source in SHAPE_SOURCES:
+        for csv_path in _referenced_csvs(QSTS_DIR / source):
+            key = csv_path.relative_to(PROFILES_DIR).as_posix()
+            if not force and _csv_is_current(csv_path, csv_entries.get(key)):
+                continue
+            npts = convert_csv(csv_path, dbl_path_for(csv_path))
+            stat = csv_path.stat()
+            csv_entries[key] = {
+                "sha1": file_sha1(csv_path),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "npts": npts,
+            }
+            converted += 1
+            if verbose:
+                print(config.tr("Store Converted", key, npts))
+
+    # 2. Сгенерированные варианты .dss (бинарный годовой и суточное окно)
+    variants = [(BIN_SUFFIX, _rewrite_shape_refs), (WINDOW_SUFFIX, _rewrite_window_refs)]
+    for source in SHAPE_SOURCES + [MASTER_SOURCE]:
+        src_path = QSTS_DIR / source
+        src_hash = file_sha1(src_path)
+        outputs = [(QSTS_DIR / variant_name(source, sfx), sfx, fn) for sfx, fn in variants]
+        if not force and dss_entries.get(source) == src_hash and all(p.exists() for p, _, _ in outputs):
+            continue
+        text = src_path.read_text()
+        header = f"! Generated by loadshape_store.py from {source}. Do not edit.\n"
+        for out_path, sfx, rewrite in outputs:
+            body = _rewrite_master(text, sfx) if source == MASTER_SOURCE else rewrite(text)
+            _write_atomic(out_path, header + body)
+        dss_entries[source] = src_hash
+
+    # 3. Индекс годовых профилей для нарезки суточных окон
+    global _shape_index
+    manifest["shapes"] = _shape_index = _index_shapes()
+
+    if json.dumps(manifest, sort_keys=True) != manifest_before:
+        _save_manifest(manifest)
+    if verbose:
+        print(config.tr("Store Ready", converted, len(csv_entries)))
+    return QSTS_DIR / variant_name(MASTER_SOURCE, BIN_SUFFIX)
+
+
+def day_window_indices(day_of_year, n_days, points_per_day, npts):
+    """
+    Индексы годового массива (с 0) для окна из n_days суток.
+
+    OpenDSS берет для часа h точку с номером round(h / interval), а для часа 0 -
+    последнюю точку профиля. Поэтому окно содержит n_days*points_per_day точек
+    самих суток и еще одну, последнюю, - значение годового профиля на начало суток.
+    """
+    start = (int(day_of_year) - 1) * points_per_day
+    n = int(n_days) * points_per_day
+    idx = np.append(np.arange(start, start + n), start - 1)
+    return idx % npts
+
+
+def _yearly_array(csv_key):
+    """Годовой профиль из бинарного хранилища (memmap, без чтения всего файла)."""
+    arr = _yearly_arrays.get(csv_key)
+    if arr is None:
+        dbl = dbl_path_for(PROFILES_DIR / csv_key)
+        arr = np.memmap(dbl, dtype='<f8', mode='r')
+        _yearly_arrays[csv_key] = arr
+    return arr
+
+
+def apply_day_window(dss_engine, day_of_year, n_days=WINDOW_DAYS):
+    """
+    Подставляет в скомпилированную схему (master_window.dss) суточные профили,
+    вырезанные из годовых. После этого симуляция запускается с Hour=0.
+    Окно длиной n_days != WINDOW_DAYS допустимо только для схем без Tshape из файлов.
+    """
+    global _shape_index
+    if _shape_index is None:
+        ensure_binary_store()
+    circuit = dss_engine.ActiveCircuit
+    loadshapes = circuit.LoadShapes
+
+    for shape in _shape_index:
+        points_per_day = int(round(24.0 / shape["interval"]))
+        windows = {}
+        for prop, csv_key in shape["props"].items():
+            yearly = _yearly_array(csv_key)
+            npts = shape["npts"] or len(yearly)
+            windows[prop] = np.asarray(yearly[day_window_indices(day_of_year, n_days, points_per_day, npts)])
+
+        if shape["class"] == "loadshape":
+            loadshapes.Name = shape["name"]
+            loadshapes.Npts = len(windows["mult"])
+            loadshapes.Pmult = windows["mult"]
+            if "qmult" in windows:
+                loadshapes.Qmult = windows["qmult"]
+        else:
+            # Для Tshape в API нет массива, задаем через команду (repr сохраняет точность).
+            # npts не трогаем: размер заглушки уже равен окну
+            if len(windows["temp"]) != _window_points(shape["interval"]):
+                raise ValueError(f"Tshape.{shape['name']}: window of {n_days} days does not match "
+                                 f"the {WINDOW_DAYS}-day stub in master{WINDOW_SUFFIX}.dss")
+            values = " ".join(repr(float(v)) for v in windows["temp"])
+            dss_engine.Text.Command = f"Edit Tshape.{shape['name']} temp=[{values}]"
+
+
+def resolve_master_file(day_window=False):
+    """
+    Путь к master-файлу для Compile.
+    При USE_BINARY_LOADSHAPES используется бинарный вариант (с автопересборкой),
+    иначе (или при ошибке сборки) - исходный текстовый master.dss.
+    day_window=True - вариант с профилями-заглушками для apply_day_window()
+    (хранилище в этом случае нужно всегда).
+    """
+    if day_window:
+        ensure_binary_store()
+        return QSTS_DIR / variant_name(MASTER_SOURCE, WINDOW_SUFFIX)
+    if config.USE_BINARY_LOADSHAPES:
+        try:
+            return ensure_binary_store()
+        except (OSError, ValueError) as e:
+            print(config.tr("Store Fallback", e))
+    return QSTS_DIR / MASTER_SOURCE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert CSV loadshapes to OpenDSS binary files")
+    parser.add_argument("--force", action="store_true", help="reconvert all profiles")
+    args = parser.parse_args()
+    master = ensure_binary_store(force=args.force, verbose=True)
+    print(config.tr("Store Master", master))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import pathlib
+import numpy as np
+import loadshape_store
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+DEFAULT_CACHE_DIR = BASE_DIR / "node_cache"
+
+
+def model_fingerprint():
+    """
+    Быстрый отпечаток исходных файлов модели (имя, размер, время изменения)
+    для .dss из qsts/ и CSV-профилей. Контрольные суммы здесь не считаются:
+    отпечаток нужен на каждый клик, а stat() ~100 файлов - доли миллисекунды.
+    """
+    generated = (loadshape_store.BIN_SUFFIX + ".dss", loadshape_store.WINDOW_SUFFIX + ".dss")
+    paths = [p for p in loadshape_store.QSTS_DIR.glob("*.dss") if not p.name.endswith(generated)]
+    paths += list(loadshape_store.PROFILES_DIR.rglob("*.csv"))
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+class NodeResultCache:
+    """
+    Кэш результатов расчета узла на диске (по файлу .npz на ключ).
+
+    Ключ - хэш параметров сценария и отпечатка модели. Массивы numpy из
+    результата хранятся как есть, остальные поля - как JSON. При превышении
+    max_bytes удаляются записи, которые дольше всего не читались (время
+    изменения файла обновляется при каждом попадании).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, **params):
+        payload = json.dumps(params, sort_keys=True, default=list)
+        return hashlib.sha1(f"{model_fingerprint()}\n{payload}".encode()).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key):
+        """Результат по ключу или None."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                result = json.loads(str(data["__meta__"]))
+                for name in data.files:
+                    if name != "__meta__":
+                        result[name] = data[name]
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path)  # отметка использования для LRU
+        except OSError:
+            pass
+        return result
+
+    def put(self, key, result):
+        """Сохраняет результат (словарь) атомарно и подрезает кэш до max_bytes."""
+        arrays = {name: value for name, value in result.items() if isinstance(value, np.ndarray)}
+        meta = {name: value for name, value in result.items() if name not in arrays}
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+        self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        entries = []
+        for path in self.cache_dir.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for path in self.cache_dir.glob("*.npz"):
+            path.unlink()
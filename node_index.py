@@ -0,0 +1,121 @@
+import hashlib
+import numpy as np
+
+
+def node_signature(node_names):
+    """Отпечаток состава и порядка узлов (circuit.AllNodeNames)."""
+    return hashlib.sha1("\n".join(node_names).encode()).hexdigest()
+
+
+class BusNodeIndex:
+    """
+    Карта "узел -> шина" для векторной обработки circuit.AllBusVmagPu.
+
+    Строится один раз по circuit.AllNodeNames (порядок совпадает с AllBusVmagPu)
+    и перестраивается только при изменении состава узлов схемы.
+    Позволяет получать средние напряжения шин одним bincount вместо
+    SetActiveBus/VMagAngle в цикле по шинам.
+
+    Без схемы (node_names=...) карта строится по сохраненному списку узлов,
+    например для результатов годового расчета; kVBase при этом не проверяется.
+    """
+
+    def __init__(self, circuit=None, node_names=None):
+        if node_names is None:
+            node_names = circuit.AllNodeNames
+        self.n_nodes = len(node_names)
+        self.signature = node_signature(node_names)
+
+        self.bus_names = []
+        self.bus_pos = {}
+        node_bus = np.empty(self.n_nodes, dtype=np.intp)
+        for i, node in enumerate(node_names):
+            bus = node.split('.')[0].lower()
+            pos = self.bus_pos.get(bus)
+            if pos is None:
+                pos = len(self.bus_names)
+                self.bus_pos[bus] = pos
+                self.bus_names.append(bus)
+            node_bus[i] = pos
+        self.node_bus = node_bus
+        self.n_buses = len(self.bus_names)
+        self.nodes_per_bus = np.bincount(node_bus, minlength=self.n_buses).astype(np.float64)
+        # Узлы, сгруппированные по шинам, и начало каждой группы (для ufunc.reduceat)
+        self.bus_order = np.argsort(node_bus, kind='stable')
+        self.bus_starts = np.concatenate(([0], np.cumsum(self.nodes_per_bus[:-1]))).astype(np.intp) \
+            if self.n_buses else np.zeros(0, dtype=np.intp)
+
+        # Шины без базового напряжения: AllBusVmagPu для них не в p.u.
+        self.bus_has_base = np.ones(self.n_buses, dtype=bool)
+        if circuit is None:
+            return
+        for bus, pos in self.bus_pos.items():
+            circuit.SetActiveBus(bus)
+            if circuit.ActiveBus.kVBase <= 0:
+                self.bus_has_base[pos] = False
+
+    def is_current(self, circuit):
+        """
+        Проверяет, что карта соответствует текущим узлам схемы: число узлов,
+        затем имена и порядок (перекомпиляция может сохранить число узлов).
+        """
+        return circuit.NumNodes == self.n_nodes and node_signature(circuit.AllNodeNames) == self.signature
+
+    def bus_mean(self, vmag_pu):
+        """Среднее напряжение (p.u.) по узлам каждой шины, в порядке bus_names."""
+        sums = np.bincount(self.node_bus, weights=vmag_pu, minlength=self.n_buses)
+        return sums / np.maximum(self.nodes_per_bus, 1.0)
+
+    def bus_reduce(self, ufunc, node_values):
+        """
+        Свертка значений узлов по шинам (np.maximum, np.minimum, ...), в порядке bus_names.
+        Узлы - последняя ось, так что можно свернуть сразу матрицу (шаг x узел).
+        """
+        node_values = np.asarray(node_values)
+        if self.n_buses == 0:
+            return np.zeros(node_values.shape[:-1] + (0,), dtype=node_values.dtype)
+        return ufunc.reduceat(node_values[..., self.bus_order], self.bus_starts, axis=-1)
+
+
+class SensorIndex:
+    """
+    Индексы сенсоров из sensors.json в массиве средних напряжений шин.
+
+    Имя сенсора вида '35.1' указывает на шину '35': как и в исходном
+    SetActiveBus('35.1'), показанием сенсора является среднее по всем узлам шины.
+    """
+
+    def __init__(self, circuit, sensor_nodes):
+        self.sensor_nodes = list(sensor_nodes)
+        self.nodes = BusNodeIndex(circuit)
+        positions = [self.nodes.bus_pos.get(name.split('.')[0].lower(), -1) for name in self.sensor_nodes]
+        self.sensor_bus = np.array(positions, dtype=np.intp)
+        self.found = self.sensor_bus >= 0
+        self.sensor_bus[~self.found] = 0
+
+        # Сенсоры, для которых действует запасное значение 1.0 (шина без kVBase)
+        if self.nodes.n_buses:
+            self.no_base = self.found & ~self.nodes.bus_has_base[self.sensor_bus]
+        else:
+            self.no_base = np.zeros(len(self.sensor_nodes), dtype=bool)
+
+    def is_current(self, circuit):
+        return self.nodes.is_current(circuit)
+
+    def read(self, circuit, out=None):
+        """
+        Напряжения сенсоров (p.u.) одним чтением AllBusVmagPu.
+        Возвращает непрерывный float32 вектор (или заполняет out).
+        Неизвестный сенсор -> 0.0, шина без базового напряжения -> 1.0.
+        """
+        if out is None:
+            out = np.empty(len(self.sensor_nodes), dtype=np.float32)
+        if self.nodes.n_buses == 0:
+            out[:] = 0.0
+            return out
+        vmag = np.asarray(circuit.AllBusVmagPu, dtype=np.float64)
+        bus_v = self.nodes.bus_mean(vmag)
+        np.take(bus_v, self.sensor_bus, out=out)
+        out[~self.found] = 0.0
+        out[self.no_base] = 1.0
+        return out
@@ -2,72 +2,164 @@ import dss
 import pathlib
 import matplotlib.pyplot as plt
 from matplotlib.widgets import RadioButtons, Button, CheckButtons, Slider
-from matplotlib.animation import FuncAnimation
+from matplotlib.collections import LineCollection
+from matplotlib.artist import Artist
+from matplotlib.font_manager import FontProperties
+from matplotlib.colors import LogNorm
+from matplotlib.cm import ScalarMappable
 import numpy as np
 import datetime
 import config
-from run_qsts_plot import run_simulation_for_node, analyze_voltage_violations, clear_regulator_state
+import loadshape_store
+from topology import get_topology
+from run_qsts_plot import compute_node_result, apply_node_result, analyze_voltage_violations, clear_regulator_state, get_regulator_state
+from sim_worker import SimulationWorker
+from fault_study import get_fault_study
 
 # --- ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ ---
 node_states = {}       
 voltage_issues = {'over': set(), 'under': set()}
 fault_markers = []     
 network_tree = {}      
+network_topology = None
 bus_phases = {}        
 bus_to_scatter = {}    
 original_colors = {}   
 
 def build_network_tree(circuit):
-    adj = {}
-    lines = circuit.Lines
-    count = lines.First
-    while count > 0:
-        b1 = lines.Bus1.split('.')[0]
-        b2 = lines.Bus2.split('.')[0]
-        if b1 not in adj: adj[b1] = []
-        if b2 not in adj: adj[b2] = []
-        adj[b1].append(b2)
-        adj[b2].append(b1)
-        count = lines.Next
-    xfmrs = circuit.Transformers
-    count = xfmrs.First
-    while count > 0:
-        buses = circuit.ActiveElement.BusNames
-        if len(buses) >= 2:
-            b1 = buses[0].split('.')[0]
-            b2 = buses[1].split('.')[0]
-            if b1 not in adj: adj[b1] = []
-            if b2 not in adj: adj[b2] = []
-            adj[b1].append(b2)
-            adj[b2].append(b1)
-        count = xfmrs.Next
-    tree = {}
-    visited = set(['150'])
-    queue = ['150']
-    while queue:
-        parent = queue.pop(0)
-        if parent in adj:
-            for neighbor in adj[parent]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    if parent not in tree: tree[parent] = []
-                    tree[parent].append(neighbor)
-                    queue.append(neighbor)
-    print(config.tr("Tree Built", len(visited)))
-    return tree
+    """Дерево {шина: [дочерние шины]} от шины 150 (из общей топологии схемы)."""
+    global network_topology
+    network_topology = get_topology(circuit)
+    print(config.tr("Tree Built", int(network_topology.reachable.sum())))
+    return network_topology.tree()
 
 def get_downstream_nodes(start_nodes):
     result = set()
-    stack = list(start_nodes)
-    while stack:
-        node = stack.pop()
-        if node in result: continue
-        result.add(node)
-        if node in network_tree:
-            for child in network_tree[node]:
-                stack.append(child)
+    for node in start_nodes:
+        if network_topology is not None and node in network_topology:
+            result |= network_topology.subtree(node)
+        else:
+            result.add(node)
     return result
 
+def read_bus_coordinates(circuit):
+    """
+    Имена, координаты (массив n x 2) и узлы всех шин за один проход по
+    индексам шин - без повторных SetActiveBus по имени для каждой линии.
+    """
+    names = list(circuit.AllBusNames)
+    xy = np.zeros((len(names), 2))
+    nodes = []
+    bus = circuit.ActiveBus
+    for i in range(len(names)):
+        circuit.SetActiveBusi(i)
+        xy[i] = bus.x, bus.y
+        nodes.append(tuple(bus.Nodes))
+    return names, xy, nodes
+
+class BusLabels(Artist):
+    """
+    Подписи всех шин одним артистом: при отрисовке координаты переводятся в
+    экранные одним transform, отбрасываются подписи вне оси, а остальные
+    рисуются одним проходом renderer.draw_text с общими шрифтом и gc - без
+    отдельного Text на каждую шину. Если в области просмотра больше
+    max_labels подписей, они не рисуются (зум/сдвиг учитываются сами).
+    """
+
+    def __init__(self, xy, texts, bold, fontsize=10, max_labels=None):
+        super().__init__()
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.lines = [text.split('\n') for text in texts]
+        self.bold = np.asarray(bold, dtype=bool)
+        self.fontsize = fontsize
+        self.max_labels = max_labels
+        self.n_drawn = 0
+        self.set_zorder(3)
+
+    def draw(self, renderer):
+        self.n_drawn = 0
+        if not self.get_visible() or not len(self.xy):
+            return
+        ax = self.axes
+        pts = ax.transData.transform(self.xy)
+        x0, y0, x1, y1 = ax.bbox.extents
+        shown = np.flatnonzero((pts[:, 0] >= x0) & (pts[:, 0] <= x1) & (pts[:, 1] >= y0) & (pts[:, 1] <= y1))
+        if self.max_labels is not None and len(shown) > self.max_labels:
+            return
+
+        fonts = {False: FontProperties(size=self.fontsize), True: FontProperties(size=self.fontsize, weight='bold')}
+        # Выравнивание по центру строки: базовая линия ниже центра на (высота/2 - спуск)
+        _, height, descent = renderer.get_text_width_height_descent("Hg", fonts[False], ismath=False)
+        to_baseline = height / 2 - descent
+        line_height = renderer.points_to_pixels(self.fontsize) * 1.2
+
+        renderer.open_group('bus_labels', gid=self.get_gid())
+        gc = renderer.new_gc()
+        gc.set_clip_rectangle(ax.bbox)
+        gc.set_foreground('black')
+        # Координаты pts отсчитываются снизу, а draw_text у растровых бэкендов - сверху
+        canvas_height = renderer.get_canvas_width_height()[1] if renderer.flipy() else None
+        for k in shown:
+            x, y = pts[k]
+            lines = self.lines[k]
+            first = y + (len(lines) - 1) * line_height / 2
+            font = fonts[bool(self.bold[k])]
+            for j, line in enumerate(lines):
+                baseline = first - j * line_height - to_baseline
+                if canvas_height is not None:
+                    baseline = canvas_height - baseline
+                renderer.draw_text(gc, x, baseline, line, font, 0.0)
+        gc.restore()
+        renderer.close_group('bus_labels')
+        self.n_drawn = len(shown)
+        self.stale = False
+
+
+class BlitAnimator:
+    """
+    Мигание точек схемы с блиттингом. После каждой полной перерисовки
+    (старт, зум, сдвиг, изменение размера) фон оси сохраняется без
+    анимированных артистов; кадр таймера восстанавливает фон и рисует
+    только их (точки узлов, маркеры аварий, легенду), а не всю фигуру.
+
+    update(frame) меняет состояние артистов, get_artists() - текущий список
+    анимированных артистов (у них должен быть animated=True).
+    """
+
+    def __init__(self, fig, ax, update, get_artists, interval=500):
+        self.fig, self.ax = fig, ax
+        self.canvas = fig.canvas
+        self.update = update
+        self.get_artists = get_artists
+        self.background = None
+        self._background_bounds = None
+        self.frame = 0
+        self._draw_cid = self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.timer = self.canvas.new_timer(interval=interval)
+        self.timer.add_callback(self._step)
+        self.timer.start()
+
+    def _draw_artists(self):
+        for artist in sorted(self.get_artists(), key=lambda a: a.get_zorder()):
+            self.ax.draw_artist(artist)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._background_bounds = self.ax.bbox.bounds
+        self._draw_artists()
+
+    def _step(self):
+        self.update(self.frame)
+        self.frame += 1
+        if self.background is None or self._background_bounds != self.ax.bbox.bounds:
+            # Фон снят при другом размере/dpi (например, при сохранении в файл)
+            self.background = None
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_artists()
+        self.canvas.blit(self.ax.bbox)
+
 def plot_interactive_topology():
     global network_tree, bus_phases, bus_to_scatter, original_colors, voltage_issues
     
@@ -79,7 +171,7 @@ def plot_interactive_topology():
     circuit = dss_engine.ActiveCircuit
 
     current_dir = pathlib.Path(__file__).parent.resolve()
-    master_file = current_dir / "qsts" / "master.dss"
+    master_file = loadshape_store.resolve_master_file()
     buscoords_file = current_dir / "qsts" / "Buscoords.dss"
 
     print(config.tr("Loading Circuit", master_file))
@@ -135,16 +227,16 @@ def plot_interactive_topology():
         'normal': {'x': [], 'y': [], 'names': [], 'base_color': 'darkblue'}
     }
 
-    all_bus_names = circuit.AllBusNames
-    for bus in all_bus_names:
+    # Координаты и фазы всех шин - один проход по индексам шин в массивы
+    all_bus_names, bus_xy, all_bus_nodes = read_bus_coordinates(circuit)
+    bus_index = {bus: i for i, bus in enumerate(all_bus_names)}
+    for i, bus in enumerate(all_bus_names):
         if bus == "150" or (bus.startswith("s") and not bus.endswith("r") and bus not in ['s1a']):
             continue
-        circuit.SetActiveBus(bus)
-        x, y = circuit.ActiveBus.x, circuit.ActiveBus.y
+        x, y = bus_xy[i]
         if x != 0 or y != 0:
             node_coords[bus] = (x, y)
-            current_phases = set(circuit.ActiveBus.Nodes)
-            bus_phases[bus] = current_phases
+            bus_phases[bus] = set(all_bus_nodes[i])
             
             if bus in pv_buses: g = 'pv'
             elif bus in loaded_buses: g = 'load'
@@ -157,25 +249,29 @@ def plot_interactive_topology():
             groups[g]['y'].append(y)
             groups[g]['names'].append(bus)
 
+    # Для поиска ближайшего к клику узла (векторно)
+    click_names = list(node_coords)
+    click_xy = np.array([node_coords[b] for b in click_names]).reshape(-1, 2)
+
     fig, ax = plt.subplots(figsize=(16, 14))
     plt.subplots_adjust(left=0.25, bottom=0.25) 
     ax.set_title(config.tr("Plot Title"), fontsize=16)
 
+    # Линии: одна LineCollection на класс фазности вместо ax.plot на каждую линию
+    segments = {3: [], 2: [], 1: []}
     lines = circuit.Lines
     lc = lines.First
     while lc > 0:
-        b1, b2 = lines.Bus1.split('.')[0], lines.Bus2.split('.')[0]
-        circuit.SetActiveBus(b1); x1, y1 = circuit.ActiveBus.x, circuit.ActiveBus.y
-        circuit.SetActiveBus(b2); x2, y2 = circuit.ActiveBus.x, circuit.ActiveBus.y
-        ph = lines.Phases
-        if (x1!=0 or y1!=0) and (x2!=0 or y2!=0):
-            c, w, z = ('black', 2.0, 2) if ph>=3 else (('teal', 1.5, 2) if ph==2 else ('darkgray', 1.0, 1))
-            ax.plot([x1, x2], [y1, y2], c=c, lw=w, zorder=z)
+        i1 = bus_index.get(lines.Bus1.split('.')[0].lower())
+        i2 = bus_index.get(lines.Bus2.split('.')[0].lower())
+        if i1 is not None and i2 is not None and bus_xy[i1].any() and bus_xy[i2].any():
+            segments[min(max(lines.Phases, 1), 3)].append((bus_xy[i1], bus_xy[i2]))
         lc = lines.Next
 
-    ax.plot([],[], c='black', lw=2, label=config.tr("3 Phases"))
-    ax.plot([],[], c='teal', lw=1.5, label=config.tr("2 Phases"))
-    ax.plot([],[], c='darkgray', lw=1, label=config.tr("1 Phase"))
+    line_styles = {3: ('black', 2.0, 2, "3 Phases"), 2: ('teal', 1.5, 2, "2 Phases"), 1: ('darkgray', 1.0, 1, "1 Phase")}
+    for ph, (c, w, z, label) in line_styles.items():
+        ax.add_collection(LineCollection(segments[ph], colors=c, linewidths=w, zorder=z, label=config.tr(label)))
+    ax.autoscale_view()
 
     scatter_objects = {}
     lbl_map = {'load': config.tr("Legend Load"), 'reg': config.tr("Legend Regulator"), 'pv': config.tr("Legend PV"), 'normal': config.tr("Legend Node")}
@@ -190,7 +286,7 @@ def plot_interactive_topology():
         edge = 'orange' if g_name == 'pv' else ('black' if g_name!='normal' else None)
         
         sc = ax.scatter(g['x'], g['y'], s=size, c=g['base_color'], marker=marker, 
-                        label=lbl_map[g_name], zorder=3, edgecolors=edge, picker=5)
+                        label=lbl_map[g_name], zorder=3, edgecolors=edge, picker=5, animated=True)
         
         scatter_objects[g_name] = sc
         pickable_data[sc] = g['names']
@@ -200,21 +296,30 @@ def plot_interactive_topology():
         elif len(colors) == 0: colors = np.empty((0, 4))
         original_colors[g_name] = colors
 
+    # Подписи - один артист BusLabels; при большом числе шин в области
+    # просмотра они не рисуются
+    label_texts, label_xy, label_bold = [], [], []
     for g_name, g in groups.items():
+        fw = 'bold' if g_name in ['load', 'pv', 'reg'] else 'normal'
         for i, txt in enumerate(g['names']):
-            fw = 'bold' if g_name in ['load', 'pv', 'reg'] else 'normal'
             display_text = f"  {txt}"
             if g_name == 'reg' and txt in bus_to_reg_names:
                 reg_list = bus_to_reg_names[txt]
                 reg_str = ",".join(reg_list)
                 display_text = f"  {txt}\n  ({reg_str})" 
-            ax.text(g['x'][i], g['y'][i], display_text, fontsize=10, fontweight=fw, ha='left', va='center')
+            label_texts.append(display_text)
+            label_xy.append((g['x'][i], g['y'][i]))
+            label_bold.append(fw == 'bold')
+    bus_labels = ax.add_artist(BusLabels(label_xy, label_texts, label_bold, fontsize=10,
+                                         max_labels=config.TOPOLOGY_MAX_LABELS))
+    plot_interactive_topology.bus_labels = bus_labels
 
     circuit.SetActiveBus("150")
     if circuit.ActiveBus.x != 0:
         ax.scatter(circuit.ActiveBus.x, circuit.ActiveBus.y, s=300, c='gold', marker='*', label=config.tr("Source"), zorder=6, edgecolors='black')
 
-    ax.legend(loc='upper right', shadow=True)
+    legend = ax.legend(loc='upper right', shadow=True)
+    legend.set_animated(True)  # поверх мигающих точек, рисуется вместе с ними
     ax.axis('equal')
     ax.grid(True, alpha=0.3)
 
@@ -268,6 +373,9 @@ def plot_interactive_topology():
     btn_anal_ax = plt.axes([0.12, 0.35, 0.10, 0.05])
     btn_analyze = Button(btn_anal_ax, config.tr("Analyze V"), color='violet', hovercolor='magenta')
 
+    btn_faults_ax = plt.axes([0.02, 0.16, 0.09, 0.05])
+    btn_faults = Button(btn_faults_ax, config.tr("Fault Study Button"), color='khaki', hovercolor='gold')
+
     slider_load_ax = plt.axes([0.25, 0.18, 0.65, 0.03], facecolor='#ffcccc') 
     slider_load = Slider(slider_load_ax, config.tr("Load Slider"), 0, 5000, valinit=0, valstep=100, color='red')
 
@@ -304,52 +412,180 @@ def plot_interactive_topology():
     plot_interactive_topology.slider_temp = slider_temp
     plot_interactive_topology.slider_load = slider_load
 
+    # Подсветка аварий: для каждой группы точек заранее считаются два массива
+    # цветов (мигание выкл/вкл), кадр анимации только переключает их.
+    # Пересчет - только после изменения аварий или нарушений напряжения.
+    group_pos = {g_name: network_topology.positions(g['names']) for g_name, g in groups.items()}
+    # Фазы узлов битами (1 << фаза), пересечение фаз - одно побитовое И
+    group_phase_bits = {
+        g_name: np.array([sum(1 << ph for ph in bus_phases.get(name, ())) for name in g['names']], dtype=np.int64)
+        for g_name, g in groups.items()
+    }
+    highlight = {'dirty': True, 'colors': None}
+
+    # Слой токов КЗ (fault_study): цвет точки - ток однофазного КЗ на шине
+    fault_overlay = {'on': False, 'pv': None, 'table': None, 'colors': None}
+    fault_cbar_ax = fig.add_axes([0.92, 0.30, 0.012, 0.55])
+    fault_cbar_ax.set_visible(False)
+
+    def set_fault_table(table, pv_on):
+        currents = dict(zip(table['bus'], table['i_slg']))
+        # Шкала по шинам карты без крайних 5%: токи у источника на порядки больше
+        shown = np.array([currents.get(name, 0.0) for g in groups.values() for name in g['names']])
+        shown = shown[shown > 0]
+        vmin, vmax = np.percentile(shown, [5, 95]) if len(shown) else (1.0, 10.0)
+        norm = LogNorm(vmin=vmin, vmax=max(vmax, vmin * 1.01), clip=True)
+        mappable = ScalarMappable(norm=norm, cmap='viridis')
+        overlay_colors = {}
+        for g_name, g in groups.items():
+            colors = original_colors[g_name].copy()
+            i_slg = np.array([currents.get(name, 0.0) for name in g['names']])
+            has = i_slg > 0
+            if has.any(): colors[has] = mappable.to_rgba(i_slg[has])
+            overlay_colors[g_name] = colors
+        fault_cbar_ax.clear()
+        fig.colorbar(mappable, cax=fault_cbar_ax, label=config.tr("Fault Currents Colorbar"))
+        fault_overlay.update(pv=pv_on, table=table.set_index('bus'), colors=overlay_colors)
+
+    def rebuild_highlight():
+        sc_faults = [n for n, s in node_states.items() if s['mode'] == 'Short Circuit']
+        open_faults = [n for n, s in node_states.items() if s['mode'] == 'Open Line']
+        fault_bits = 0
+        for n in sc_faults + open_faults:
+            for ph in node_states[n]['phases']: fault_bits |= 1 << ph
+
+        # Затронутые узлы: ниже обрывов (поддеревья), при КЗ - вся связная сеть
+        affected = network_topology.subtree_mask(open_faults)
+        if sc_faults and len(network_topology.preorder) > 1:
+            affected |= network_topology.reachable
+
+        colors_off, colors_on = {}, {}
+        for g_name in scatter_objects:
+            pos = group_pos[g_name]
+            names = groups[g_name]['names']
+            blink = (pos >= 0) & affected[np.maximum(pos, 0)] & ((group_phase_bits[g_name] & fault_bits) != 0) \
+                if len(pos) else np.zeros(0, dtype=bool)
+            over = np.array([n in voltage_issues['over'] for n in names], dtype=bool) & ~blink
+            under = np.array([n in voltage_issues['under'] for n in names], dtype=bool) & ~blink & ~over
+
+            base = (fault_overlay['colors'] if fault_overlay['on'] else original_colors)[g_name].copy()
+            base[over] = [1, 0.5, 0, 1]
+            base[under] = [0, 0.8, 1, 1]
+            colors_off[g_name] = base
+            colors_on[g_name] = base.copy()
+            colors_on[g_name][blink] = [0.1, 0.1, 0.1, 1]
+        highlight['colors'] = (colors_off, colors_on)
+        highlight['dirty'] = False
+
     blink_state = False
     def animate(frame):
         nonlocal blink_state
         blink_state = not blink_state
-        
-        faults = [bus for bus, state in node_states.items() if state['mode'] != 'Normal']
-        nodes_blink_black = set()
-        
-        if faults:
-            sc_faults = [n for n, s in node_states.items() if s['mode'] == 'Short Circuit']
-            open_faults = [n for n, s in node_states.items() if s['mode'] == 'Open Line']
-            
-            affected = set()
-            if open_faults: affected.update(get_downstream_nodes(open_faults))
-            if sc_faults:
-                affected.update(network_tree.keys())
-                for ch in network_tree.values(): affected.update(ch)
-            
-            for f_node in faults:
-                f_phases = node_states[f_node]['phases']
-                for aff_node in affected:
-                    node_ph = bus_phases.get(aff_node, set())
-                    if not set(f_phases).isdisjoint(node_ph):
-                        nodes_blink_black.add(aff_node)
-
+        if highlight['dirty']: rebuild_highlight()
+        colors = highlight['colors'][blink_state]
         for g_name, sc in scatter_objects.items():
-            new_colors = original_colors[g_name].copy()
-            names = groups[g_name]['names']
-            
-            for i, name in enumerate(names):
-                if name in nodes_blink_black:
-                    if blink_state: new_colors[i] = [0.1, 0.1, 0.1, 1]
-                
-                elif name in voltage_issues['over']:
-                    new_colors[i] = [1, 0.5, 0, 1] 
-                elif name in voltage_issues['under']:
-                    new_colors[i] = [0, 0.8, 1, 1] 
-
-            sc.set_facecolors(new_colors)
-        return scatter_objects.values()
-
-    anim = FuncAnimation(fig, animate, interval=500, blit=False, cache_frame_data=False)
-    plot_interactive_topology.anim = anim 
+            sc.set_facecolors(colors[g_name])
+
+    def animated_artists():
+        return list(scatter_objects.values()) + fault_markers + [legend]
+
+    anim = BlitAnimator(fig, ax, animate, animated_artists, interval=500)
+    plot_interactive_topology.anim = anim
+
+    # --- ФОНОВЫЕ РАСЧЕТЫ ---
+    # Расчеты идут в отдельном процессе (sim_worker), окно не блокируется;
+    # результаты забирает таймер, новый клик вытесняет незавершенный расчет
+    worker = SimulationWorker() if config.SIM_IN_BACKGROUND else None
+    plot_interactive_topology.worker = worker
+    status_text = fig.text(0.25, 0.015, '', fontsize=10, color='dimgray')
+
+    def snapshot_states():
+        return {bus: {'mode': st['mode'], 'phases': list(st['phases'])} for bus, st in node_states.items()}
+
+    def submit_job(kind, params, on_done, label, channel=None):
+        """
+        Расчет kind ('node'/'analyze'); on_done(result) вызывается в потоке GUI.
+        Новое задание канала (по умолчанию - kind) вытесняет прежнее.
+        """
+        if worker is None:
+            run = {"node": compute_node_result, "analyze": analyze_voltage_violations, "fault_study": get_fault_study}[kind]
+            on_done(run(**params))
+            return
+        params = dict(params, start_taps=get_regulator_state())
+
+        def finished(future):
+            if future.cancelled(): return
+            if future.exception() is not None:
+                print(config.tr("Worker Error", future.exception()))
+                return
+            on_done(future.result())
+
+        worker.submit(kind, params, channel=channel, label=label).add_done_callback(finished)
+
+    # Окно графиков последнего кликнутого узла: слайдеры перерисовывают его
+    live_plot = {'bus': None, 'fig': None}
+
+    def live_fig():
+        f = live_plot['fig']
+        return f if f is not None and plt.fignum_exists(f.number) else None
+
+    def submit_node(bus, pv_on, day, temp, load_kw, active_control, ai_mode=False, then=None, live=False, refresh=False):
+        """refresh=True - пересчет открытого окна узла (слайдеры), окно перерисовывается."""
+        params = dict(target_bus_name=bus, node_states_dict=snapshot_states(), pv_enabled=pv_on, day_of_year=day,
+                      temperature=temp, test_load_kw=load_kw, active_control=active_control, ai_mode=ai_mode)
+
+        def on_done(result):
+            if result is None: return
+            if refresh and live_fig() is None: return  # окно узла уже закрыли
+            node_fig = apply_node_result(result, **params, fig=live_fig() if refresh else None)
+            if live: live_plot.update(bus=bus, fig=node_fig)
+            if then is not None: then()
+
+        # Схема в процессе расчета не перекомпилируется: меняются только аварии,
+        # сутки, температура и нагрузка (prepare_circuit). Обновления от
+        # слайдеров - отдельный канал: они не вытесняют каскад/ИИ
+        submit_job("node", dict(params, reuse_compiled=True), on_done, config.tr("Job Node", bus),
+                   channel="live" if refresh else None)
+
+    def refresh_live_plot():
+        """Пересчет открытого узла после слайдеров."""
+        if live_plot['bus'] is None or live_fig() is None: return
+        submit_node(live_plot['bus'], check_pv.get_status()[0], slider_day.val, slider_temp.val, slider_load.val,
+                    active_control=False, live=True, refresh=True)
+
+    # Дребезг: пересчет только после паузы в движении слайдера
+    refresh_timer = fig.canvas.new_timer(interval=config.SLIDER_DEBOUNCE_MS)
+    refresh_timer.single_shot = True
+    refresh_timer.add_callback(refresh_live_plot)
+    plot_interactive_topology.refresh_timer = refresh_timer
+
+    def schedule_refresh(val):
+        refresh_timer.stop()
+        refresh_timer.start()
+
+    for slider in (slider_day, slider_temp, slider_load):
+        slider.on_changed(schedule_refresh)
+
+    def poll_jobs():
+        worker.poll()
+        status = worker.status()
+        if status is None: msg = ''
+        elif status[2]: msg = config.tr("Job Progress", *status)
+        else: msg = config.tr("Job Queued", status[0])
+        if msg != status_text.get_text():
+            status_text.set_text(msg)
+            fig.canvas.draw_idle()
+
+    if worker is not None:
+        poll_timer = fig.canvas.new_timer(interval=100)
+        poll_timer.add_callback(poll_jobs)
+        poll_timer.start()
+        plot_interactive_topology.poll_timer = poll_timer
+        fig.canvas.mpl_connect('close_event', lambda event: worker.close())
 
     def update_markers():
         global fault_markers
+        highlight['dirty'] = True
         for m in fault_markers: m.remove()
         fault_markers.clear()
         for bus, state in node_states.items():
@@ -358,20 +594,16 @@ def plot_interactive_topology():
             x, y = node_coords[bus]
             c, m = ('yellow', 'X') if mode=='Short Circuit' else ('black', 's')
             ec = 'red' if mode=='Short Circuit' else 'white'
-            fault_markers.append(ax.scatter(x, y, s=180, c=c, marker=m, zorder=10, edgecolors=ec, linewidth=1.5))
+            fault_markers.append(ax.scatter(x, y, s=180, c=c, marker=m, zorder=10, edgecolors=ec, linewidth=1.5, animated=True))
 
     def on_plot_click(event):
         if event.inaxes != ax: return 
         
-        click_x, click_y = event.x, event.y
-        closest_bus = None
-        min_dist = float('inf')
-        for bus, (nx, ny) in node_coords.items():
-            screen_pos = ax.transData.transform([(nx, ny)])[0]
-            dist = np.sqrt((screen_pos[0] - click_x)**2 + (screen_pos[1] - click_y)**2)
-            if dist < min_dist:
-                min_dist = dist
-                closest_bus = bus
+        if not click_names: return
+        screen = ax.transData.transform(click_xy)
+        dist = np.hypot(screen[:, 0] - event.x, screen[:, 1] - event.y)
+        nearest = int(np.argmin(dist))
+        closest_bus, min_dist = click_names[nearest], dist[nearest]
         
         if closest_bus and min_dist < 15:
             # --- ЛОГИКА КЛИКОВ (ЛКМ) ---
@@ -399,12 +631,20 @@ def plot_interactive_topology():
                     return
                 node_states[closest_bus] = {'mode': mode_eng, 'phases': selected_phases_list}
             
+            if mode_eng == 'Short Circuit' and fault_overlay['table'] is not None \
+                    and closest_bus in fault_overlay['table'].index:
+                row = fault_overlay['table'].loc[closest_bus]
+                print(config.tr("Fault Currents Bus", closest_bus, row['i_3ph'], row['i_slg'], row['i_ll']))
+
             update_markers()
+            refresh_timer.stop()
+            if worker is not None: worker.cancel("live")
             
             # Запускаем симуляцию в режиме мониторинга (без управления), чтобы просто обновить графики/состояние
-            run_simulation_for_node(closest_bus, node_states, pv_enabled=pv_on, day_of_year=day, temperature=temp, test_load_kw=load_kw, active_control=False)
+            submit_node(closest_bus, pv_on, day, temp, load_kw, active_control=False, live=True)
 
     def on_reset(event):
+        if worker is not None: worker.cancel()
         node_states.clear()
         voltage_issues['over'].clear()
         voltage_issues['under'].clear()
@@ -422,18 +662,9 @@ def plot_interactive_topology():
         temp = slider_temp.val
         load_kw = slider_load.val
 
-        # Run Cascade Control (active_control=True, ai_mode=False)
-        run_simulation_for_node(
-            target,
-            node_states,
-            pv_enabled=pv_on,
-            day_of_year=day,
-            temperature=temp,
-            test_load_kw=load_kw,
-            active_control=True,
-            ai_mode=False
-        )
-        on_analyze(event)
+        # Run Cascade Control (active_control=True, ai_mode=False), then refresh the map
+        submit_node(target, pv_on, day, temp, load_kw, active_control=True, ai_mode=False,
+                    then=lambda: on_analyze(event))
 
     def on_ai_click(event):
         # Use selected node for visualization if available, else '150'
@@ -445,19 +676,9 @@ def plot_interactive_topology():
         temp = slider_temp.val
         load_kw = slider_load.val
 
-        run_simulation_for_node(
-            target,
-            node_states,
-            pv_enabled=pv_on,
-            day_of_year=day,
-            temperature=temp,
-            test_load_kw=load_kw,
-            active_control=True,
-            ai_mode=True
-        )
-
         # Update map immediately after AI simulation
-        on_analyze(event)
+        submit_node(target, pv_on, day, temp, load_kw, active_control=True, ai_mode=True,
+                    then=lambda: on_analyze(event))
 
     def on_analyze(event):
         pv_on = check_pv.get_status()[0]
@@ -465,11 +686,42 @@ def plot_interactive_topology():
         temp = slider_temp.val
         load_kw = slider_load.val
         
-        over, under = analyze_voltage_violations(node_states, pv_on, day, temp, test_load_kw=load_kw)
-        voltage_issues['over'] = over
-        voltage_issues['under'] = under
+
+        def on_done(result):
+            over, under = result
+            voltage_issues['over'] = over
+            voltage_issues['under'] = under
+            highlight['dirty'] = True
+
+        params = dict(node_states_dict=snapshot_states(), pv_enabled=pv_on, day_of_year=day, temperature=temp,
+                      test_load_kw=load_kw, reuse_compiled=True)
+        submit_job("analyze", params, on_done, config.tr("Job Analyze"))
+
+    def show_fault_overlay(on):
+        fault_overlay['on'] = on
+        fault_cbar_ax.set_visible(on)
+        highlight['dirty'] = True
+        fig.canvas.draw_idle()
+
+    def on_fault_study(event):
+        """Вкл/выкл слой токов КЗ; таблица считается один раз (кэш на диске) и при смене PV."""
+        if fault_overlay['on']:
+            show_fault_overlay(False)
+            return
+        pv_on = check_pv.get_status()[0]
+        if fault_overlay['table'] is not None and fault_overlay['pv'] == pv_on:
+            show_fault_overlay(True)
+            return
+
+        def on_done(table):
+            set_fault_table(table, pv_on)
+            show_fault_overlay(True)
+
+        submit_job("fault_study", dict(pv_enabled=pv_on), on_done, config.tr("Job Fault Study"))
 
     fig.canvas.mpl_connect('button_press_event', on_plot_click)
+    btn_faults.on_clicked(on_fault_study)
+    plot_interactive_topology.btn_faults = btn_faults
     btn_reset.on_clicked(on_reset)
     btn_ai.on_clicked(on_ai_click)
     btn_cascade.on_clicked(on_cascade_click)
@@ -0,0 +1,78 @@
+import os
+import time
+from functools import wraps
+
+# Переменная окружения для включения профилирования без правки кода:
+# IEEE123_PROFILE=1 python train_agent.py
+PROFILE_ENV_VAR = "IEEE123_PROFILE"
+
+
+def profiling_enabled(flag=None):
+    """Явный флаг конструктора важнее переменной окружения."""
+    if flag is not None:
+        return bool(flag)
+    return os.environ.get(PROFILE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class PhaseProfiler:
+    """
+    Накопительное время и число вызовов по фазам горячего цикла.
+
+    Методы оборачиваются на уровне экземпляра (wrap), поэтому при выключенном
+    профилировании объекты остаются нетронутыми и накладных расходов нет.
+    """
+
+    def __init__(self):
+        self.total = {}
+        self.calls = {}
+
+    def wrap(self, obj, method_name, phase=None):
+        """Заменяет obj.method_name обёрткой, которая учитывает время фазы phase."""
+        phase = phase or method_name.lstrip("_")
+        method = getattr(obj, method_name)
+        self.total.setdefault(phase, 0.0)
+        self.calls.setdefault(phase, 0)
+        clock = time.perf_counter
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.total[phase] += clock() - start
+                self.calls[phase] += 1
+
+        setattr(obj, method_name, timed)
+        return timed
+
+    def snapshot(self):
+        """Копия статистики: {фаза: {'calls', 'total_s'}}."""
+        return {phase: {"calls": self.calls[phase], "total_s": self.total[phase]} for phase in self.total}
+
+    def clear(self):
+        for phase in self.total:
+            self.total[phase] = 0.0
+            self.calls[phase] = 0
+
+
+class TimedSolution:
+    """
+    Посредник для circuit.Solution: атрибуты объектов dss-python только для
+    чтения, поэтому Solve/SolveNoControl оборачиваются здесь, остальное
+    передается исходному объекту.
+    """
+
+    def __init__(self, solution, profiler):
+        self._solution = solution
+        profiler.wrap(self, "Solve", "solve")
+        profiler.wrap(self, "SolveNoControl", "solve")
+
+    def Solve(self):
+        return self._solution.Solve()
+
+    def SolveNoControl(self):
+        return self._solution.SolveNoControl()
+
+    def __getattr__(self, name):
+        return getattr(self._solution, name)
@@ -1,10 +1,16 @@
 import dss
-import pathlib
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import datetime
 import config # <--- Added config
+import loadshape_store
+from node_index import BusNodeIndex
+from node_cache import NodeResultCache
+from step_recorder import StepRecorder
+from circuit_snapshot import CircuitSnapshot
+from fault_manager import FaultManager, canonical_faults, get_controlling_element
+from topology import get_topology
 from ai_controller import AIController
 
 # --- ГЛОБАЛЬНАЯ ПАМЯТЬ СОСТОЯНИЙ РЕГУЛЯТОРОВ ---
@@ -16,6 +22,10 @@ def clear_regulator_state():
     GLOBAL_REGULATOR_STATE = {}
     print(config.tr("Clear Memory"))
 
+def get_regulator_state():
+    """Копия памяти регуляторов (например, для передачи в фоновый процесс)."""
+    return dict(GLOBAL_REGULATOR_STATE)
+
 # =============================================================================
 # КЛАСС КОНТРОЛЛЕРА
 # =============================================================================
@@ -26,9 +36,9 @@ class GridController:
         self.min_voltage = 0.95
         self.max_voltage = 1.05
         
-        self.parent_map = self._build_topology_map()
-        self.xfmr_to_reg = self._map_transformers_to_regulators()
-        self.reg_chain = self._get_upstream_regulators()
+        # Граф схемы общий и строится один раз на определение схемы (topology.py)
+        self.topology = get_topology(circuit)
+        self.reg_chain = self.topology.regulator_chain(target_bus)
         
         print(config.tr("Controller Node", target_bus))
         if self.reg_chain:
@@ -36,86 +46,6 @@ class GridController:
         else:
             print(config.tr("Warn No Regs"))
 
-    def _build_topology_map(self):
-        adj = {}
-        def add_edge(b1, b2, elem_full_name):
-            b1, b2 = b1.split('.')[0], b2.split('.')[0]
-            if b1 not in adj: adj[b1] = []
-            if b2 not in adj: adj[b2] = []
-            adj[b1].append((b2, elem_full_name))
-            adj[b2].append((b1, elem_full_name))
-
-        lines = self.circuit.Lines
-        idx = lines.First
-        while idx > 0:
-            full_name = self.circuit.ActiveCktElement.Name
-            add_edge(lines.Bus1, lines.Bus2, full_name)
-            idx = lines.Next
-            
-        xfmrs = self.circuit.Transformers
-        idx = xfmrs.First
-        while idx > 0:
-            full_name = self.circuit.ActiveCktElement.Name
-            buses = self.circuit.ActiveCktElement.BusNames
-            if len(buses) >= 2:
-                add_edge(buses[0], buses[1], full_name)
-            idx = xfmrs.Next
-
-        q = ['150']
-        visited = set(['150'])
-        parent_map = {} 
-        
-        while q:
-            curr = q.pop(0)
-            if curr in adj:
-                for neighbor, elem in adj[curr]:
-                    if neighbor not in visited:
-                        visited.add(neighbor)
-                        parent_map[neighbor] = elem 
-                        q.append(neighbor)
-        return parent_map
-
-    def _map_transformers_to_regulators(self):
-        mapping = {}
-        regs = self.circuit.RegControls
-        idx = regs.First
-        while idx > 0:
-            t_name = regs.Transformer
-            t_full = f"Transformer.{t_name}"
-            r_name = regs.Name
-            mapping[t_full] = r_name
-            idx = regs.Next
-        return mapping
-
-    def _get_upstream_regulators(self):
-        chain = []
-        curr = self.target_bus
-        
-        for _ in range(1000): 
-            if curr == '150': break
-            if curr not in self.parent_map: break
-            
-            feeding_elem = self.parent_map[curr] 
-            
-            if feeding_elem.lower().startswith("transformer."):
-                if feeding_elem in self.xfmr_to_reg:
-                    reg_name = self.xfmr_to_reg[feeding_elem]
-                    chain.append(reg_name)
-            
-            self.circuit.SetActiveElement(feeding_elem)
-            buses = self.circuit.ActiveCktElement.BusNames
-            
-            if len(buses) < 2: break
-                
-            b1 = buses[0].split('.')[0]
-            b2 = buses[1].split('.')[0]
-            
-            if b2 == curr: curr = b1
-            elif b1 == curr: curr = b2
-            else: break 
-                
-        return chain 
-
     def check_and_act(self, step_number):
         actions = []
         action_occurred = False
@@ -155,30 +85,16 @@ class GridController:
         
         return actions, action_occurred
 
-def get_controlling_element(circuit, bus_name):
-    circuit.SetActiveBus(bus_name)
-    connected_elements = circuit.ActiveBus.AllPDEatBus
-    target_element = None
-    target_terminal = 1
-    for elem in connected_elements:
-        if elem.startswith("Line."):
-            target_element = elem
-            circuit.SetActiveElement(elem)
-            buses = circuit.ActiveElement.BusNames
-            if buses[0].split('.')[0] == bus_name: target_terminal = 1
-            else: target_terminal = 2
-            return target_element, target_terminal
-    for elem in connected_elements:
-        if elem.startswith("Transformer."):
-            return elem, 1
-    return None, None
-
-def setup_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw=0.0):
+def setup_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw=0.0, day_window=None):
     text = dss_engine.Text
     circuit = dss_engine.ActiveCircuit
-    current_dir = pathlib.Path(__file__).parent.resolve()
-    qsts_master_file = current_dir / "qsts" / "master.dss"
+    if day_window is None:
+        day_window = config.USE_DAY_WINDOW
+    qsts_master_file = loadshape_store.resolve_master_file(day_window=day_window)
     text.Command = f'Compile "{qsts_master_file}"'
+    if day_window:
+        # Профили уже содержат только нужные сутки, расчет начинается с Hour=0
+        loadshape_store.apply_day_window(dss_engine, day_of_year)
 
     if pv_enabled:
         text.Command = "New XYCurve.PvTempEff npts=4 xarray=[-10 25 50 75] yarray=[1.20 1.0 0.80 0.60]"
@@ -197,28 +113,90 @@ def setup_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, tempera
         text.Command = f"New Load.Test_Experiment_Load Bus1=TestNode.1.2.3 Phases=3 kV=4.16 kW={test_load_kw} PF=0.98 Model=1"
         print(config.tr("Load Connected", test_load_kw))
 
-    for bus, state in node_states_dict.items():
-        mode = state['mode']
-        phases = state['phases']
-        if mode == 'Normal': continue
-        elem, term = get_controlling_element(circuit, bus)
-        if not elem: continue
-        for ph in phases:
-            if mode == 'Short Circuit':
-                text.Command = f"New Fault.F_{bus}_{ph} Bus1={bus}.{ph} Phases=1 R=0.005"
-            elif mode == 'Open Line':
-                text.Command = f"Open {elem} Term={term} Phase={ph}"
+    faults = FaultManager(dss_engine)
+    faults.apply(node_states_dict)
     
-    start_hour = (int(day_of_year) - 1) * 24
+    start_hour = 0 if day_window else (int(day_of_year) - 1) * 24
     text.Command = f"Set Mode=Yearly StepSize=15m Hour={start_hour}"
+    return faults
+
+# Схема, последней подготовленная prepare_circuit: снимок, аварии и параметры компиляции
+_prepared = None
+
+def prepare_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw=0.0, day_window=None, reuse=True):
+    """
+    То же, что setup_circuit, но при reuse=True, если в движке уже
+    скомпилирована схема с тем же режимом PV, она не компилируется заново:
+    тапы и LoadMult возвращаются по снимку, аварии меняются только на
+    разницу с предыдущими (FaultManager), а еще меняются сутки (окно
+    профилей / Hour), температура TempOverride и PV и мощность
+    Load.Test_Experiment_Load. Возвращает True, если обошлось без Compile.
+    """
+    global _prepared
+    if day_window is None:
+        day_window = config.USE_DAY_WINDOW
+    key = (bool(pv_enabled), bool(day_window))
+    if reuse and _prepared is not None and _prepared["key"] == key and _prepared["snapshot"].is_valid():
+        _retune_circuit(dss_engine, _prepared, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, day_window)
+        return True
+
+    faults = setup_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, day_window)
+    _prepared = {"key": key, "snapshot": CircuitSnapshot.capture(dss_engine), "faults": faults,
+                 "fault_state": faults.state(), "day": int(day_of_year)}
+    return False
+
+def _retune_circuit(dss_engine, prepared, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, day_window):
+    text = dss_engine.Text
+    circuit = dss_engine.ActiveCircuit
+    snapshot, faults = prepared["snapshot"], prepared["faults"]
+    # Тапы и LoadMult - как сразу после setup_circuit
+    snapshot.restore_controls()
+    try:
+        faults.apply(node_states_dict)
+    except dss.DSSException:
+        # Разница не применилась (например, элемент не найден) - полный откат
+        # по снимку к авариям на момент компиляции и повтор
+        snapshot.restore()
+        faults.set_state(prepared["fault_state"])
+        faults.apply(node_states_dict)
+
+    if day_window and int(day_of_year) != prepared["day"]:
+        loadshape_store.apply_day_window(dss_engine, day_of_year)
+        prepared["day"] = int(day_of_year)
+
+    if pv_enabled:
+        text.Command = f"Edit Tshape.TempOverride temp=[{temperature}]"
+        pvs = circuit.PVSystems
+        idx = pvs.First
+        while idx > 0:
+            text.Command = f"Edit PVSystem.{pvs.Name} temperature={temperature}"
+            idx = pvs.Next
+
+    has_test_load = "test_experiment_load" in circuit.Loads.AllNames
+    if test_load_kw > 0.0:
+        if has_test_load:
+            text.Command = f"Edit Load.Test_Experiment_Load kW={test_load_kw} enabled=yes"
+        else:
+            text.Command = f"New Load.Test_Experiment_Load Bus1=TestNode.1.2.3 Phases=3 kV=4.16 kW={test_load_kw} PF=0.98 Model=1"
+        print(config.tr("Load Connected", test_load_kw))
+    elif has_test_load:
+        text.Command = "Edit Load.Test_Experiment_Load enabled=no"
 
-def analyze_voltage_violations(node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw=0.0):
+    start_hour = 0 if day_window else (int(day_of_year) - 1) * 24
+    text.Command = f"Set Mode=Yearly StepSize=15m Hour={start_hour}"
+
+def analyze_voltage_violations(node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw=0.0, progress=None, reuse_compiled=False):
+    """
+    Суточный расчет всех узлов: множества шин с пере- и недонапряжением.
+    progress(шаг, всего) вызывается после каждого шага (см. sim_worker);
+    reuse_compiled=True - расчет на уже скомпилированной схеме (prepare_circuit).
+    """
     global GLOBAL_REGULATOR_STATE
     dss_engine = dss.DSS
     circuit = dss_engine.ActiveCircuit
     solution = circuit.Solution
     
-    setup_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw)
+    prepare_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, reuse=reuse_compiled)
     
     dss_engine.Text.Command = "Set ControlMode=OFF"
     
@@ -234,12 +212,21 @@ def analyze_voltage_violations(node_states_dict, pv_enabled, day_of_year, temper
     dss_engine.Text.Command = "Set Number=1" 
     
     print(config.tr("Scan Net"))
-    max_v = {}
-    min_v = {}
     max_total_kw = 0.0
+
+    # Напряжения всех узлов за сутки собираем в матрицу (шаг x узел),
+    # а минимумы/максимумы по шинам считаем в конце векторно
+    n_steps = 96
+    node_index = None
+    converged = np.zeros(n_steps, dtype=bool)
     
-    for _ in range(96):
+    for step in range(n_steps):
         solution.Solve()
+        if progress: progress(step + 1, n_steps)
+        if node_index is None:
+            # Список узлов окончательно формируется при первом расчете
+            node_index = BusNodeIndex(circuit)
+            v_matrix = np.zeros((n_steps, node_index.n_nodes))
         if not solution.Converged: continue
         
         # --- Подсчет общей мощности (ИСПРАВЛЕНО: добавлен abs) ---
@@ -250,14 +237,19 @@ def analyze_voltage_violations(node_states_dict, pv_enabled, day_of_year, temper
         except: pass
         # ------------------------------
 
-        all_nodes = circuit.AllNodeNames 
-        all_v = circuit.AllBusVmagPu   
-        for i, node_full in enumerate(all_nodes):
-            v = all_v[i]
-            bus = node_full.split('.')[0]
-            if bus not in max_v: max_v[bus] = 0.0; min_v[bus] = 999.0
-            if v > max_v[bus]: max_v[bus] = v
-            if v < min_v[bus] and v > 0.0: min_v[bus] = v
+        v_matrix[step] = circuit.AllBusVmagPu
+        converged[step] = True
+
+    max_v, min_v = {}, {}
+    if converged.any():
+        v_day = v_matrix[converged]
+        node_max = v_day.max(axis=0)
+        # Обесточенные узлы (0.0) в минимум не попадают; нет живых значений -> 999.0
+        node_min = np.where(v_day > 0.0, v_day, 999.0).min(axis=0)
+        bus_max = node_index.bus_reduce(np.maximum, node_max)
+        bus_min = node_index.bus_reduce(np.minimum, node_min)
+        max_v = dict(zip(node_index.bus_names, bus_max.tolist()))
+        min_v = dict(zip(node_index.bus_names, bus_min.tolist()))
 
     over, under = set(), set()
     # Format the header row using the translated template
@@ -288,14 +280,76 @@ def analyze_voltage_violations(node_states_dict, pv_enabled, day_of_year, temper
     if not over and not under: print(config.tr("No Violations"))
     return over, under
 
+# Кэш результатов кликов по узлам (создается при первом расчете)
+_node_cache = None
+
+def _get_node_cache():
+    global _node_cache
+    if _node_cache is None and config.NODE_CACHE_ENABLED:
+        _node_cache = NodeResultCache(max_bytes=config.NODE_CACHE_MAX_MB * 1024 * 1024)
+    return _node_cache
+
+def compute_node_result(target_bus_name, node_states_dict, pv_enabled=True, day_of_year=1, temperature=25.0, test_load_kw=0.0, active_control=True, ai_mode=False, progress=None, reuse_compiled=False):
+    """
+    Результат расчета узла (из кэша или новый расчет) без графиков и без
+    изменения памяти регуляторов; None, если у узла нет элемента для записи.
+    Может выполняться в фоновом процессе (sim_worker). reuse_compiled=True -
+    пересчет на уже скомпилированной схеме (см. prepare_circuit).
+    """
+    # Режим ИИ не кэшируется: результат зависит от текущего чекпоинта модели
+    cache = None if ai_mode else _get_node_cache()
+    if cache is not None:
+        cache_key = cache.key(
+            bus=target_bus_name, faults=canonical_faults(node_states_dict), pv_enabled=bool(pv_enabled),
+            day_of_year=int(day_of_year), temperature=float(temperature), test_load_kw=float(test_load_kw),
+            active_control=bool(active_control), load_increase=config.AI_LOAD_INCREASE_PERCENT,
+            day_window=config.USE_DAY_WINDOW, start_taps=sorted(GLOBAL_REGULATOR_STATE.items()))
+        result = cache.get(cache_key)
+        if result is not None:
+            print(config.tr("Node Cache Hit", target_bus_name))
+            for line in result["log"]: print(line)
+            return result
+
+    result = _simulate_node(target_bus_name, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, active_control, ai_mode, progress, reuse_compiled)
+    if result is not None and cache is not None: cache.put(cache_key, result)
+    return result
+
+def apply_node_result(result, target_bus_name, node_states_dict, pv_enabled=True, day_of_year=1, temperature=25.0, test_load_kw=0.0, active_control=True, ai_mode=False, fig=None):
+    """
+    Запоминает итоговые отпайки (при управлении) и строит отчет с графиками.
+    fig - уже открытое окно графиков узла, которое нужно перерисовать вместо
+    нового. Возвращает окно с графиками (или None).
+    """
+    if active_control:
+        GLOBAL_REGULATOR_STATE.update(result["final_taps"])
+
+    if result["converged"]:
+        return _plot_node_result(result, target_bus_name, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, active_control, ai_mode, fig)
+    print(config.tr("Solution Diverged"))
+    return None
+
 def run_simulation_for_node(target_bus_name, node_states_dict, pv_enabled=True, day_of_year=1, temperature=25.0, test_load_kw=0.0, active_control=True, ai_mode=False):
-    global GLOBAL_REGULATOR_STATE
+    result = compute_node_result(target_bus_name, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, active_control, ai_mode)
+    if result is None: return
+    apply_node_result(result, target_bus_name, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, active_control, ai_mode)
+
+def _simulate_node(target_bus_name, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, active_control, ai_mode, progress=None, reuse_compiled=False):
+    """
+    Суточный расчет с мониторами на узле. Возвращает все, что нужно для
+    отчета и графиков (без обращения к движку), - это и кладется в кэш.
+    Сообщения регулирования копятся в log, чтобы повторить их при попадании в кэш.
+    """
     dss_engine = dss.DSS
     text = dss_engine.Text
     circuit = dss_engine.ActiveCircuit
     solution = circuit.Solution
+    log = []
 
-    setup_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw)
+    def say(msg):
+        print(msg)
+        log.append(msg)
+
+    prepare_circuit(dss_engine, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, reuse=reuse_compiled)
     
     # Apply global load increase (from config) for ALL modes
     if config.AI_LOAD_INCREASE_PERCENT > 0:
@@ -346,12 +400,10 @@ def run_simulation_for_node(target_bus_name, node_states_dict, pv_enabled=True,
     elem, term = get_controlling_element(circuit, target_bus_name)
     if not elem:
         print(config.tr("Error No Monitor", target_bus_name))
-        return
+        return None
 
-    monitor_vi = f"Mon_Target_{target_bus_name}_VI"
-    monitor_pq = f"Mon_Target_{target_bus_name}_PQ"
-    text.Command = f"New Monitor.{monitor_vi} element={elem} terminal={term} mode=0"
-    text.Command = f"New Monitor.{monitor_pq} element={elem} terminal={term} mode=1 ppolar=no"
+    # V/I/P/Q на выводе элемента пишутся после каждого расчета (вместо пары мониторов)
+    recorder = StepRecorder(circuit, [(elem, term)], capacity=96)
     
     print(config.tr("Start Sim Node", target_bus_name))
     
@@ -360,6 +412,7 @@ def run_simulation_for_node(target_bus_name, node_states_dict, pv_enabled=True,
 
     for step in range(96):
         solution.Solve()
+        recorder.record()
         
         # --- Подсчет общей мощности (ИСПРАВЛЕНО: добавлен abs) ---
         try:
@@ -372,222 +425,252 @@ def run_simulation_for_node(target_bus_name, node_states_dict, pv_enabled=True,
             logs, acts = controller.check_and_act(step)
             if acts:
                 regulation_steps.append(step)
-                for msg in logs: print(msg)
+                for msg in logs: say(msg)
+        if progress: progress(step + 1, 96)
 
+    final_taps = {}
     if active_control:
-        print(config.tr("Final Reg State"))
+        say(config.tr("Final Reg State"))
         regs = circuit.RegControls
         idx = regs.First
         while idx > 0:
             tap_now = regs.TapNumber
-            GLOBAL_REGULATOR_STATE[regs.Name] = tap_now
-            print(f"   - {regs.Name}: {tap_now}")
+            final_taps[regs.Name] = tap_now
+            say(f"   - {regs.Name}: {tap_now}")
             idx = regs.Next
     else:
-        print(config.tr("Info No Change"))
+        say(config.tr("Info No Change"))
+
+    result = {
+        "converged": bool(solution.Converged),
+        "log": log,
+        "final_taps": final_taps,
+        "regulation_steps": regulation_steps,
+        "max_total_kw": max_total_kw,
+    }
+    if not result["converged"]:
+        return result
+
+    df = recorder.frame(0)
+
+    p_cols = [c for c in df.columns if c.strip().startswith('P')]
+    q_cols = [c for c in df.columns if c.strip().startswith('Q')]
+    if term == 2:
+        for col in p_cols + q_cols: df[col] = df[col] * -1.0
+
+    circuit.SetActiveElement(elem)
+    bus_def = circuit.ActiveElement.BusNames[term - 1]
+    parts = bus_def.split('.')
+    circuit.SetActiveBus(target_bus_name)
+    result.update({
+        "columns": list(df.columns),
+        "data": df.to_numpy(dtype=np.float64),
+        "v_cols": [c for c in df.columns if c.startswith('V') and 'Angle' not in c],
+        "i_cols": [c for c in df.columns if c.startswith('I') and 'Angle' not in c],
+        "p_cols": p_cols,
+        "con_phases": parts[1:] if len(parts)>1 else [str(i) for i in range(1, circuit.ActiveElement.NumPhases + 1)],
+        "kv_base": circuit.ActiveBus.kVBase,
+        "num_nodes": circuit.ActiveBus.NumNodes,
+    })
+    return result
+
+def _plot_node_result(result, target_bus_name, node_states_dict, pv_enabled, day_of_year, temperature, test_load_kw, active_control, ai_mode, fig=None):
+    """Отчет по узлу и графики из результата _simulate_node (свежего или из кэша)."""
+    regulation_steps = result["regulation_steps"]
+    max_total_kw = result["max_total_kw"]
+    try:
+        df = pd.DataFrame(result["data"], columns=result["columns"])
+        v_cols, i_cols, p_cols = result["v_cols"], result["i_cols"], result["p_cols"]
+        con_phases = result["con_phases"]
+        
+        target_state = node_states_dict.get(target_bus_name, {'mode': 'Normal', 'phases': []})
+        t_mode, t_phases = target_state['mode'], target_state['phases']
+        sim_date = datetime.date(2020, 1, 1) + datetime.timedelta(days=int(day_of_year) - 1)
+
+        # Localized month name
+        month_idx = sim_date.month
+        month_names = config.tr("Months")
+        if isinstance(month_names, list) and len(month_names) > month_idx:
+             m_name = month_names[month_idx]
+             date_str = f"{sim_date.day} {m_name}"
+        else:
+             date_str = sim_date.strftime("%d %B")
 
-    if solution.Converged:
-        text.Command = f"Export Monitor {monitor_vi}"
-        file_vi = text.Result
-        text.Command = f"Export Monitor {monitor_pq}"
-        file_pq = text.Result
-        try:
-            df_vi = pd.read_csv(file_vi)
-            df_pq = pd.read_csv(file_pq)
-            df = pd.concat([df_vi, df_pq], axis=1)
-
-            p_cols = [c for c in df.columns if c.strip().startswith('P')]
-            q_cols = [c for c in df.columns if c.strip().startswith('Q')]
-            if term == 2:
-                for col in p_cols + q_cols: df[col] = df[col] * -1.0
-
-            circuit.SetActiveElement(elem)
-            bus_def = circuit.ActiveElement.BusNames[term - 1]
-            parts = bus_def.split('.')
-            con_phases = parts[1:] if len(parts)>1 else [str(i) for i in range(1, circuit.ActiveElement.NumPhases + 1)]
-            v_cols = [c for c in df_vi.columns if 'V' in c and 'Angle' not in c]
-            i_cols = [c for c in df_vi.columns if 'I' in c and 'Angle' not in c]
-            
-            target_state = node_states_dict.get(target_bus_name, {'mode': 'Normal', 'phases': []})
-            t_mode, t_phases = target_state['mode'], target_state['phases']
-            sim_date = datetime.date(2020, 1, 1) + datetime.timedelta(days=int(day_of_year) - 1)
-
-            # Localized month name
-            month_idx = sim_date.month
-            month_names = config.tr("Months")
-            if isinstance(month_names, list) and len(month_names) > month_idx:
-                 m_name = month_names[month_idx]
-                 date_str = f"{sim_date.day} {m_name}"
-            else:
-                 date_str = sim_date.strftime("%d %B")
-
-            circuit.SetActiveBus(target_bus_name)
-            kv_base_dss = circuit.ActiveBus.kVBase 
-            
-            print(f"\n{'='*40}")
-            print(config.tr("Node Summary", target_bus_name))
-            print(f"{'='*40}")
-            
-            v_meas_mean = 0
-            cnt = 0
-            for col in v_cols:
-                v_meas_mean += df[col].mean()
-                cnt += 1
-            if cnt > 0: v_meas_mean /= cnt
-            
-            v_base_candidate = kv_base_dss * 1000
-            v_base_phase = v_base_candidate
-            base_type_str = config.tr("Base Type Phase")
-            if v_base_candidate > 0 and (v_meas_mean / v_base_candidate) < 0.8 and v_meas_mean > 10:
-                 v_base_phase = v_base_candidate / np.sqrt(3)
-                 base_type_str = config.tr("Base Type LinearToPhase")
+        kv_base_dss = result["kv_base"]
+        
+        print(f"\n{'='*40}")
+        print(config.tr("Node Summary", target_bus_name))
+        print(f"{'='*40}")
+        
+        v_meas_mean = 0
+        cnt = 0
+        for col in v_cols:
+            v_meas_mean += df[col].mean()
+            cnt += 1
+        if cnt > 0: v_meas_mean /= cnt
+        
+        v_base_candidate = kv_base_dss * 1000
+        v_base_phase = v_base_candidate
+        base_type_str = config.tr("Base Type Phase")
+        if v_base_candidate > 0 and (v_meas_mean / v_base_candidate) < 0.8 and v_meas_mean > 10:
+             v_base_phase = v_base_candidate / np.sqrt(3)
+             base_type_str = config.tr("Base Type LinearToPhase")
+        
+        print(config.tr("Params Phases", result["num_nodes"]))
+        print(config.tr("Base DSS", kv_base_dss, base_type_str))
+        print(config.tr("Base PU", v_base_phase))
+        print(f"-"*40)
+        print(config.tr("Daily Stats"))
+        
+        for i, col in enumerate(v_cols):
+            if i >= len(con_phases): continue
+            ph = con_phases[i]
+            v_min = df[col].min()
+            v_max = df[col].max()
+            t_min_idx = df[col].idxmin()
+            t_max_idx = df[col].idxmax()
             
-            print(config.tr("Params Phases", circuit.ActiveBus.NumNodes))
-            print(config.tr("Base DSS", kv_base_dss, base_type_str))
-            print(config.tr("Base PU", v_base_phase))
-            print(f"-"*40)
-            print(config.tr("Daily Stats"))
+            def idx_to_time(idx):
+                total_min = int(idx * 15)
+                h = (total_min // 60) % 24
+                m = total_min % 60
+                return f"{h:02d}:{m:02d}"
+
+            v_pu_min = v_min / v_base_phase if v_base_phase > 0 else 0
+            v_pu_max = v_max / v_base_phase if v_base_phase > 0 else 0
             
-            for i, col in enumerate(v_cols):
-                if i >= len(con_phases): continue
-                ph = con_phases[i]
-                v_min = df[col].min()
-                v_max = df[col].max()
-                t_min_idx = df[col].idxmin()
-                t_max_idx = df[col].idxmax()
-                
-                def idx_to_time(idx):
-                    total_min = int(idx * 15)
-                    h = (total_min // 60) % 24
-                    m = total_min % 60
-                    return f"{h:02d}:{m:02d}"
-
-                v_pu_min = v_min / v_base_phase if v_base_phase > 0 else 0
-                v_pu_max = v_max / v_base_phase if v_base_phase > 0 else 0
-                
-                status_min = config.tr("Warning Under") if v_pu_min < 0.95 else ""
-                status_max = config.tr("Warning Over") if v_pu_max > 1.05 else ""
+            status_min = config.tr("Warning Under") if v_pu_min < 0.95 else ""
+            status_max = config.tr("Warning Over") if v_pu_max > 1.05 else ""
 
-                print(config.tr("Phase Log", ph))
-                print(config.tr("Min U", v_min, v_pu_min, idx_to_time(t_min_idx), status_min))
-                print(config.tr("Max U", v_max, v_pu_max, idx_to_time(t_max_idx), status_max))
+            print(config.tr("Phase Log", ph))
+            print(config.tr("Min U", v_min, v_pu_min, idx_to_time(t_min_idx), status_min))
+            print(config.tr("Max U", v_max, v_pu_max, idx_to_time(t_max_idx), status_max))
 
-            p_max = 0
-            for col in p_cols:
-                curr_max = df[col].max()
-                if abs(curr_max) > abs(p_max): p_max = curr_max
-            
-            i_max = 0
-            for col in i_cols:
-                curr_max = df[col].max()
-                if curr_max > i_max: i_max = curr_max
-
-            print(f"-"*40)
-            print(config.tr("Peak Load", p_max))
-            print(config.tr("Max Current", i_max))
-            print(config.tr("Total P Net", max_total_kw))
-            print(f"{'='*40}\n")
-
-            time_hours = df.index * 0.25
+        p_max = 0
+        for col in p_cols:
+            curr_max = df[col].max()
+            if abs(curr_max) > abs(p_max): p_max = curr_max
+        
+        i_max = 0
+        for col in i_cols:
+            curr_max = df[col].max()
+            if curr_max > i_max: i_max = curr_max
+
+        print(f"-"*40)
+        print(config.tr("Peak Load", p_max))
+        print(config.tr("Max Current", i_max))
+        print(config.tr("Total P Net", max_total_kw))
+        print(f"{'='*40}\n")
+
+        time_hours = df.index * 0.25
+        reuse_fig = fig is not None
+        if reuse_fig:
+            # Перерисовка открытого окна (например, после сдвига слайдера)
+            fig.clf()
+            if getattr(fig, "node_move_cid", None) is not None:
+                fig.canvas.mpl_disconnect(fig.node_move_cid)
+            ax1, ax2, ax3 = fig.subplots(3, 1, sharex=True)
+        else:
             fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 12), sharex=True)
-            plt.subplots_adjust(bottom=0.08, hspace=0.25)
-            
-            pv_st = config.tr("PV On", temperature) if pv_enabled else config.tr("PV Off")
-            fig.canvas.manager.set_window_title(f"Узел {target_bus_name} | {date_str}")
-            
-            load_info = config.tr("Load Info", test_load_kw) if test_load_kw > 0 else ""
-
-            if ai_mode:
-                mode_str = config.tr("AI Control Mode")
-            elif active_control:
-                mode_str = config.tr("Active Control Mode")
-            else:
-                mode_str = config.tr("Monitor Mode Plot")
-
-            # Append load info to title if applicable
-            if config.AI_LOAD_INCREASE_PERCENT > 0:
-                mode_str += " | " + config.tr("AI Load Increase", config.AI_LOAD_INCREASE_PERCENT)
-
-            ax1.set_title(config.tr("Node Plot Title", target_bus_name, date_str, pv_st, load_info, mode_str), fontsize=14, fontweight='bold')
-
-            max_v_plot = 0
-            for idx, col in enumerate(v_cols):
-                if idx >= len(con_phases): continue
-                if df[col].max() > max_v_plot: max_v_plot = df[col].max()
-                ph = con_phases[idx]
-                ax1.plot(time_hours, df[col], label=f"V ph{ph}")
-
-            for step in regulation_steps:
-                t = step * 0.25
-                ax1.axvline(x=t, color='green', linestyle='-', alpha=0.3, linewidth=2)
-            
-            if regulation_steps:
-                ax1.plot([], [], color='green', linestyle='-', alpha=0.5, label=config.tr("Regulating"))
-
-            ax1.set_ylabel(config.tr("Voltage V"))
-            ax1.grid(True, linestyle=':', alpha=0.6)
-            ax1.legend(loc='upper right', fontsize='small')
-            if max_v_plot < 1000: ax1.set_ylim(0, 3000)
-            else: ax1.autoscale(enable=True, axis='y'); ax1.margins(y=0.1)
-
-            for idx, col in enumerate(i_cols):
-                if idx >= len(con_phases): continue
-                ph = con_phases[idx]
-                ax2.plot(time_hours, df[col], label=f"I ph{ph}")
-            ax2.set_ylabel(config.tr("Current A"))
-            ax2.grid(True, linestyle=':', alpha=0.6)
-            ax2.legend(loc='upper right')
-
-            for idx, col in enumerate(p_cols):
-                if idx >= len(con_phases): continue
-                ph = con_phases[idx]
-                ax3.plot(time_hours, df[col], label=f"P ph{ph}")
-            ax3.set_ylabel(config.tr("Power kW"))
-            ax3.set_xlabel(config.tr("Time Hours"))
-            ax3.set_xlim(0, 24); ax3.set_xticks(range(0, 25, 2))
-            ax3.grid(True, linestyle=':', alpha=0.6)
-            ax3.legend(loc='upper right')
-            
-            for step in regulation_steps:
-                t = step * 0.25
-                ax3.axvline(x=t, color='green', linestyle='-', alpha=0.15)
+        fig.subplots_adjust(bottom=0.08, hspace=0.25)
+        
+        pv_st = config.tr("PV On", temperature) if pv_enabled else config.tr("PV Off")
+        fig.canvas.manager.set_window_title(f"Узел {target_bus_name} | {date_str}")
+        
+        load_info = config.tr("Load Info", test_load_kw) if test_load_kw > 0 else ""
+
+        if ai_mode:
+            mode_str = config.tr("AI Control Mode")
+        elif active_control:
+            mode_str = config.tr("Active Control Mode")
+        else:
+            mode_str = config.tr("Monitor Mode Plot")
 
-            lv = ax1.axvline(0, c='gray', ls='--', alpha=0.8)
-            li = ax2.axvline(0, c='gray', ls='--', alpha=0.8)
-            lp = ax3.axvline(0, c='gray', ls='--', alpha=0.8)
+        # Append load info to title if applicable
+        if config.AI_LOAD_INCREASE_PERCENT > 0:
+            mode_str += " | " + config.tr("AI Load Increase", config.AI_LOAD_INCREASE_PERCENT)
+
+        ax1.set_title(config.tr("Node Plot Title", target_bus_name, date_str, pv_st, load_info, mode_str), fontsize=14, fontweight='bold')
+
+        max_v_plot = 0
+        for idx, col in enumerate(v_cols):
+            if idx >= len(con_phases): continue
+            if df[col].max() > max_v_plot: max_v_plot = df[col].max()
+            ph = con_phases[idx]
+            ax1.plot(time_hours, df[col], label=f"V ph{ph}")
+
+        for step in regulation_steps:
+            t = step * 0.25
+            ax1.axvline(x=t, color='green', linestyle='-', alpha=0.3, linewidth=2)
+        
+        if regulation_steps:
+            ax1.plot([], [], color='green', linestyle='-', alpha=0.5, label=config.tr("Regulating"))
+
+        ax1.set_ylabel(config.tr("Voltage V"))
+        ax1.grid(True, linestyle=':', alpha=0.6)
+        ax1.legend(loc='upper right', fontsize='small')
+        if max_v_plot < 1000: ax1.set_ylim(0, 3000)
+        else: ax1.autoscale(enable=True, axis='y'); ax1.margins(y=0.1)
+
+        for idx, col in enumerate(i_cols):
+            if idx >= len(con_phases): continue
+            ph = con_phases[idx]
+            ax2.plot(time_hours, df[col], label=f"I ph{ph}")
+        ax2.set_ylabel(config.tr("Current A"))
+        ax2.grid(True, linestyle=':', alpha=0.6)
+        ax2.legend(loc='upper right')
+
+        for idx, col in enumerate(p_cols):
+            if idx >= len(con_phases): continue
+            ph = con_phases[idx]
+            ax3.plot(time_hours, df[col], label=f"P ph{ph}")
+        ax3.set_ylabel(config.tr("Power kW"))
+        ax3.set_xlabel(config.tr("Time Hours"))
+        ax3.set_xlim(0, 24); ax3.set_xticks(range(0, 25, 2))
+        ax3.grid(True, linestyle=':', alpha=0.6)
+        ax3.legend(loc='upper right')
+        
+        for step in regulation_steps:
+            t = step * 0.25
+            ax3.axvline(x=t, color='green', linestyle='-', alpha=0.15)
+
+        lv = ax1.axvline(0, c='gray', ls='--', alpha=0.8)
+        li = ax2.axvline(0, c='gray', ls='--', alpha=0.8)
+        lp = ax3.axvline(0, c='gray', ls='--', alpha=0.8)
+        
+        txt = ax1.text(0.02, 0.95, '', transform=ax1.transAxes, va='top', bbox=dict(facecolor='white', alpha=0.9))
+
+        def on_move(event):
+            if not event.inaxes: return
+            x = event.xdata
+            lv.set_xdata([x, x]); li.set_xdata([x, x]); lp.set_xdata([x, x])
+            idx = (np.abs(time_hours - x)).argmin()
+            tm = int(round(time_hours[idx]*60))
+            info = f"Время: {tm//60:02d}:{tm%60:02d}\n" + "-"*20 + "\n"
             
-            txt = ax1.text(0.02, 0.95, '', transform=ax1.transAxes, va='top', bbox=dict(facecolor='white', alpha=0.9))
-
-            def on_move(event):
-                if not event.inaxes: return
-                x = event.xdata
-                lv.set_xdata([x, x]); li.set_xdata([x, x]); lp.set_xdata([x, x])
-                idx = (np.abs(time_hours - x)).argmin()
-                tm = int(round(time_hours[idx]*60))
-                info = f"Время: {tm//60:02d}:{tm%60:02d}\n" + "-"*20 + "\n"
-                
-                for i, c in enumerate(v_cols):
-                     if i >= len(con_phases): continue
-                     val = df[c].iloc[idx]
-                     p = con_phases[i]
-                     info += f"V{p}: {val:.1f} V\n"
-                info += "-"*20 + "\n"
-                for i, c in enumerate(i_cols):
-                     if i >= len(con_phases): continue
-                     val = df[c].iloc[idx]
-                     p = con_phases[i]
-                     info += f"I{p}: {val:.1f} A\n"
-                info += "-"*20 + "\n"
-                for i, c in enumerate(p_cols):
-                     if i >= len(con_phases): continue
-                     val = df[c].iloc[idx]
-                     p = con_phases[i]
-                     info += f"P{p}: {val:.1f} kW\n"
-
-                txt.set_text(info)
-                fig.canvas.draw_idle()
-
-            fig.canvas.mpl_connect('motion_notify_event', on_move)
-            plt.show()
-        except Exception as e: print(config.tr("Plot Error", e))
-    else: print(config.tr("Solution Diverged"))
\ No newline at end of file
+            for i, c in enumerate(v_cols):
+                 if i >= len(con_phases): continue
+                 val = df[c].iloc[idx]
+                 p = con_phases[i]
+                 info += f"V{p}: {val:.1f} V\n"
+            info += "-"*20 + "\n"
+            for i, c in enumerate(i_cols):
+                 if i >= len(con_phases): continue
+                 val = df[c].iloc[idx]
+                 p = con_phases[i]
+                 info += f"I{p}: {val:.1f} A\n"
+            info += "-"*20 + "\n"
+            for i, c in enumerate(p_cols):
+                 if i >= len(con_phases): continue
+                 val = df[c].iloc[idx]
+                 p = con_phases[i]
+                 info += f"P{p}: {val:.1f} kW\n"
+
+            txt.set_text(info)
+            fig.canvas.draw_idle()
+
+        fig.node_move_cid = fig.canvas.mpl_connect('motion_notify_event', on_move)
+        if reuse_fig: fig.canvas.draw_idle()
+        else: plt.show()
+        return fig
+    except Exception as e: print(config.tr("Plot Error", e))
\ No newline at end of file
@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import config
+import loadshape_store
+from annual_qsts import AnnualSummary, STEPS_PER_DAY
+from fault_manager import canonical_faults, faults_to_node_states
+
+BASE_DIR = pathlib.Path(__file__).parent.resolve()
+DEFAULT_CACHE_DIR = BASE_DIR / "sweep_cache"
+
+# Параметры сценария (столбцы результата идут в этом порядке)
+PARAM_COLUMNS = ["day_of_year", "temperature", "load_scale", "pv_enabled", "test_load_kw", "faults", "control_mode"]
+# Короткие имена режимов для --faults (полные - как в plot_topology/run_qsts_plot)
+FAULT_MODES = {"short": "Short Circuit", "open": "Open Line"}
+
+
+def faults_label(faults):
+    """(('13', 'Short Circuit', (1, 2)),) -> '13:Short Circuit:1,2' (для столбца DataFrame)."""
+    return " ".join(f"{bus}:{mode}:{','.join(map(str, phases))}" for bus, mode, phases in faults)
+
+
+def make_scenario(day_of_year=1, temperature=25.0, load_scale=1.0, pv_enabled=True, test_load_kw=0.0,
+                  faults=None, control_mode="STATIC"):
+    """Нормализованный сценарий: одинаковые по смыслу параметры дают одинаковый словарь."""
+    return {
+        "day_of_year": int(day_of_year),
+        "temperature": float(temperature),
+        "load_scale": float(load_scale),
+        "pv_enabled": bool(pv_enabled),
+        "test_load_kw": float(test_load_kw),
+        "faults": faults if isinstance(faults, tuple) else canonical_faults(faults),
+        "control_mode": control_mode.upper(),
+    }
+
+
+def build_grid(days=(1,), temperatures=(25.0,), load_scales=(1.0,), pv_options=(True,), test_loads_kw=(0.0,),
+               fault_sets=(None,), control_modes=("STATIC",)):
+    """Декартово произведение параметров, без повторяющихся сценариев."""
+    scenarios = {}
+    for day, temp, scale, pv, load_kw, faults, mode in itertools.product(
+            days, temperatures, load_scales, pv_options, test_loads_kw, fault_sets, control_modes):
+        scenario = make_scenario(day, temp, scale, pv, load_kw, faults, mode)
+        if not scenario["pv_enabled"]:
+            # Без PV температура панелей на результат не влияет
+            scenario["temperature"] = 25.0
+        scenarios.setdefault(scenario_params_json(scenario), scenario)
+    return list(scenarios.values())
+
+
+def scenario_params_json(scenario):
+    return json.dumps(scenario, sort_keys=True)
+
+
+def inputs_digest():
+    """
+    Контрольная сумма исходных данных модели: все .dss из qsts/ (кроме
+    сгенерированных *_bin/*_window) и CSV-профили, на которые они ссылаются.
+    Любая правка схемы или профилей делает старый кэш недействительным.
+    """
+    generated = (loadshape_store.BIN_SUFFIX + ".dss", loadshape_store.WINDOW_SUFFIX + ".dss")
+    digest = hashlib.sha1()
+    for dss_path in sorted(loadshape_store.QSTS_DIR.glob("*.dss")):
+        if dss_path.name.endswith(generated):
+            continue
+        digest.update(f"{dss_path.name}:{loadshape_store.file_sha1(dss_path)}\n".encode())
+    for source in loadshape_store.SHAPE_SOURCES:
+        for csv_path in loadshape_store._referenced_csvs(loadshape_store.QSTS_DIR / source):
+            digest.update(f"{csv_path.name}:{loadshape_store.file_sha1(csv_path)}\n".encode())
+    return digest.hexdigest()
+
+
+def scenario_key(scenario, digest):
+    return hashlib.sha1(f"{digest}\n{scenario_params_json(scenario)}".encode()).hexdigest()
+
+
+def _cache_path(cache_dir, key):
+    return pathlib.Path(cache_dir) / f"{key}.json"
+
+
+def _load_cached(cache_dir, key):
+    try:
+        return json.loads(_cache_path(cache_dir, key).read_text())["result"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_cached(cache_dir, key, scenario, result):
+    """Атомарная запись: параллельные прогоны не оставят битый файл кэша."""
+    path = _cache_path(cache_dir, key)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"params": scenario, "result": result}))
+    os.replace(tmp, path)
+
+
+# Результат сценария, в котором не сошелся ни один шаг
+FAILED_METRICS = {
+    "converged_steps": 0,
+    "peak_kw": float("nan"),
+    "loss_kwh": float("nan"),
+    "v_min": float("nan"),
+    "v_max": float("nan"),
+    "n_under": float("nan"),
+    "n_over": float("nan"),
+    "under_buses": "",
+    "over_buses": "",
+}
+
+
+def run_scenario(scenario):
+    """Суточный расчет одного сценария в текущем процессе, возвращает словарь метрик."""
+    import dss
+    from run_qsts_plot import setup_circuit
+
+    dss_engine = dss.DSS
+    circuit = dss_engine.ActiveCircuit
+    solution = circuit.Solution
+    setup_circuit(dss_engine, faults_to_node_states(scenario["faults"]), scenario["pv_enabled"],
+                  scenario["day_of_year"], scenario["temperature"], scenario["test_load_kw"])
+    dss_engine.Text.Command = f"Set LoadMult={scenario['load_scale']}"
+    dss_engine.Text.Command = f"Set ControlMode={scenario['control_mode']}"
+    dss_engine.Text.Command = "Set Number=1"
+
+    summary = None
+    converged = np.zeros(STEPS_PER_DAY, dtype=bool)
+    power_kw = np.zeros(STEPS_PER_DAY)
+    losses_kw = np.zeros(STEPS_PER_DAY)
+    for step in range(STEPS_PER_DAY):
+        solution.Solve()
+        if summary is None:
+            # Список узлов окончательно формируется при первом расчете
+            summary = AnnualSummary(circuit.AllNodeNames)
+            v = np.zeros((STEPS_PER_DAY, summary.index.n_nodes))
+        converged[step] = solution.Converged
+        v[step] = circuit.AllBusVmagPu
+        power_kw[step] = abs(circuit.TotalPower[0])
+        losses_kw[step] = circuit.Losses[0] / 1000.0
+    if not converged.any():
+        # Ни один шаг не сошелся: метрик нет (NaN), такой результат не кэшируется
+        return dict(FAILED_METRICS)
+    summary.update(v[converged], power_kw[converged], losses_kw[converged])
+
+    over, under = summary.violations()
+    live = summary.bus_min < 999.0
+    return {
+        "converged_steps": int(converged.sum()),
+        "peak_kw": summary.peak_kw,
+        "loss_kwh": summary.loss_kwh,
+        "v_min": float(summary.bus_min[live].min()) if live.any() else 0.0,
+        "v_max": float(summary.bus_max.max()),
+        "n_under": len(under),
+        "n_over": len(over),
+        "under_buses": " ".join(sorted(under)),
+        "over_buses": " ".join(sorted(over)),
+    }
+
+
+def run_sweep(scenarios, cache_dir=DEFAULT_CACHE_DIR, n_workers=None, use_cache=True):
+    """
+    Прогон набора сценариев (см. build_grid) с кэшем результатов на диске.
+
+    Ключ кэша - хэш параметров сценария и исходных файлов модели, поэтому
+    при повторном прогоне частично измененной сетки считаются только новые
+    ячейки. Возвращает DataFrame: строка на сценарий, параметры + метрики,
+    столбец cached показывает, взят ли результат из кэша.
+    """
+    scenarios = list({scenario_params_json(s): s for s in scenarios}.values())
+    cache_dir = pathlib.Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    digest = inputs_digest()
+    keys = [scenario_key(s, digest) for s in scenarios]
+
+    results = [_load_cached(cache_dir, key) if use_cache else None for key in keys]
+    cached = [r is not None for r in results]
+    todo = [i for i, r in enumerate(results) if r is None]
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(todo) or 1))
+    print(config.tr("Sweep Start", len(scenarios), len(scenarios) - len(todo), len(todo), n_workers))
+
+    start_time = time.perf_counter()
+    if todo:
+        # Бинарное хранилище профилей готовим заранее, чтобы процессы не собирали его наперегонки
+        loadshape_store.resolve_master_file(day_window=config.USE_DAY_WINDOW)
+        todo_scenarios = [scenarios[i] for i in todo]
+        if n_workers == 1:
+            computed = map(run_scenario, todo_scenarios)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=n_workers)
+            computed = pool.map(run_scenario, todo_scenarios)
+        try:
+            for i, result in zip(todo, computed):
+                results[i] = result
+                if result["converged_steps"] > 0:
+                    _save_cached(cache_dir, keys[i], scenarios[i], result)
+                else:
+                    print(config.tr("Sweep Not Converged", scenario_params_json(scenarios[i])))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+    print(config.tr("Sweep Done", time.perf_counter() - start_time))
+
+    rows = []
+    for scenario, result, from_cache in zip(scenarios, results, cached):
+        row = dict(scenario, faults=faults_label(scenario["faults"]))
+        row.update(result)
+        row["cached"] = from_cache
+        rows.append(row)
+    return pd.DataFrame(rows, columns=PARAM_COLUMNS + list(results[0]) + ["cached"] if rows else PARAM_COLUMNS)
+
+
+def parse_fault(spec):
+    """'13:short:1,2' -> {'13': {'mode': 'Short Circuit', 'phases': [1, 2]}}"""
+    bus, mode, phases = spec.split(":")
+    return {bus: {'mode': FAULT_MODES[mode.lower()], 'phases': [int(ph) for ph in phases.split(",")]}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scenario sweep over day x temperature x load scale x PV")
+    parser.add_argument("--days", type=int, nargs="+", default=[1])
+    parser.add_argument("--temperatures", type=float, nargs="+", default=[25.0])
+    parser.add_argument("--load-scales", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--pv", choices=["on", "off", "both"], default="on")
+    parser.add_argument("--test-loads", type=float, nargs="+", default=[0.0], help="extra load at TestNode, kW")
+    parser.add_argument("--faults", nargs="+", default=[], metavar="BUS:short|open:PHASES",
+                        help="fault sets to add to the no-fault case, e.g. 13:short:1 60:open:1,2,3")
+    parser.add_argument("--control-mode", choices=["STATIC", "OFF"], default="STATIC")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--no-cache", action="store_true", help="recompute all scenarios")
+    parser.add_argument("--csv", help="save the result table to CSV")
+    args = parser.parse_args()
+
+    pv_options = {"on": [True], "off": [False], "both": [True, False]}[args.pv]
+    fault_sets = [None] + [parse_fault(spec) for spec in args.faults]
+    scenarios = build_grid(args.days, args.temperatures, args.load_scales, pv_options, args.test_loads,
+                           fault_sets, [args.control_mode])
+    table = run_sweep(scenarios, cache_dir=args.cache_dir, n_workers=args.workers, use_cache=not args.no_cache)
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        print(table.drop(columns=["under_buses", "over_buses"]))
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
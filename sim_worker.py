@@ -0,0 +1,172 @@
+import itertools
+import multiprocessing as mp
+import queue
+import traceback
+from collections import deque
+from concurrent.futures import Future
+
+# Виды заданий: расчет узла (клик, каскад, ИИ), анализ напряжений всей сети и токи КЗ
+JOB_KINDS = ("node", "analyze", "fault_study")
+# Как часто (в шагах) процесс сообщает о ходе расчета
+PROGRESS_EVERY = 4
+
+
+class JobCancelled(Exception):
+    """Задание вытеснено более новым того же канала или отменено из GUI."""
+
+
+def _run_job(kind, params, progress):
+    import fault_study
+    import run_qsts_plot
+
+    # Память регуляторов живет в GUI, процессу она передается с каждым заданием
+    run_qsts_plot.GLOBAL_REGULATOR_STATE = dict(params.pop("start_taps", {}))
+    if kind == "fault_study":
+        return fault_study.get_fault_study(**params)
+    if kind == "node":
+        return run_qsts_plot.compute_node_result(progress=progress, **params)
+    if kind == "analyze":
+        return run_qsts_plot.analyze_voltage_violations(progress=progress, **params)
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+def _worker_main(requests, results):
+    """
+    Цикл фонового процесса со своим движком OpenDSS. Задания выполняются по
+    одному; если в очереди уже лежит более новое задание того же канала (или
+    команда отмены), текущее прерывается на ближайшем шаге, а устаревшие из
+    очереди не запускаются.
+    """
+    pending = deque()
+
+    def drain():
+        while True:
+            try:
+                message = requests.get_nowait()
+            except queue.Empty:
+                return
+            pending.append(message)
+
+    def superseded(channel):
+        return any(msg is None or msg[1] in (channel, None) for msg in pending)
+
+    while True:
+        if not pending:
+            pending.append(requests.get())
+        drain()
+        message = pending.popleft()
+        if message is None:
+            return
+        job_id, channel, kind, params = message
+        if kind == "cancel":
+            continue
+        if superseded(channel):
+            results.put(("cancelled", job_id, None))
+            continue
+
+        def progress(step, total):
+            if step % PROGRESS_EVERY and step != total:
+                return
+            results.put(("progress", job_id, (step, total)))
+            drain()
+            if superseded(channel):
+                raise JobCancelled()
+
+        try:
+            results.put(("done", job_id, _run_job(kind, params, progress)))
+        except JobCancelled:
+            results.put(("cancelled", job_id, None))
+        except Exception:
+            results.put(("error", job_id, traceback.format_exc()))
+
+
+class SimulationWorker:
+    """
+    Очередь расчетов для GUI в отдельном процессе (свой движок OpenDSS),
+    чтобы клики и кнопки не блокировали окно на время компиляции и 96 шагов.
+
+    submit() возвращает concurrent.futures.Future; результаты забираются
+    poll() из таймера matplotlib, поэтому колбэки Future выполняются в
+    потоке GUI. Новое задание канала (по умолчанию - вида задания) вытесняет
+    незавершенные задания этого канала: их Future отменяются, а процесс
+    прерывает устаревший расчет.
+    """
+
+    def __init__(self):
+        ctx = mp.get_context("spawn")
+        self._requests = ctx.Queue()
+        self._results = ctx.Queue()
+        self._process = ctx.Process(target=_worker_main, args=(self._requests, self._results), daemon=True)
+        self._process.start()
+        self._ids = itertools.count(1)
+        self._jobs = {}  # job_id -> (Future, канал, подпись)
+        self._progress = {}  # job_id -> (шаг, всего)
+
+    def submit(self, kind, params, channel=None, label=""):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        channel = channel or kind
+        self._cancel_futures(channel)
+        job_id = next(self._ids)
+        future = Future()
+        self._jobs[job_id] = (future, channel, label)
+        self._requests.put((job_id, channel, kind, params))
+        return future
+
+    def cancel(self, channel=None):
+        """Отменяет задания канала (None - все)."""
+        self._cancel_futures(channel)
+        self._requests.put((None, channel, "cancel", None))
+
+    def _cancel_futures(self, channel):
+        for job_id, (future, ch, _) in list(self._jobs.items()):
+            if channel is None or ch == channel:
+                future.cancel()
+                self._forget(job_id)
+
+    def _forget(self, job_id):
+        self._jobs.pop(job_id, None)
+        self._progress.pop(job_id, None)
+
+    def poll(self):
+        """Забирает готовые результаты и прогресс; вызывать из таймера GUI."""
+        while True:
+            try:
+                tag, job_id, payload = self._results.get_nowait()
+            except queue.Empty:
+                return
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                continue  # задание уже отменено в GUI
+            future = entry[0]
+            if tag == "progress":
+                self._progress[job_id] = payload
+                continue
+            self._forget(job_id)
+            if tag == "done":
+                future.set_result(payload)
+            elif tag == "error":
+                future.set_exception(RuntimeError(payload))
+            else:
+                future.cancel()
+
+    def status(self):
+        """(подпись, шаг, всего) текущего задания или None, если очередь пуста."""
+        if not self._jobs:
+            return None
+        job_id = min(self._jobs)
+        step, total = self._progress.get(job_id, (0, 0))
+        return self._jobs[job_id][2], step, total
+
+    @property
+    def busy(self):
+        return bool(self._jobs)
+
+    def close(self, timeout=5.0):
+        self._cancel_futures(None)
+        try:
+            self._requests.put(None)
+            self._process.join(timeout)
+        finally:
+            if self._process.is_alive():
+                self._process.terminate()
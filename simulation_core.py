@@ -3,28 +3,72 @@ import pathlib
 import numpy as np
 import time
 import config
+import loadshape_store
+from circuit_snapshot import CircuitSnapshot
+from node_index import SensorIndex
+from step_recorder import StepRecorder
+from profiling import PhaseProfiler, TimedSolution, profiling_enabled
 
 class SimulationCore:
-    def __init__(self, sensors_file='sensors.json'):
-        self.dss = dss.DSS
+    def __init__(self, sensors_file='sensors.json', use_snapshot=True, day_window=None, dss_engine=None, profile=None):
+        # Движок OpenDSS: по умолчанию глобальный dss.DSS, для параллельных
+        # сред - отдельный контекст (dss.DSS.NewContext())
+        self.dss = dss.DSS if dss_engine is None else dss_engine
         self.text = self.dss.Text
         self.circuit = self.dss.ActiveCircuit
         self.solution = self.circuit.Solution
         
         # Пути к файлам
         self.current_dir = pathlib.Path(__file__).parent.resolve()
-        self.master_file = self.current_dir / "qsts" / "master.dss"
+        # Режим суточного окна: схема компилируется с профилями-заглушками,
+        # а в reset() подставляются только нужные сутки из годового хранилища
+        self.day_window = config.USE_DAY_WINDOW if day_window is None else day_window
+        self.master_file = loadshape_store.resolve_master_file(day_window=self.day_window)
         
         # Список регуляторов (наши "руки" для нейросети)
         self.regulator_names = []
+        # Зеркало положений тапов (в порядке regulator_names) и их пределы.
+        # Пока ControlMode=OFF, тапы меняем только мы, поэтому из движка
+        # они читаются один раз за эпизод (в reset()).
+        self.tap_positions = np.zeros(0, dtype=np.int64)
+        self.tap_min = np.zeros(0, dtype=np.int64)
+        self.tap_max = np.zeros(0, dtype=np.int64)
+        self._reg_index = None
         # Список сенсоров (наши "глаза")
         self.sensor_nodes = self._load_sensors(sensors_file)
+        # Индексы сенсоров в AllBusVmagPu (строятся после компиляции)
+        self._sensor_index = None
         
         # Состояние симуляции
         self.current_step = 0
         self.max_steps = 96  # 24 часа * 4 (15 мин)
         self.base_voltages = {} # Кэш базовых напряжений
 
+        # Вектор наблюдения (float32), заполняется на месте после каждого расчета.
+        # Раскладка: [напряжения сенсоров (p.u.) | тапы | мощность (кВт) | sin, cos времени]
+        self.obs_buffer = np.zeros(0, dtype=np.float32)
+        self.obs_voltage = slice(0, 0)
+        self.obs_taps = slice(0, 0)
+        self.obs_power = 0
+        self.obs_time = slice(0, 0)
+
+        # Регистратор V/I/P/Q выбранных элементов по шагам (см. attach_recorder)
+        self.recorder = None
+
+        # Снимок скомпилированной схемы: Compile выполняется один раз,
+        # последующие reset() восстанавливают схему в памяти движка
+        self.use_snapshot = use_snapshot
+        self._snapshot = None
+
+        # Профилирование фаз (profile=True или IEEE123_PROFILE=1).
+        # Выключенное не меняет ни одного метода и ничего не стоит.
+        self.profiler = PhaseProfiler() if profiling_enabled(profile) else None
+        if self.profiler is not None:
+            self.solution = TimedSolution(self.solution, self.profiler)
+            for method_name, phase in [("reset", "reset"), ("step", "step"), ("step_vector", "step"),
+                                       ("get_state", "get_state"), ("_fill_observation", "fill_observation")]:
+                self.profiler.wrap(self, method_name, phase)
+
     def _load_sensors(self, filename):
         """Загружает список узлов для мониторинга."""
         import json
@@ -41,13 +85,19 @@ class SimulationCore:
         Сброс среды в начальное состояние (00:00).
         Подготовка схемы, профилей и погоды.
         """
-        # 1. Компиляция схемы
-        self.text.Command = f'Compile "{self.master_file}"'
+        # 1. Компиляция схемы (или восстановление из снимка)
+        if self._snapshot is not None and self._snapshot.is_valid():
+            self._snapshot.restore()
+        else:
+            self.compile()
+        # Узлы внутри эпизода не меняются (шаги двигают только тапы), поэтому
+        # соответствие карты сенсоров схеме проверяется раз за эпизод
+        if self._sensor_index is not None and not self._sensor_index.is_current(self.circuit):
+            self._sensor_index = None
         
         # 2. Настройка PV и погоды
         if pv_enabled:
-            self.text.Command = "New XYCurve.PvTempEff npts=4 xarray=[-10 25 50 75] yarray=[1.20 1.0 0.80 0.60]"
-            self.text.Command = f"New Tshape.TempOverride npts=1 interval=1 temp=[{temperature}]"
+            self.text.Command = f"Edit Tshape.TempOverride temp=[{temperature}]"
             
             # Применяем температурный профиль ко всем PV
             pvs = self.circuit.PVSystems
@@ -70,19 +120,58 @@ class SimulationCore:
             self.text.Command = f"Set LoadMult={load_scale}"
 
         # 4. Инициализация времени
-        start_hour = (int(day_of_year) - 1) * 24
+        if self.day_window:
+            # Профили содержат только эти сутки, время отсчитываем от их начала
+            loadshape_store.apply_day_window(self.dss, day_of_year)
+            start_hour = 0
+        else:
+            start_hour = (int(day_of_year) - 1) * 24
         self.text.Command = f"Set Mode=Yearly StepSize=15m Hour={start_hour} Number=1"
         self.text.Command = "Set ControlMode=OFF" # Мы сами будем управлять регуляторами!
 
         # 5. Кэширование списка регуляторов (если схема изменилась)
-        self.regulator_names = self.circuit.RegControls.AllNames
+        if self._reg_index is None or len(self._reg_index) != self.circuit.RegControls.Count:
+            self._read_tap_limits()
+        self.sync_taps()
+        if self.obs_buffer.size != len(self.sensor_nodes) + len(self.regulator_names) + 3:
+            self._allocate_observation()
 
         # 6. Расчет начального состояния (без шага времени, просто Snapshot для инициализации)
         self.solution.SolveNoControl()
         self.current_step = 0
+        self._fill_observation()
+        if self.recorder is not None:
+            self.recorder.clear()
         
         return self.get_state()
 
+    def compile(self):
+        """
+        Полная компиляция master.dss и снятие снимка исходного состояния.
+        Кривые для PV создаются здесь один раз, в reset() они только редактируются.
+        """
+        self.text.Command = f'Compile "{self.master_file}"'
+        self.text.Command = "New XYCurve.PvTempEff npts=4 xarray=[-10 25 50 75] yarray=[1.20 1.0 0.80 0.60]"
+        self.text.Command = "New Tshape.TempOverride npts=1 interval=1 temp=[25]"
+        self._sensor_index = None
+        self._reg_index = None
+
+        if self.use_snapshot:
+            self._snapshot = CircuitSnapshot.capture(self.dss)
+
+    def attach_recorder(self, elements, capacity=None):
+        """
+        Включает запись V/I/P/Q элементов на каждом шаге (step/step_vector).
+        elements - список (имя_элемента, номер_вывода); по умолчанию буфер на одни сутки.
+        Вызывать после reset(): элементы должны существовать в схеме.
+        """
+        self.recorder = StepRecorder(self.circuit, elements, capacity or self.max_steps)
+        return self.recorder
+
+    def invalidate_snapshot(self):
+        """Принудительная перекомпиляция при следующем reset() (например, после правки .dss)."""
+        self._snapshot = None
+
     def step(self, action_dict):
         """
         Выполняет один шаг симуляции (15 минут).
@@ -95,31 +184,112 @@ class SimulationCore:
             done (bool): Конец ли суток
         """
         # 1. Применяем действия Агента
+        directions = np.zeros(len(self.regulator_names), dtype=np.int64)
         for reg_name, direction in action_dict.items():
-            if direction == 0: continue
-            
-            # Устанавливаем активный регулятор
-            self.circuit.RegControls.Name = reg_name
-            
-            # Получаем текущий тап
-            current_tap = self.circuit.RegControls.TapNumber
-            new_tap = current_tap + direction
-            
-            # Физические ограничения (-16..+16)
-            if -16 <= new_tap <= 16:
-                self.circuit.RegControls.TapNumber = new_tap
+            i = self._reg_index.get(reg_name.lower())
+            if i is not None:
+                directions[i] = direction
+        self._apply_taps(directions)
 
         # 2. Шаг физики (Power Flow)
+        done = self._advance()
+        
+        return self.get_state(), done
+
+    def step_vector(self, directions):
+        """
+        Шаг симуляции без словарей: directions - массив +1/-1/0
+        в порядке regulator_names. Возвращает (obs_buffer, done);
+        obs_buffer перезаписывается на следующем шаге.
+        """
+        self._apply_taps(directions)
+        done = self._advance()
+        return self.obs_buffer, done
+
+    def _apply_taps(self, directions):
+        """
+        Сдвигает тапы на directions ступеней с ограничением по пределам
+        регуляторов; в движок передаются только изменившиеся тапы.
+        """
+        new_taps = np.clip(self.tap_positions + directions, self.tap_min, self.tap_max)
+        regs = self.circuit.RegControls
+        for i in np.flatnonzero(new_taps != self.tap_positions):
+            regs.Name = self.regulator_names[i]
+            regs.TapNumber = int(new_taps[i])
+        self.tap_positions[:] = new_taps
+
+    def _read_tap_limits(self):
+        """
+        Список регуляторов и пределы тапов (в ступенях) из MaxTap/MinTap/NumTaps
+        их трансформаторов. Читается после компиляции схемы.
+        """
+        self.regulator_names = list(self.circuit.RegControls.AllNames)
+        self._reg_index = {name.lower(): i for i, name in enumerate(self.regulator_names)}
+        n = len(self.regulator_names)
+        self.tap_min = np.full(n, -16, dtype=np.int64)
+        self.tap_max = np.full(n, 16, dtype=np.int64)
+
+        regs = self.circuit.RegControls
+        xfmrs = self.circuit.Transformers
+        for i, name in enumerate(self.regulator_names):
+            regs.Name = name
+            xfmrs.Name = regs.Transformer
+            xfmrs.Wdg = regs.Winding
+            if xfmrs.NumTaps <= 0:
+                continue
+            step = (xfmrs.MaxTap - xfmrs.MinTap) / xfmrs.NumTaps
+            self.tap_max[i] = int(round((xfmrs.MaxTap - 1.0) / step))
+            self.tap_min[i] = int(round((xfmrs.MinTap - 1.0) / step))
+
+    def sync_taps(self):
+        """Перечитывает положения тапов из движка (если их меняли в обход step())."""
+        regs = self.circuit.RegControls
+        self.tap_positions = np.zeros(len(self.regulator_names), dtype=np.int64)
+        for i, name in enumerate(self.regulator_names):
+            regs.Name = name
+            self.tap_positions[i] = regs.TapNumber
+
+    def _advance(self):
+        """Расчет следующего 15-минутного интервала и обновление obs_buffer."""
         self.solution.Solve()
+        if self.recorder is not None:
+            self.recorder.record()
         
         self.current_step += 1
-        done = (self.current_step >= self.max_steps)
-        
-        return self.get_state(), done
+        self._fill_observation()
+        return self.current_step >= self.max_steps
+
+    def _allocate_observation(self):
+        """Выделяет obs_buffer под текущее число сенсоров и регуляторов."""
+        n_v = len(self.sensor_nodes)
+        n_t = len(self.regulator_names)
+        self.obs_voltage = slice(0, n_v)
+        self.obs_taps = slice(n_v, n_v + n_t)
+        self.obs_power = n_v + n_t
+        self.obs_time = slice(n_v + n_t + 1, n_v + n_t + 3)
+        self.obs_buffer = np.zeros(n_v + n_t + 3, dtype=np.float32)
+
+    def _fill_observation(self):
+        """Заполняет obs_buffer на месте (без промежуточных словарей и списков)."""
+        buf = self.obs_buffer
+        self.read_sensor_voltages(out=buf[self.obs_voltage])
+
+        buf[self.obs_taps] = self.tap_positions
+
+        try:
+            buf[self.obs_power] = abs(self.circuit.TotalPower[0])
+        except:
+            buf[self.obs_power] = 0.0
+
+        step_angle = 2 * np.pi * (self.current_step / self.max_steps)
+        t0 = self.obs_time.start
+        buf[t0] = np.sin(step_angle)
+        buf[t0 + 1] = np.cos(step_angle)
 
     def get_state(self):
         """
-        Собирает 'сырые' данные для нейросети.
+        Собирает 'сырые' данные в виде словарей (отладочное представление;
+        для обучения используется obs_buffer).
         Возвращает:
             - Напряжения на сенсорах (p.u.)
             - Общую мощность сети
@@ -127,29 +297,10 @@ class SimulationCore:
         """
         state = {}
         
-        # А. Напряжения (Sensor Voltages)
-        # Оптимизация: читаем весь вектор один раз, потом фильтруем
-        # (В Python перебор всех узлов медленный, но в DSS доступ быстрый)
-        # Для скорости лучше заранее закешировать индексы узлов, но пока сделаем надежно:
-        
-        voltage_map = {}
-        # Получаем напряжения
-        for node in self.sensor_nodes:
-            self.circuit.SetActiveBus(node)
-            # Берем среднее напряжение по фазам узла (упрощение для вектора состояния)
-            v_mag = self.circuit.ActiveBus.VMagAngle
-            if len(v_mag) >= 2:
-                # VMagAngle возвращает [v1, a1, v2, a2...], берем только v
-                voltages = v_mag[0::2] 
-                kv_base = self.circuit.ActiveBus.kVBase * 1000
-                if kv_base > 0:
-                    v_pu = np.mean(voltages) / kv_base
-                    voltage_map[node] = v_pu
-                else:
-                    voltage_map[node] = 1.0 # Fallback
-            else:
-                voltage_map[node] = 0.0
-
+        # А. Напряжения (Sensor Voltages): один раз читаем AllBusVmagPu
+        # и выбираем сенсоры по заранее построенным индексам
+        state['voltage_vector'] = self.read_sensor_voltages()
+        voltage_map = dict(zip(self.sensor_nodes, state['voltage_vector'].tolist()))
         state['voltages'] = voltage_map
 
         # Б. Общая мощность (Total Power)
@@ -163,16 +314,20 @@ class SimulationCore:
             state['total_loss_kw'] = 0.0
 
         # В. Состояние регуляторов (Tap positions)
-        tap_state = {}
-        regs = self.circuit.RegControls
-        idx = regs.First
-        while idx > 0:
-            tap_state[regs.Name] = regs.TapNumber
-            idx = regs.Next
-        state['taps'] = tap_state
+        state['taps'] = dict(zip(self.regulator_names, self.tap_positions.tolist()))
 
         return state
 
+    def read_sensor_voltages(self, out=None):
+        """
+        Напряжения сенсоров (p.u., float32, порядок как в sensors.json).
+        Карта индексов строится после компиляции и проверяется в reset().
+        """
+        index = self._sensor_index
+        if index is None:
+            index = self._sensor_index = SensorIndex(self.circuit, self.sensor_nodes)
+        return index.read(self.circuit, out)
+
     def get_regulator_list(self):
         """Возвращает список доступных для управления регуляторов."""
         return self.circuit.RegControls.AllNames
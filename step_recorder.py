@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Величины, которые пишет регистратор (по фазам): как в мониторах mode=0 и mode=1 ppolar=no
+QUANTITIES = ("v_mag", "v_ang", "i_mag", "i_ang", "p_kw", "q_kvar")
+MAX_PHASES = 3
+
+
+class StepRecorder:
+    """
+    Замена мониторов OpenDSS для выбранных элементов: после каждого расчета
+    record() читает напряжения, токи и мощности на нужном выводе каждого
+    элемента (VoltagesMagAng/CurrentsMagAng/Powers) и пишет их в
+    предвыделенные кольцевые буферы. Элементов может быть сколько угодно,
+    все записываются за один прогон.
+
+    elements - список (имя_элемента, номер_вывода), например ("Line.L1", 2).
+    При переполнении (шагов больше capacity) затираются самые старые шаги.
+    """
+
+    def __init__(self, circuit, elements, capacity=96):
+        self.circuit = circuit
+        self.elements = [(name, int(term)) for name, term in elements]
+        self.capacity = int(capacity)
+        n = len(self.elements)
+        self.hour = np.zeros(self.capacity)
+        self.buffers = {q: np.full((self.capacity, n, MAX_PHASES), np.nan) for q in QUANTITIES}
+        self.count = 0
+
+        # Срезы массивов CktElement для вывода term: фазы term-го вывода идут подряд,
+        # по NumConductors значений (пар значений) на вывод
+        self.n_phases = np.zeros(n, dtype=np.intp)
+        self._starts = np.zeros(n, dtype=np.intp)
+        for k, (name, term) in enumerate(self.elements):
+            circuit.SetActiveElement(name)
+            element = circuit.ActiveCktElement
+            self.n_phases[k] = min(element.NumPhases, MAX_PHASES)
+            self._starts[k] = (term - 1) * element.NumConductors
+
+    def record(self):
+        """Записывает текущее состояние всех элементов (вызывать после Solve)."""
+        row = self.count % self.capacity
+        circuit = self.circuit
+        element = circuit.ActiveCktElement
+        self.hour[row] = circuit.Solution.dblHour
+        buf = self.buffers
+        for k, (name, _) in enumerate(self.elements):
+            circuit.SetActiveElement(name)
+            a = 2 * self._starts[k]
+            b = a + 2 * self.n_phases[k]
+            nph = self.n_phases[k]
+            v = np.asarray(element.VoltagesMagAng)[a:b]
+            i = np.asarray(element.CurrentsMagAng)[a:b]
+            s = np.asarray(element.Powers)[a:b]
+            buf["v_mag"][row, k, :nph] = v[0::2]
+            buf["v_ang"][row, k, :nph] = v[1::2]
+            buf["i_mag"][row, k, :nph] = i[0::2]
+            buf["i_ang"][row, k, :nph] = i[1::2]
+            buf["p_kw"][row, k, :nph] = s[0::2]
+            buf["q_kvar"][row, k, :nph] = s[1::2]
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+        self.hour[:] = 0.0
+        for values in self.buffers.values():
+            values[:] = np.nan
+
+    def _ordered_rows(self):
+        """Номера строк буфера от самого старого шага к самому новому."""
+        if self.count <= self.capacity:
+            return np.arange(self.count)
+        return (np.arange(self.capacity) + self.count) % self.capacity
+
+    def values(self, quantity, element_index=None):
+        """Массив (шаг x элемент x фаза) одной величины в хронологическом порядке."""
+        rows = self._ordered_rows()
+        data = self.buffers[quantity][rows]
+        return data if element_index is None else data[:, element_index]
+
+    def frame(self, element_index):
+        """
+        Записи одного элемента как DataFrame со столбцами мониторов OpenDSS:
+        hour, V1, VAngle1, ..., I1, IAngle1, ..., P1 (kW), Q1 (kvar), ...
+        """
+        rows = self._ordered_rows()
+        nph = self.n_phases[element_index]
+        data = {"hour": self.hour[rows]}
+        for ph in range(nph):
+            data[f"V{ph + 1}"] = self.buffers["v_mag"][rows, element_index, ph]
+            data[f"VAngle{ph + 1}"] = self.buffers["v_ang"][rows, element_index, ph]
+        for ph in range(nph):
+            data[f"I{ph + 1}"] = self.buffers["i_mag"][rows, element_index, ph]
+            data[f"IAngle{ph + 1}"] = self.buffers["i_ang"][rows, element_index, ph]
+        for ph in range(nph):
+            data[f"P{ph + 1} (kW)"] = self.buffers["p_kw"][rows, element_index, ph]
+            data[f"Q{ph + 1} (kvar)"] = self.buffers["q_kvar"][rows, element_index, ph]
+        return pd.DataFrame(data)
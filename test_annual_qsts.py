@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from annual_qsts import AnnualSummary, run_shard, shard_days
+
+
+class TestAnnualSummary(unittest.TestCase):
+    NODES = ["a.1", "a.2", "a.3", "b.1", "c.2", "c.3"]
+
+    def test_merge_matches_single_update(self):
+        rng = np.random.default_rng(0)
+        v = rng.uniform(0.93, 1.07, size=(200, len(self.NODES)))
+        v[5, 4] = 0.0  # обесточенный узел не должен попасть в минимум
+        power = rng.uniform(1000.0, 3000.0, size=200)
+        losses = rng.uniform(10.0, 50.0, size=200)
+
+        whole = AnnualSummary(self.NODES)
+        whole.update(v, power, losses)
+        first, second = AnnualSummary(self.NODES), AnnualSummary(self.NODES)
+        first.update(v[:77], power[:77], losses[:77])
+        second.update(v[77:], power[77:], losses[77:])
+        merged = first.merge(second)
+
+        self.assertEqual(merged.steps, 200)
+        np.testing.assert_array_equal(merged.bus_min, whole.bus_min)
+        np.testing.assert_array_equal(merged.bus_max, whole.bus_max)
+        np.testing.assert_array_equal(merged.under_steps, whole.under_steps)
+        np.testing.assert_array_equal(merged.over_steps, whole.over_steps)
+        self.assertAlmostEqual(merged.loss_kwh, whole.loss_kwh, places=6)
+        self.assertEqual(merged.peak_kw, whole.peak_kw)
+        self.assertGreater(merged.bus_min[0], 0.0)
+
+    def test_merge_rejects_other_nodes(self):
+        with self.assertRaises(ValueError):
+            AnnualSummary(self.NODES).merge(AnnualSummary(self.NODES[:3]))
+
+
+class TestDayShards(unittest.TestCase):
+    PARAMS = {"pv_enabled": True, "temperature": 25.0, "load_scale": 1.0, "control_mode": "STATIC"}
+
+    def test_shard_days_contiguous(self):
+        shards = shard_days(range(1, 366), 4)
+        self.assertEqual([d for shard in shards for d in shard], list(range(1, 366)))
+        self.assertLessEqual(max(map(len, shards)) - min(map(len, shards)), 1)
+        self.assertEqual(len(shard_days([5, 6], 8)), 2)
+
+    def test_warmup_matches_continuous_run(self):
+        continuous, _ = run_shard([1, 2, 3, 4], self.PARAMS)
+        merged, _ = run_shard([1, 2], self.PARAMS)
+        second, steps = run_shard([3, 4], self.PARAMS, warmup_days=2)
+        merged.merge(second)
+
+        self.assertEqual(steps, 4 * 96)
+        np.testing.assert_allclose(merged.bus_min, continuous.bus_min, atol=1e-9)
+        np.testing.assert_allclose(merged.bus_max, continuous.bus_max, atol=1e-9)
+        np.testing.assert_array_equal(merged.over_steps, continuous.over_steps)
+        self.assertAlmostEqual(merged.loss_kwh, continuous.loss_kwh, places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
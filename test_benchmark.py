@@ -0,0 +1,53 @@
+import json
+import pathlib
+import subprocess
+import sys
+import tempfile
+import unittest
+import benchmark
+
+SCRIPT = pathlib.Path(benchmark.__file__).resolve()
+
+
+def _result(us_per_call, steps_per_sec, days=(1,)):
+    return {
+        "meta": {"dss_version": "DSS C-API 0.0", "days": list(days), "load_scales": [1.0], "pv": [True]},
+        "phases": {name: {"calls": 1, "total_s": 0.0, "us_per_call": us_per_call} for name in benchmark.PHASES},
+        "steps_per_sec": steps_per_sec,
+    }
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare_and_meta_mismatch(self):
+        baseline = _result(100.0, 1000.0)
+        rows = benchmark.compare_with_baseline(_result(110.0, 950.0), baseline, tolerance=0.2)
+        self.assertFalse(any(regressed for *_, regressed in rows))
+        rows = benchmark.compare_with_baseline(_result(130.0, 700.0), baseline, tolerance=0.2)
+        self.assertEqual(sum(regressed for *_, regressed in rows), len(benchmark.PHASES) + 1)
+
+        self.assertEqual(benchmark.baseline_mismatch(_result(1.0, 1.0), baseline), [])
+        self.assertEqual(benchmark.baseline_mismatch(_result(1.0, 1.0, days=(1, 100)), baseline), ["days"])
+
+    def test_json_stdout_and_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline_path = pathlib.Path(tmp) / "baseline.json"
+            run = subprocess.run([sys.executable, str(SCRIPT), "--days", "1", "--pv", "on", "--json", "-",
+                                  "--save-baseline", str(baseline_path)],
+                                 capture_output=True, text=True, cwd=SCRIPT.parent, timeout=300)
+            self.assertEqual(run.returncode, 0, run.stderr)
+            # В stdout - только JSON, отчет и баннер среды - в stderr
+            result = json.loads(run.stdout)
+            self.assertEqual(result["meta"]["steps"], 96)
+            self.assertEqual(result["phases"]["env_step"]["calls"], 96)
+            self.assertGreater(result["steps_per_sec"], 0)
+            self.assertEqual(json.loads(baseline_path.read_text())["meta"]["days"], [1])
+
+            # Базовый результат для других суток не сравнивается
+            run = subprocess.run([sys.executable, str(SCRIPT), "--days", "100", "--pv", "on",
+                                  "--baseline", str(baseline_path)],
+                                 capture_output=True, text=True, cwd=SCRIPT.parent, timeout=300)
+            self.assertEqual(run.returncode, 2, run.stdout + run.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
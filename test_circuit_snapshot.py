@@ -0,0 +1,56 @@
+import unittest
+import dss
+from circuit_snapshot import CircuitSnapshot
+
+
+class TestCircuitSnapshot(unittest.TestCase):
+    def setUp(self):
+        # Маленькая схема вместо master.dss, чтобы тест не ждал полной компиляции
+        self.engine = dss.DSS
+        self.text = self.engine.Text
+        self.circuit = self.engine.ActiveCircuit
+        self.text.Command = "Clear"
+        self.text.Command = "New Circuit.snaptest basekv=4.16 bus1=a"
+        self.text.Command = "New Transformer.reg1 phases=1 windings=2 buses=[a.1 b.1] kvs=[2.4 2.4] kvas=[500 500]"
+        self.text.Command = "New RegControl.creg1 transformer=reg1 winding=2 vreg=120 ptratio=20"
+        self.text.Command = "New Line.L1 bus1=a bus2=c"
+        self.text.Command = "New Load.LD1 bus1=c kV=4.16 kW=100"
+        self.snapshot = CircuitSnapshot.capture(self.engine)
+
+    def test_restore_reverts_changes(self):
+        self.circuit.RegControls.Name = "creg1"
+        self.circuit.RegControls.TapNumber = 5
+        self.text.Command = "Set LoadMult=1.5"
+        self.text.Command = "Open Line.L1 Term=2 Phase=2"
+        self.text.Command = "Disable Load.LD1"
+        self.text.Command = "New Fault.F1 bus1=c.1 phases=1 r=0.005"
+
+        self.assertTrue(self.snapshot.is_valid())
+        self.snapshot.restore()
+
+        self.circuit.RegControls.Name = "creg1"
+        self.assertEqual(self.circuit.RegControls.TapNumber, 0)
+        self.assertAlmostEqual(self.circuit.Solution.LoadMult, 1.0)
+        self.circuit.SetActiveElement("Line.L1")
+        self.assertFalse(self.circuit.ActiveCktElement.IsOpen(2, 0))
+        self.circuit.SetActiveElement("Load.LD1")
+        self.assertTrue(self.circuit.ActiveCktElement.Enabled)
+        self.circuit.SetActiveElement("Fault.F1")
+        self.assertFalse(self.circuit.ActiveCktElement.Enabled)
+
+    def test_recompile_invalidates(self):
+        self.text.Command = "Clear"
+        self.text.Command = "New Circuit.other basekv=4.16 bus1=a"
+        self.assertFalse(self.snapshot.is_valid())
+
+    def test_recompile_same_circuit_invalidates(self):
+        """Та же схема, скомпилированная заново, не должна приниматься за исходную."""
+        self.setUp()
+        old_snapshot = self.snapshot
+        self.setUp()
+        self.assertFalse(old_snapshot.is_valid())
+        self.assertTrue(self.snapshot.is_valid())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import dss
+import contingency
+from annual_qsts import AnnualSummary
+from run_qsts_plot import setup_circuit
+
+
+class TestContingency(unittest.TestCase):
+    params = contingency.make_params(day_of_year=30, mode="snapshot", snapshot_step=72)
+
+    def test_enumerate_cases(self):
+        circuit = contingency._get_base(self.params).circuit
+        cases = contingency.enumerate_cases(circuit, lines=["L115", "l1"])
+        # l115 - трехфазная, l1 - однофазная (фаза 2)
+        self.assertEqual(len(cases), 8)
+        self.assertIn(("open", "l1", 2), cases)
+        self.assertIn(("short", "l115", 3), cases)
+
+    def test_terminals_with_different_nodes(self):
+        text = dss.DSS.Text
+        text.Command = "Clear"
+        text.Command = "New Circuit.ctgtest basekv=4.16 bus1=a"
+        # Однофазная линия с фазой 1 в начале и фазой 2 в конце
+        text.Command = "New Line.L1 phases=1 bus1=a.1 bus2=b.2"
+        circuit = dss.DSS.ActiveCircuit
+        conductors, end_bus = contingency.line_conductors(circuit)
+        cases = contingency.enumerate_cases(circuit, kinds=["open"])
+        self.assertEqual(cases, [("open", "l1", 2)])
+        self.assertEqual(conductors[("l1", 2)], 1)
+        self.assertEqual(end_bus["l1"], "b")
+
+    def test_case_matches_fresh_compile(self):
+        cases = [("short", "l115", 1), ("open", "l1", 2), ("open", "l115", 3)]
+        _, results = contingency.run_cases(self.params, cases)
+
+        engine = dss.DSS
+        circuit = engine.ActiveCircuit
+        for command, result in zip(["New Fault.F_1_1 Bus1=1.1 Phases=1 R=0.005",
+                                    "Open Line.l1 Term=1 Phase=1",
+                                    "Open Line.l115 Term=1 Phase=3"], results):
+            setup_circuit(engine, {}, True, 30, 25.0)
+            engine.Text.Command = "Set ControlMode=STATIC"
+            engine.Text.Command = "Set Number=1"
+            engine.Text.Command = command
+            engine.Text.Command = "Set Hour=18 Sec=0"
+            circuit.Solution.Solve()
+            summary = AnnualSummary(circuit.AllNodeNames)
+            summary.update(np.array([circuit.AllBusVmagPu]), [0.0], [0.0])
+            np.testing.assert_allclose(result["bus_min"], summary.bus_min, atol=1e-4)
+
+    def test_parallel_matches_sequential(self):
+        lines = ["l115", "l1", "l35", "l60"]
+        seq_cases, seq_buses = contingency.run_contingencies(self.params, lines=lines, n_workers=1)
+        par_cases, par_buses = contingency.run_contingencies(self.params, lines=lines, n_workers=2)
+        # Порядок близких по v_min строк может отличаться, сравниваются сами случаи
+        key = ["kind", "line", "phase"]
+        seq_cases = seq_cases.sort_values(key).reset_index(drop=True)
+        par_cases = par_cases.sort_values(key).reset_index(drop=True)
+        self.assertEqual(len(seq_cases), 19)  # базовый режим + 18 отказов
+        np.testing.assert_allclose(seq_cases["v_min"], par_cases["v_min"], atol=1e-4)
+        self.assertEqual(list(seq_cases["n_under"]), list(par_cases["n_under"]))
+        self.assertEqual(set(seq_buses["bus"]), set(par_buses["bus"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
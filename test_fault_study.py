@@ -0,0 +1,50 @@
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import dss
+import fault_study
+
+
+class TestFaultStudy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_bulk_currents_and_cache(self):
+        table = fault_study.get_fault_study(cache_dir=self.tmp.name)
+        circuit = dss.DSS.ActiveCircuit
+        self.assertEqual(list(table.columns), fault_study.FAULT_COLUMNS)
+        self.assertEqual(set(table["bus"]), set(circuit.AllBusNames))
+        self.assertTrue((table["i_3ph"] > 0).all())
+        # 610 - за трансформатором треугольник/треугольник: замыкания на землю нет
+        self.assertLess(table.set_index("bus").loc["610", "i_slg"], 1.0)
+
+        # Isc шины - ток КЗ всех ее узлов, в отчете это столбец трехфазного КЗ
+        circuit.SetActiveBus("2")
+        self.assertEqual(list(circuit.ActiveBus.Nodes), [2])
+        isc = np.hypot(*circuit.ActiveBus.Isc[:2])
+        row = table.set_index("bus").loc["2"]
+        self.assertAlmostEqual(row["i_3ph"], isc, delta=1.0)
+        self.assertEqual(row["i_ll"], 0.0)
+
+        # Совпадает с отчетом OpenDSS (в нем токи округлены до 0.01 А)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/faultstudy.csv"
+            dss.DSS.Text.Command = f'Export FaultStudy "{path}"'
+            report = pd.read_csv(path, skipinitialspace=True)
+        report.columns = fault_study.FAULT_COLUMNS
+        report["bus"] = report["bus"].str.strip().str.lower()
+        expected = report.set_index("bus").loc[table["bus"]]
+        np.testing.assert_allclose(table[fault_study.FAULT_COLUMNS[1:]].to_numpy(), expected.to_numpy(), atol=0.01)
+
+        # Повторный запрос - из кэша, без нового расчета
+        with mock.patch.object(fault_study, "run_fault_study") as run:
+            cached = fault_study.get_fault_study(cache_dir=self.tmp.name)
+        run.assert_not_called()
+        self.assertTrue(cached.equals(table))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import pathlib
+import tempfile
+import unittest
+import numpy as np
+import loadshape_store
+
+
+class TestLoadshapeStore(unittest.TestCase):
+    def test_convert_matches_opendss_reading(self):
+        """Комментарий в CSV читается как 0 (как это делает OpenDSS), числа - без потери точности."""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = pathlib.Path(tmp) / "shape.csv"
+            dbl_path = pathlib.Path(tmp) / "shape.dbl"
+            csv_path.write_text("! comment\n0.7535289132645806\n1.25,ignored\n")
+
+            npts = loadshape_store.convert_csv(csv_path, dbl_path)
+
+            self.assertEqual(npts, 3)
+            values = np.fromfile(dbl_path, dtype='<f8')
+            np.testing.assert_array_equal(values, [0.0, 0.7535289132645806, 1.25])
+
+    def test_rewrite_shape_refs(self):
+        line = "New Loadshape.ls npts=35040 mult=(file=../profiles/load_profiles/loadshape_S1a.csv)"
+        out = loadshape_store._rewrite_shape_refs(line)
+        self.assertIn("mult=(dblfile=../profiles/bin/load_profiles/loadshape_S1a.dbl)", out)
+
+    def test_rewrite_master_redirects(self):
+        text = "Redirect IEEE123LoadShapes.dss\nRedirect IEEE123LoadsQsts.dss\n"
+        out = loadshape_store._rewrite_master(text, loadshape_store.BIN_SUFFIX)
+        self.assertIn("Redirect IEEE123LoadShapes_bin.dss", out)
+        self.assertIn("Redirect IEEE123LoadsQsts.dss", out)
+
+    def test_day_window_indices(self):
+        """Окно суток плюс точка для Hour=0 (предыдущая точка года, с переходом через начало)."""
+        idx = loadshape_store.day_window_indices(2, 1, 96, 35040)
+        np.testing.assert_array_equal(idx[:96], np.arange(96, 192))
+        self.assertEqual(idx[-1], 95)
+        idx = loadshape_store.day_window_indices(1, 1, 96, 35040)
+        self.assertEqual(idx[-1], 35039)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from node_cache import NodeResultCache
+
+
+class TestNodeResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_roundtrip_and_key(self):
+        cache = NodeResultCache(self.tmp.name)
+        key = cache.key(bus="65", faults=(), start_taps=[("creg1a", 3)])
+        self.assertEqual(key, cache.key(start_taps=[("creg1a", 3)], faults=(), bus="65"))
+        self.assertNotEqual(key, cache.key(bus="65", faults=(), start_taps=[("creg1a", 4)]))
+        self.assertIsNone(cache.get(key))
+
+        data = np.arange(12.0).reshape(4, 3)
+        cache.put(key, {"data": data, "columns": ["a", " b", "a"], "final_taps": {"creg1a": 4}, "converged": True})
+        result = cache.get(key)
+        np.testing.assert_array_equal(result["data"], data)
+        self.assertEqual(result["columns"], ["a", " b", "a"])
+        self.assertEqual(result["final_taps"], {"creg1a": 4})
+
+    def test_evicts_least_recently_used(self):
+        blob = np.zeros(1000)  # ~8 КБ на запись
+        cache = NodeResultCache(self.tmp.name, max_bytes=20000)
+        cache.put("first", {"data": blob})
+        cache.put("second", {"data": blob})
+        # "first" читали последним, поэтому при переполнении удаляется "second"
+        os.utime(cache._path("second"), ns=(1, 1))
+        cache.get("first")
+        cache.put("third", {"data": blob})
+
+        self.assertIsNotNone(cache.get("first"))
+        self.assertIsNone(cache.get("second"))
+        self.assertIsNotNone(cache.get("third"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+import dss
+from node_index import BusNodeIndex, SensorIndex
+
+
+class TestSensorIndex(unittest.TestCase):
+    def setUp(self):
+        self.engine = dss.DSS
+        self.text = self.engine.Text
+        self.circuit = self.engine.ActiveCircuit
+        self.text.Command = "Clear"
+        self.text.Command = "New Circuit.idxtest basekv=4.16 bus1=a"
+        self.text.Command = "New Line.L1 bus1=a bus2=b"
+        self.text.Command = "New Line.L2 phases=1 bus1=b.2 bus2=c.2"
+        self.text.Command = "New Load.LD1 bus1=b kV=4.16 kW=300"
+        self.text.Command = "New Load.LD2 phases=1 bus1=c.2 kV=2.4 kW=50"
+        self.text.Command = "Set VoltageBases=[4.16]"
+        self.text.Command = "CalcVoltageBases"
+        self.circuit.Solution.Solve()
+
+    def _read_by_bus(self, node):
+        """Исходный способ: SetActiveBus + среднее VMagAngle / kVBase."""
+        self.circuit.SetActiveBus(node)
+        v_mag = self.circuit.ActiveBus.VMagAngle
+        return np.mean(v_mag[0::2]) / (self.circuit.ActiveBus.kVBase * 1000)
+
+    def test_matches_per_bus_readout(self):
+        sensors = ["b.1", "c.2", "b.3", "missing.1"]
+        values = SensorIndex(self.circuit, sensors).read(self.circuit)
+
+        self.assertEqual(values.dtype, np.float32)
+        self.assertTrue(values.flags['C_CONTIGUOUS'])
+        for i, node in enumerate(sensors[:3]):
+            self.assertAlmostEqual(values[i], self._read_by_bus(node), places=6)
+        self.assertEqual(values[3], 0.0)
+
+    def test_topology_change_detected(self):
+        index = SensorIndex(self.circuit, ["b.1"])
+        self.assertTrue(index.is_current(self.circuit))
+        self.text.Command = "New Line.L3 bus1=b bus2=d"
+        self.circuit.Solution.Solve()
+        self.assertFalse(index.is_current(self.circuit))
+
+    def test_same_node_count_other_order_detected(self):
+        index = BusNodeIndex(self.circuit)
+        # Та же схема с другим порядком шин: число узлов то же, порядок другой
+        self.text.Command = "Clear"
+        self.text.Command = "New Circuit.idxtest basekv=4.16 bus1=a"
+        self.text.Command = "New Line.L2 phases=1 bus1=a.2 bus2=c.2"
+        self.text.Command = "New Line.L1 bus1=a bus2=b"
+        self.text.Command = "CalcVoltageBases"
+        self.assertEqual(self.circuit.NumNodes, index.n_nodes)
+        self.assertFalse(index.is_current(self.circuit))
+        self.assertTrue(BusNodeIndex(self.circuit).is_current(self.circuit))
+
+    def test_bus_reduce_matches_per_node_loop(self):
+        index = BusNodeIndex(self.circuit)
+        vmag = np.array(self.circuit.AllBusVmagPu)
+        expected = {}
+        for node, v in zip(self.circuit.AllNodeNames, vmag):
+            bus = node.split('.')[0]
+            expected[bus] = max(expected.get(bus, 0.0), v)
+        bus_max = index.bus_reduce(np.maximum, vmag)
+        self.assertEqual(dict(zip(index.bus_names, bus_max.tolist())), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
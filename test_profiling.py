@@ -0,0 +1,37 @@
+import os
+import unittest
+from unittest import mock
+from profiling import PROFILE_ENV_VAR, PhaseProfiler, profiling_enabled
+
+
+class Dummy:
+    def work(self, x):
+        return x * 2
+
+
+class TestProfiling(unittest.TestCase):
+    def test_flag_overrides_env_var(self):
+        with mock.patch.dict(os.environ, {PROFILE_ENV_VAR: "1"}):
+            self.assertTrue(profiling_enabled())
+            self.assertFalse(profiling_enabled(False))
+        with mock.patch.dict(os.environ, {PROFILE_ENV_VAR: ""}):
+            self.assertFalse(profiling_enabled())
+            self.assertTrue(profiling_enabled(True))
+
+    def test_wrap_counts_calls_per_instance(self):
+        profiler = PhaseProfiler()
+        timed, plain = Dummy(), Dummy()
+        profiler.wrap(timed, "work", "phase")
+
+        self.assertEqual(timed.work(3), 6)
+        timed.work(1)
+        plain.work(1)
+
+        stats = profiler.snapshot()
+        self.assertEqual(stats["phase"]["calls"], 2)
+        self.assertGreaterEqual(stats["phase"]["total_s"], 0.0)
+        self.assertNotIn("work", plain.__dict__)
+
+
+if __name__ == '__main__':
+    unittest.main()
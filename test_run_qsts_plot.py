@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+import dss
+from run_qsts_plot import prepare_circuit
+
+
+def day_voltages(engine):
+    engine.Text.Command = "Set ControlMode=OFF"
+    engine.Text.Command = "Set Number=1"
+    solution = engine.ActiveCircuit.Solution
+    v = []
+    for _ in range(96):
+        solution.Solve()
+        v.append(engine.ActiveCircuit.AllBusVmagPu)
+    return np.array(v)
+
+
+class TestPrepareCircuit(unittest.TestCase):
+    def test_retuned_circuit_matches_fresh_compile(self):
+        engine = dss.DSS
+        faults = {'13': {'mode': 'Open Line', 'phases': [2]}}
+        self.assertFalse(prepare_circuit(engine, faults, True, 1, 25.0, 0.0))
+        day_voltages(engine)
+
+        # День, температура и тестовая нагрузка меняются без Compile (в т.ч. повторно)
+        for day, temp, load_kw in [(172, 40.0, 800.0), (200, -5.0, 0.0), (200, 10.0, 300.0)]:
+            self.assertTrue(prepare_circuit(engine, faults, True, day, temp, load_kw))
+            retuned = day_voltages(engine)
+            self.assertFalse(prepare_circuit(engine, faults, True, day, temp, load_kw, reuse=False))
+            np.testing.assert_allclose(retuned, day_voltages(engine), atol=1e-6)
+
+        # Смена режима PV - только через полную компиляцию
+        self.assertFalse(prepare_circuit(engine, faults, False, 200, 10.0, 300.0))
+
+    def test_fault_delta_matches_fresh_compile(self):
+        engine = dss.DSS
+        short = {'mode': 'Short Circuit', 'phases': [1]}
+        open_line = {'mode': 'Open Line', 'phases': [1, 3]}
+        sequence = [
+            {'13': open_line},
+            {'13': open_line, '60': short},  # добавить КЗ
+            {'60': short},  # снять обрыв
+            {},  # снять КЗ (объект Fault остается отключенным)
+            {'60': {'mode': 'Short Circuit', 'phases': [1, 2]}, '13': {'mode': 'Open Line', 'phases': [2]}},
+        ]
+        expected = []
+        for node_states in sequence:
+            prepare_circuit(engine, node_states, False, 10, 25.0, 0.0, reuse=False)
+            expected.append(day_voltages(engine))
+
+        # Та же последовательность на одной схеме, только разницей аварий
+        prepare_circuit(engine, {}, False, 10, 25.0, 0.0, reuse=False)
+        for node_states, reference in zip(sequence, expected):
+            self.assertTrue(prepare_circuit(engine, node_states, False, 10, 25.0, 0.0))
+            np.testing.assert_allclose(day_voltages(engine), reference, atol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import math
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+import run_qsts_plot
+from fault_manager import canonical_faults
+from scenario_sweep import build_grid, make_scenario, run_sweep
+
+
+class TestScenarioSweep(unittest.TestCase):
+    def test_grid_dedupes_equivalent_scenarios(self):
+        fault = {'13': {'mode': 'Short Circuit', 'phases': [2, 1]}}
+        same_fault = {'13': {'mode': 'Short Circuit', 'phases': [1, 2]}, '60': {'mode': 'Normal', 'phases': []}}
+        grid = build_grid(days=[1, 1], temperatures=[10.0, 40.0], pv_options=[False],
+                          fault_sets=[None, {}, fault, same_fault])
+        # Без PV температура не важна, пустые/нормальные наборы аварий совпадают
+        self.assertEqual(len(grid), 2)
+        self.assertEqual(canonical_faults(fault), (('13', 'Short Circuit', (1, 2)),))
+
+    def test_second_run_uses_cache(self):
+        scenario = make_scenario(day_of_year=200, load_scale=1.2, control_mode="OFF")
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = run_sweep([scenario], cache_dir=cache_dir, n_workers=1)
+            second = run_sweep([scenario, scenario], cache_dir=cache_dir, n_workers=1)
+
+        self.assertEqual(len(second), 1)
+        self.assertFalse(first.loc[0, "cached"])
+        self.assertTrue(second.loc[0, "cached"])
+        self.assertEqual(first.loc[0, "converged_steps"], 96)
+        self.assertEqual(first.loc[0, "peak_kw"], second.loc[0, "peak_kw"])
+
+    def test_failed_scenario_is_nan_and_not_cached(self):
+        setup_circuit = run_qsts_plot.setup_circuit
+
+        def diverging_setup(dss_engine, *args, **kwargs):
+            faults = setup_circuit(dss_engine, *args, **kwargs)
+            dss_engine.Text.Command = "Set MaxIterations=1 Tolerance=1e-12"
+            return faults
+
+        scenario = make_scenario(day_of_year=3, control_mode="OFF")
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(run_qsts_plot, "setup_circuit", diverging_setup):
+                table = run_sweep([scenario], cache_dir=cache_dir, n_workers=1)
+            self.assertEqual(list(pathlib.Path(cache_dir).glob("*.json")), [])
+
+        self.assertEqual(table.loc[0, "converged_steps"], 0)
+        for column in ("v_min", "v_max", "n_under", "n_over", "peak_kw"):
+            self.assertTrue(math.isnan(table.loc[0, column]), column)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import time
+import unittest
+from run_qsts_plot import analyze_voltage_violations
+from sim_worker import SimulationWorker
+
+
+class TestSimulationWorker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.worker = SimulationWorker()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.worker.close()
+
+    def wait(self, future, timeout=300.0):
+        deadline = time.monotonic() + timeout
+        while not future.done():
+            self.assertLess(time.monotonic(), deadline, "worker timed out")
+            self.worker.poll()
+            time.sleep(0.05)
+
+    def test_analyze_matches_direct_call(self):
+        params = dict(node_states_dict={'13': {'mode': 'Open Line', 'phases': [1]}}, pv_enabled=True,
+                      day_of_year=180, temperature=30.0, test_load_kw=0.0)
+        future = self.worker.submit("analyze", dict(params, start_taps={}))
+        self.wait(future)
+        self.assertEqual(future.result(), analyze_voltage_violations(**params))
+
+    def test_newer_job_supersedes_pending(self):
+        base = dict(node_states_dict={}, pv_enabled=False, temperature=25.0, test_load_kw=0.0, start_taps={})
+        first = self.worker.submit("analyze", dict(base, day_of_year=1), label="first")
+        second = self.worker.submit("analyze", dict(base, day_of_year=2), label="second")
+        self.assertTrue(first.cancelled())
+        self.assertEqual(self.worker.status()[0], "second")
+        self.wait(second)
+        self.assertIsInstance(second.result(), tuple)
+        self.assertFalse(self.worker.busy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import dss
+from step_recorder import StepRecorder
+
+
+class TestStepRecorder(unittest.TestCase):
+    def setUp(self):
+        self.engine = dss.DSS
+        self.text = self.engine.Text
+        self.circuit = self.engine.ActiveCircuit
+        self.text.Command = "Clear"
+        self.text.Command = "New Circuit.rectest basekv=4.16 bus1=a"
+        self.text.Command = "New Loadshape.day npts=4 interval=6 mult=[0.3 0.6 1.0 0.5]"
+        self.text.Command = "New Line.L1 bus1=a bus2=b"
+        self.text.Command = "New Line.L2 phases=1 bus1=b.2 bus2=c.2"
+        self.text.Command = "New Load.LD1 bus1=b kV=4.16 kW=300 daily=day"
+        self.text.Command = "New Load.LD2 phases=1 bus1=c.2 kV=2.4 kW=50 daily=day"
+        self.text.Command = "Set VoltageBases=[4.16]"
+        self.text.Command = "CalcVoltageBases"
+        self.text.Command = "New Monitor.vi element=Line.L2 terminal=2 mode=0"
+        self.text.Command = "New Monitor.pq element=Line.L2 terminal=2 mode=1 ppolar=no"
+        self.text.Command = "Set Mode=Daily StepSize=6h Number=1"
+
+    def _run(self, recorder, n_steps):
+        for _ in range(n_steps):
+            self.circuit.Solution.Solve()
+            recorder.record()
+
+    def test_matches_monitors(self):
+        recorder = StepRecorder(self.circuit, [("Line.L1", 1), ("Line.L2", 2)], capacity=4)
+        self._run(recorder, 4)
+        frame = recorder.frame(1)
+
+        monitors = self.circuit.Monitors
+        for name in ("vi", "pq"):
+            monitors.Name = name
+            np.testing.assert_allclose(frame["hour"], monitors.dblHour)
+            for i, channel in enumerate(monitors.Header):
+                np.testing.assert_allclose(frame[channel.strip()], monitors.Channel(i + 1), rtol=1e-5, atol=1e-3)
+        self.assertEqual(list(recorder.n_phases), [3, 1])
+        self.assertEqual(recorder.values("v_mag").shape, (4, 2, 3))
+
+    def test_ring_buffer_keeps_latest_steps(self):
+        recorder = StepRecorder(self.circuit, [("Line.L1", 1)], capacity=3)
+        self._run(recorder, 5)
+        np.testing.assert_allclose(recorder.frame(0)["hour"], [18.0, 24.0, 30.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import unittest
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+from threaded_vec_env import ThreadedVecEnv, make_context_env_fn
+
+
+def _run(vec_env_cls):
+    env = vec_env_cls([make_context_env_fn() for _ in range(2)])
+    env.seed(7)
+    observations = [env.reset()]
+    rewards = []
+    actions = np.random.default_rng(0).integers(0, 3, size=(100, 2, len(env.action_space.nvec)))
+    for action in actions:
+        obs, reward, done, info = env.step(action)
+        observations.append(obs)
+        rewards.append(reward)
+    env.close()
+    return np.array(observations), np.array(rewards)
+
+
+class TestThreadedVecEnv(unittest.TestCase):
+    def test_matches_dummy_vec_env(self):
+        # Новые переменные окружения не должны ронять потоки движка (см. make_engine_pool)
+        for i in range(50):
+            os.environ[f"IEEE123_TEST_VAR_{i}"] = "x" * 100
+        self.addCleanup(lambda: [os.environ.pop(f"IEEE123_TEST_VAR_{i}") for i in range(50)])
+
+        # 100 шагов - с автосбросом сред после 96-го
+        obs_t, rew_t = _run(ThreadedVecEnv)
+        obs_d, rew_d = _run(DummyVecEnv)
+        self.assertEqual(obs_t.shape, (101, 2, obs_d.shape[2]))
+        np.testing.assert_allclose(obs_t, obs_d, atol=1e-6)
+        np.testing.assert_allclose(rew_t, rew_d, atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
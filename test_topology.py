@@ -0,0 +1,57 @@
+import unittest
+import dss
+from topology import get_topology
+
+
+class TestNetworkTopology(unittest.TestCase):
+    def setUp(self):
+        self.engine = dss.DSS
+        self.text = self.engine.Text
+        self.circuit = self.engine.ActiveCircuit
+        self.text.Command = "Clear"
+        # 150 -> (регулятор) 149 -> 1 -> {2, 3 -> 4}, кольцо 2-4 через линию L5
+        self.text.Command = "New Circuit.topotest basekv=4.16 bus1=150"
+        self.text.Command = "New Transformer.reg1 phases=3 windings=2 buses=[150 149] conns=[wye wye] kvs=[4.16 4.16] kvas=[5000 5000]"
+        self.text.Command = "New RegControl.creg1 transformer=reg1 winding=2 vreg=120 ptratio=20"
+        self.text.Command = "New Line.L1 bus1=149 bus2=1"
+        self.text.Command = "New Line.L2 bus1=1 bus2=2"
+        self.text.Command = "New Line.L3 bus1=1 bus2=3"
+        self.text.Command = "New Line.L4 bus1=3 bus2=4"
+        self.text.Command = "New Line.L5 bus1=2 bus2=4"
+        self.text.Command = "Set VoltageBases=[4.16]"
+        self.text.Command = "CalcVoltageBases"
+
+    def test_tree_queries(self):
+        topo = get_topology(self.circuit)
+        self.assertEqual(topo.parent_element('1'), 'Line.l1')
+        # BFS: шина 2 обходится раньше 3, поэтому 4 питается от 2 через L5
+        self.assertEqual(topo.parent_element('4'), 'Line.l5')
+        self.assertEqual(topo.tree()['1'], ['2', '3'])
+        self.assertEqual(topo.subtree('2'), {'2', '4'})
+        self.assertTrue(topo.is_downstream('4', '1'))
+        self.assertFalse(topo.is_downstream('4', '3'))
+        self.assertEqual(topo.regulator_chain('4'), ['creg1'])
+        self.assertEqual(topo.regulator_chain('150'), [])
+
+        mask = topo.subtree_mask(['2', '3'])
+        self.assertEqual({topo.bus_names[i] for i in mask.nonzero()[0]}, {'2', '3', '4'})
+        self.assertEqual(list(topo.positions(['4', 'nope'])), [topo.bus_pos['4'], -1])
+
+    def test_rebuilt_only_on_definition_change(self):
+        topo = get_topology(self.circuit)
+        self.text.Command = "New Load.LD1 bus1=4 kV=4.16 kW=100"
+        self.assertIs(get_topology(self.circuit), topo)
+        self.text.Command = "New Line.L6 bus1=4 bus2=5"
+        rebuilt = get_topology(self.circuit)
+        self.assertIsNot(rebuilt, topo)
+        self.assertTrue(rebuilt.is_downstream('5', '2'))
+        # Переподключение линии без новых элементов тоже перестраивает граф
+        self.text.Command = "Edit Line.L6 bus1=3"
+        reconnected = get_topology(self.circuit)
+        self.assertIsNot(reconnected, rebuilt)
+        self.assertEqual(reconnected.parent_element('5'), 'Line.l6')
+        self.assertTrue(reconnected.is_downstream('5', '3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
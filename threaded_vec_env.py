@@ -0,0 +1,112 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+import dss
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from gym_environment import IEEE123Env
+
+
+def make_context_engine():
+    """
+    Новый независимый контекст OpenDSS в текущем процессе.
+    Смена рабочей папки при Compile запрещена: она общая для всех потоков.
+    """
+    engine = dss.DSS.NewContext()
+    engine.AllowChangeDir = False
+    return engine
+
+
+def make_engine_pool(n_threads):
+    """
+    Пул из n_threads потоков, каждый из которых уже сделал первый вызов движка.
+
+    DSS C-API собран на Free Pascal: при первом вызове из потока, созданного
+    не им, рантайм регистрирует поток и читает переменные локали через
+    указатель envp, запомненный при загрузке библиотеки. Когда после
+    загрузки в окружение добавляют переменную (pytest ставит
+    PYTEST_CURRENT_TEST, os.environ[...] = ...), glibc перевыделяет массив
+    environ, envp указывает на освобожденную память, и первый вызов из нового
+    потока падает (segfault в fpgetenv). Уже зарегистрированные потоки и
+    главный поток это не затрагивает, поэтому потоки регистрируются заранее.
+    """
+    pool = ThreadPoolExecutor(max_workers=n_threads)
+    # Барьер держит задачи, пока пул не создаст все n_threads потоков
+    barrier = threading.Barrier(n_threads)
+    lock = threading.Lock()
+
+    def attach(_):
+        barrier.wait()
+        with lock:
+            return dss.DSS.Version
+
+    list(pool.map(attach, range(n_threads)))
+    return pool
+
+
+# Общий пул потоков движка. Создается при импорте модуля (вместе с загрузкой
+# dss), то есть до изменений окружения: импортировать модуль нужно раньше,
+# чем процесс начнет менять os.environ (см. make_engine_pool)
+ENGINE_POOL = make_engine_pool(os.cpu_count() or 1)
+
+
+def make_context_env_fn(pv_enabled=True, rank=0, monitor_dir=None):
+    """
+    Фабрика IEEE123Env со своим контекстом OpenDSS (для ThreadedVecEnv).
+    monitor_dir - обернуть среду в Monitor с логом monitor_<rank> (как в train_agent.py).
+    """
+    def make_env():
+        env = IEEE123Env(pv_enabled=pv_enabled, dss_engine=make_context_engine())
+        if monitor_dir is not None:
+            from stable_baselines3.common.monitor import Monitor
+            env = Monitor(env, os.path.join(monitor_dir, f"monitor_{rank}"))
+        return env
+    return make_env
+
+
+class ThreadedVecEnv(DummyVecEnv):
+    """
+    VecEnv из N сред в одном процессе, каждая со своим контекстом OpenDSS.
+
+    Шаги сред выполняются в пуле ENGINE_POOL: движок (через cffi) отпускает GIL
+    на время Solve(), поэтому расчеты потоков идут параллельно. Наблюдения
+    складываются в предвыделенный массив (n_envs, obs_dim) DummyVecEnv,
+    без pickle/IPC на каждом шаге, как у SubprocVecEnv.
+
+    Каждая фабрика из env_fns должна создавать среду с собственным
+    dss_engine (см. make_context_env_fn): общий dss.DSS потоками не делится.
+
+    Движок вызывается только из потоков, зарегистрированных в нем заранее
+    (make_engine_pool): поток, впервые обратившийся к DSS C-API после
+    изменения окружения процесса, падает. Пул общий для всех ThreadedVecEnv
+    и не закрывается в close().
+    """
+
+    def __init__(self, env_fns, pool=None):
+        super().__init__(env_fns)
+        self._pool = pool or ENGINE_POOL
+
+    def _step_env(self, env_idx):
+        obs, self.buf_rews[env_idx], terminated, truncated, self.buf_infos[env_idx] = self.envs[env_idx].step(
+            self.actions[env_idx]
+        )
+        self.buf_dones[env_idx] = terminated or truncated
+        self.buf_infos[env_idx]["TimeLimit.truncated"] = truncated and not terminated
+
+        if self.buf_dones[env_idx]:
+            # Финальное наблюдение эпизода сохраняем, затем сбрасываем среду
+            self.buf_infos[env_idx]["terminal_observation"] = obs
+            obs, self.reset_infos[env_idx] = self.envs[env_idx].reset()
+        self._save_obs(env_idx, obs)
+
+    def step_wait(self):
+        # list() дожидается всех потоков и пробрасывает исключения из них
+        list(self._pool.map(self._step_env, range(self.num_envs)))
+        return (self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), deepcopy(self.buf_infos))
+
+
+def make_threaded_vec_env(n_envs, pv_enabled=True, monitor_dir=None):
+    """ThreadedVecEnv из n_envs сред IEEE123Env."""
+    return ThreadedVecEnv([make_context_env_fn(pv_enabled, rank, monitor_dir) for rank in range(n_envs)])
@@ -0,0 +1,224 @@
+from collections import deque
+import hashlib
+import numpy as np
+
+ROOT_BUS = '150'
+
+
+def _bus(name):
+    return name.split('.')[0]
+
+
+class NetworkTopology:
+    """
+    Граф шин схемы (ребра - линии и трансформаторы) и дерево BFS от шины
+    питания. Строится один раз на определение схемы (см. get_topology) и
+    общий для GridController, plot_topology и логики аварий.
+
+    - Смежность хранится в CSR (indptr/indices), соседи идут в порядке
+      обхода Lines, затем Transformers - как в прежних обходах, поэтому
+      выбор родителя в кольцах тот же.
+    - parent/parent_element - родитель шины в дереве и питающий элемент.
+    - Эйлеров обход дерева (tin/tout): поддерево шины - непрерывный кусок
+      массива preorder, проверка "ниже по схеме" - O(1).
+    - Цепочки регуляторов выше шины кэшируются по шинам.
+    """
+
+    def __init__(self, circuit, root=ROOT_BUS):
+        self.root = root
+        edges = []  # (шина1, шина2, элемент)
+        lines = circuit.Lines
+        idx = lines.First
+        while idx > 0:
+            edges.append((_bus(lines.Bus1), _bus(lines.Bus2), circuit.ActiveCktElement.Name))
+            idx = lines.Next
+        xfmrs = circuit.Transformers
+        idx = xfmrs.First
+        while idx > 0:
+            buses = circuit.ActiveCktElement.BusNames
+            if len(buses) >= 2:
+                edges.append((_bus(buses[0]), _bus(buses[1]), circuit.ActiveCktElement.Name))
+            idx = xfmrs.Next
+
+        # Регулятор на трансформаторе: "Transformer.<имя>" -> имя RegControl
+        self.xfmr_to_reg = {}
+        regs = circuit.RegControls
+        idx = regs.First
+        while idx > 0:
+            self.xfmr_to_reg[f"Transformer.{regs.Transformer}"] = regs.Name
+            idx = regs.Next
+
+        self._build(edges)
+        self._chains = {}
+
+    def _build(self, edges):
+        self.bus_names = []
+        self.bus_pos = {}
+        for b1, b2, _ in edges:
+            for bus in (b1, b2):
+                if bus not in self.bus_pos:
+                    self.bus_pos[bus] = len(self.bus_names)
+                    self.bus_names.append(bus)
+        if self.root not in self.bus_pos:
+            self.bus_pos[self.root] = len(self.bus_names)
+            self.bus_names.append(self.root)
+        n = len(self.bus_names)
+        self.n_buses = n
+        self.element_names = [elem for _, _, elem in edges]
+
+        # Списки смежности в порядке добавления ребер, затем CSR:
+        # для шины i соседи - indices[indptr[i]:indptr[i + 1]], элементы - edge_element[...]
+        adj = [[] for _ in range(n)]
+        for k, (b1, b2, _) in enumerate(edges):
+            p1, p2 = self.bus_pos[b1], self.bus_pos[b2]
+            adj[p1].append((p2, k))
+            adj[p2].append((p1, k))
+        self.indptr = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum([len(a) for a in adj], out=self.indptr[1:])
+        self.indices = np.array([nb for a in adj for nb, _ in a], dtype=np.intp)
+        self.edge_element = np.array([k for a in adj for _, k in a], dtype=np.intp)
+
+        # BFS от шины питания
+        self.parent = np.full(n, -1, dtype=np.intp)
+        self.parent_edge = np.full(n, -1, dtype=np.intp)
+        root = self.bus_pos[self.root]
+        visited = np.zeros(n, dtype=bool)
+        visited[root] = True
+        self.children = [[] for _ in range(n)]
+        queue = deque([root])
+        indptr, indices, edge_element = self.indptr, self.indices, self.edge_element
+        while queue:
+            curr = queue.popleft()
+            for k in range(indptr[curr], indptr[curr + 1]):
+                nb = indices[k]
+                if not visited[nb]:
+                    visited[nb] = True
+                    self.parent[nb] = curr
+                    self.parent_edge[nb] = edge_element[k]
+                    self.children[curr].append(nb)
+                    queue.append(nb)
+        self.reachable = visited
+
+        # Эйлеров обход (итеративный DFS по дереву)
+        self.tin = np.full(n, -1, dtype=np.intp)
+        self.tout = np.full(n, -1, dtype=np.intp)
+        preorder = []
+        stack = [(root, False)]
+        while stack:
+            node, leaving = stack.pop()
+            if leaving:
+                self.tout[node] = len(preorder)
+                continue
+            self.tin[node] = len(preorder)
+            preorder.append(node)
+            stack.append((node, True))
+            for child in reversed(self.children[node]):
+                stack.append((child, False))
+        self.preorder = np.array(preorder, dtype=np.intp)
+
+    def __contains__(self, bus):
+        return bus in self.bus_pos
+
+    def parent_element(self, bus):
+        """Элемент, питающий шину в дереве (None для корня и неподключенных шин)."""
+        pos = self.bus_pos.get(bus)
+        if pos is None or self.parent_edge[pos] < 0:
+            return None
+        return self.element_names[self.parent_edge[pos]]
+
+    def tree(self):
+        """Словарь {шина: [дочерние шины]} (формат прежнего build_network_tree)."""
+        return {self.bus_names[i]: [self.bus_names[c] for c in ch] for i, ch in enumerate(self.children) if ch}
+
+    def subtree_positions(self, bus):
+        """Номера шин поддерева (сама шина и все ниже по схеме), срез preorder."""
+        pos = self.bus_pos.get(bus)
+        if pos is None or self.tin[pos] < 0:
+            return np.zeros(0, dtype=np.intp) if pos is None else np.array([pos], dtype=np.intp)
+        return self.preorder[self.tin[pos]:self.tout[pos]]
+
+    def subtree(self, bus):
+        return {self.bus_names[i] for i in self.subtree_positions(bus)}
+
+    def positions(self, buses):
+        """Номера шин в графе (-1 для отсутствующих), например для точек графика."""
+        return np.array([self.bus_pos.get(bus, -1) for bus in buses], dtype=np.intp)
+
+    def subtree_mask(self, buses):
+        """Маска по шинам графа: объединение поддеревьев buses."""
+        mask = np.zeros(self.n_buses, dtype=bool)
+        for bus in buses:
+            mask[self.subtree_positions(bus)] = True
+        return mask
+
+    def is_downstream(self, bus, of):
+        """True, если bus питается через шину of (или совпадает с ней)."""
+        a, b = self.bus_pos.get(of), self.bus_pos.get(bus)
+        if a is None or b is None:
+            return False
+        if self.tin[a] < 0 or self.tin[b] < 0:
+            return a == b
+        return bool(self.tin[a] <= self.tin[b] < self.tout[a])
+
+    def regulator_chain(self, bus):
+        """Регуляторы на пути от шины к источнику, начиная с ближайшего."""
+        chain = self._chains.get(bus)
+        if chain is None:
+            chain = []
+            pos = self.bus_pos.get(bus)
+            root = self.bus_pos[self.root]
+            while pos is not None and pos != root and self.parent[pos] >= 0:
+                elem = self.element_names[self.parent_edge[pos]]
+                if elem.lower().startswith("transformer.") and elem in self.xfmr_to_reg:
+                    chain.append(self.xfmr_to_reg[elem])
+                pos = self.parent[pos]
+            self._chains[bus] = chain
+        return list(chain)
+
+
+def circuit_signature(circuit):
+    """
+    Отпечаток определения схемы: имена линий и трансформаторов с шинами их
+    выводов (вместе с узлами), имена регуляторов и их трансформаторы.
+    Перекомпиляция той же схемы (в том числе с авариями и тестовой нагрузкой)
+    его не меняет; добавление/переименование элементов, переподключение
+    линии (Edit Line.x Bus2=...) или смена ее фаз - меняет.
+    """
+    digest = hashlib.sha1(circuit.Name.encode())
+    parts = []
+    lines = circuit.Lines
+    idx = lines.First
+    while idx > 0:
+        parts.append(f"{lines.Name} {lines.Bus1} {lines.Bus2}")
+        idx = lines.Next
+    parts.append("")
+    xfmrs = circuit.Transformers
+    idx = xfmrs.First
+    while idx > 0:
+        parts.append(f"{xfmrs.Name} {' '.join(circuit.ActiveCktElement.BusNames)}")
+        idx = xfmrs.Next
+    parts.append("")
+    regs = circuit.RegControls
+    idx = regs.First
+    while idx > 0:
+        parts.append(f"{regs.Name} {regs.Transformer}")
+        idx = regs.Next
+    digest.update("\n".join(parts).encode())
+    return digest.hexdigest()
+
+
+_cached = (None, None)
+
+
+def get_topology(circuit, root=ROOT_BUS):
+    """Топология текущей схемы; перестраивается только при изменении ее определения."""
+    global _cached
+    key = (circuit_signature(circuit), root)
+    if _cached[0] != key:
+        _cached = (key, NetworkTopology(circuit, root))
+    return _cached[1]
+
+
+def clear_cache():
+    global _cached
+    _cached = (None, None)
@@ -1,10 +1,12 @@
+import argparse
 import os
 import time
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from stable_baselines3.common.callbacks import BaseCallback, CheckpointCallback
 from stable_baselines3.common.monitor import Monitor
 import config
+from profiling import PROFILE_ENV_VAR
 
 # Импортируем нашу среду
 from gym_environment import IEEE123Env
@@ -31,20 +33,67 @@ class TensorboardCallback(BaseCallback):
             self.logger.record("custom/power_kw", infos["power_kw"])
         if "switches" in infos:
             self.logger.record("custom/switches", infos["switches"])
+        if "profile" in infos:
+            # Среднее время фазы на вызов и ее доля во времени env.step()
+            profile = infos["profile"]
+            env_step_s = profile.get("env_step", {}).get("total_s", 0.0)
+            for phase, stats in profile.items():
+                if stats["calls"]:
+                    self.logger.record(f"profile/{phase}_ms", stats["total_s"] / stats["calls"] * 1000.0)
+                if env_step_s > 0 and phase != "env_step":
+                    self.logger.record(f"profile/{phase}_share", stats["total_s"] / env_step_s)
         return True
 
+def make_env_fn(rank, n_envs):
+    """
+    Фабрика среды для VecEnv. Вызывается уже внутри процесса-воркера,
+    поэтому каждая среда получает свой экземпляр движка OpenDSS.
+    """
+    def make_env():
+        env = IEEE123Env()
+        log_name = "monitor" if n_envs == 1 else f"monitor_{rank}"
+        env = Monitor(env, os.path.join(LOG_DIR, log_name))
+        return env
+    return make_env
+
+def make_vec_env(n_envs, vec_env="subproc"):
+    """
+    1 среда - DummyVecEnv в текущем процессе. Больше:
+    - "subproc": SubprocVecEnv, процесс на среду;
+    - "threaded": ThreadedVecEnv, контекст OpenDSS на среду в одном процессе
+      (экспериментальный режим).
+    """
+    if vec_env == "threaded" and n_envs > 1:
+        from threaded_vec_env import make_threaded_vec_env
+        return make_threaded_vec_env(n_envs, monitor_dir=LOG_DIR)
+
+    env_fns = [make_env_fn(rank, n_envs) for rank in range(n_envs)]
+    if n_envs == 1:
+        return DummyVecEnv(env_fns)
+    return SubprocVecEnv(env_fns)
+
 def main():
+    parser = argparse.ArgumentParser(description="Train PPO agent on IEEE123Env")
+    parser.add_argument("--n-envs", type=int, default=1, help="number of parallel environments")
+    parser.add_argument("--vec-env", choices=["subproc", "threaded"], default="subproc",
+                        help="parallel backend: one process per env or (experimental) one OpenDSS context per env in threads")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"record per-phase timings to TensorBoard (same as {PROFILE_ENV_VAR}=1)")
+    args = parser.parse_args()
+    if args.vec_env == "threaded":
+        # Потоки движка регистрируются при импорте - до изменения os.environ ниже
+        import threaded_vec_env  # noqa: F401
+        print(config.tr("Threaded Experimental"))
+    if args.profile:
+        # Через переменную окружения флаг доходит и до сред в процессах SubprocVecEnv
+        os.environ[PROFILE_ENV_VAR] = "1"
+
     print(config.tr("Init Training"))
     print(config.tr("Logs Dir", LOG_DIR))
     print(config.tr("Checkpoints Dir", CHECKPOINT_DIR))
 
-    def make_env():
-        env = IEEE123Env()
-        log_file = os.path.join(LOG_DIR, "monitor") 
-        env = Monitor(env, log_file) 
-        return env
-
-    env = DummyVecEnv([make_env])
+    env = make_vec_env(args.n_envs, args.vec_env)
+    print(config.tr("Training Envs", args.n_envs, type(env).__name__))
 
     model = PPO(
         "MlpPolicy", 
@@ -62,8 +111,9 @@ def main():
 
     # --- СОЗДАЕМ ЧЕКПОИНТ-КОЛЛБЕК ---
     # Сохраняем модель каждые 10 000 шагов
+    # save_freq считается в вызовах VecEnv.step, то есть в n_envs шагах среды
     checkpoint_callback = CheckpointCallback(
-        save_freq=10000, 
+        save_freq=max(10000 // args.n_envs, 1), 
         save_path=CHECKPOINT_DIR,
         name_prefix="ppo_ieee123"
     )